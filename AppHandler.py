@@ -14,6 +14,7 @@ class AppHandler:
         self.counter: int = 0
         self.turnOff: bool = False
         self.startUp: bool = True
+        self.resident: bool = self.config.residentMode
 
         self.config = None
 
@@ -25,10 +26,43 @@ class AppHandler:
         sleepTime, turnOff = output
         self.sleepTime = int(sleepTime)
 
+    def runResident(self):
+        """
+        Runs the GUI in this process for every session. Between
+        sessions the window is hidden instead of closed, so the
+        image list, its caches and the dirList stay loaded.
+        """
+        # only imported here, relaunching gui.run.py does not need them
+        from app.GuiData import GuiData
+        from app.GUI import GUI
+
+        config = Config(self.CONFIG_PATH)
+        guiData = GuiData(config, update=True,
+                          progressive=config.progressiveStartup)
+        gui = GUI(guiData, self.sessionEnded)
+        gui.mainloop()
+
+    def sessionEnded(self, sleepTime: int, turnOff: bool) -> int | None:
+        """
+        Is called by the GUI in resident mode when a session ends.
+        :param sleepTime: Minutes until the next session
+        :param turnOff: True if there is no next session
+        :return: Seconds until the next session, None to close the app
+        """
+        self.sleepTime = sleepTime
+        self.turnOff = turnOff
+        self.counter += 1
+        if turnOff:
+            return None
+        return self.sleepTime * 60
+
     def timer(self):
         sleep(self.sleepTime * 60)
 
     def runLoop(self):
+        if self.resident:
+            self.runResident()
+            return
         while not self.turnOff:
             if (self.counter == 0 and not self.startUp) or self.counter != 0:
                 self.timer()
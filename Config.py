@@ -133,8 +133,24 @@ class Config:
 
     @property
     def dirListPath(self) -> str:
+        return f"generated\\dirList{self.usedPath}.bin"
+
+    @property
+    def dirListExportPath(self) -> str:
         return f"generated\\dirList{self.usedPath}.txt"
 
+    @property
+    def fileIndexPath(self) -> str:
+        return f"generated\\fileIndex{self.usedPath}.bin"
+
+    @property
+    def previewPath(self) -> str:
+        return "generated\\previews"
+
+    @property
+    def moveJournalPath(self) -> str:
+        return "generated\\moveJournal.txt"
+
     # --------------------------- APPEARANCE ---------------------------- #
 
     @property
@@ -199,6 +215,10 @@ class Config:
     def resizeDelay(self) -> int:
         return int(self.config['behaviour']['resizeDelay'])
 
+    @property
+    def navigationDelay(self) -> int:
+        return int(self.config['behaviour'].get('navigationDelay', 100))
+
     @property
     def supportedFiletype(self) -> tuple[str, ...]:
         return tuple(self.config['behaviour']['supportedFiletype'])
@@ -207,6 +227,110 @@ class Config:
     def maxLenImageList(self) -> int:
         return int(self.config['behaviour']['maxLenImageList'])
 
+    @property
+    def maxLoadBuffer(self) -> int:
+        return int(self.config['behaviour'].get('maxLoadBuffer', 8))
+
+    @property
+    def bufferMemory(self) -> int:
+        """
+        :return: The byte budget of the decoded images in the buffer
+        """
+        return int(self.config['behaviour'].get('bufferMemory', 256)) \
+            * 1_048_576
+
+    @property
+    def dirCacheSize(self) -> int:
+        return int(self.config['behaviour'].get('dirCacheSize', 256))
+
+    @property
+    def loadWorkers(self) -> int:
+        return int(self.config['behaviour'].get('loadWorkers', 2))
+
+    @property
+    def exportDirList(self) -> bool:
+        return bool(int(self.config['behaviour'].get('exportDirList', 0)))
+
+    @property
+    def progressiveStartup(self) -> bool:
+        return bool(int(self.config['behaviour'].get('progressiveStartup', 0)))
+
+    @property
+    def scanWorkers(self) -> int:
+        return int(self.config['behaviour'].get('scanWorkers', 8))
+
+    @property
+    def readWorkers(self) -> int:
+        return int(self.config['behaviour'].get('readWorkers', 4))
+
+    @property
+    def readsPerDevice(self) -> int:
+        return int(self.config['behaviour'].get('readsPerDevice', 2))
+
+    @property
+    def decodeQueueSize(self) -> int:
+        return int(self.config['behaviour'].get('decodeQueueSize', 4))
+
+    @property
+    def processDecode(self) -> bool:
+        return bool(int(self.config['behaviour'].get('processDecode', 0)))
+
+    @property
+    def sharedMemorySize(self) -> int:
+        """
+        :return: The byte budget of the shared memory the decode
+                 processes write pixels into
+        """
+        return int(self.config['behaviour'].get('sharedMemorySize', 512)) \
+            * 1_048_576
+
+    @property
+    def hotCacheSize(self) -> int:
+        """
+        :return: The byte budget of decoded images in the cache
+        """
+        return int(self.config['behaviour'].get('hotCacheSize', 512)) \
+            * 1_048_576
+
+    @property
+    def warmCacheSize(self) -> int:
+        """
+        :return: The byte budget of encoded images in the cache
+        """
+        return int(self.config['behaviour'].get('warmCacheSize', 256)) \
+            * 1_048_576
+
+    @property
+    def previewCache(self) -> bool:
+        return bool(int(self.config['behaviour'].get('previewCache', 0)))
+
+    @property
+    def previewCacheSize(self) -> int:
+        """
+        :return: The byte budget of the previews on disk
+        """
+        return int(self.config['behaviour'].get('previewCacheSize', 1024)) \
+            * 1_048_576
+
+    @property
+    def displayDecode(self) -> bool:
+        return bool(int(self.config['behaviour'].get('displayDecode', 0)))
+
+    @property
+    def fileWatcher(self) -> bool:
+        return bool(int(self.config['behaviour'].get('fileWatcher', 0)))
+
+    @property
+    def watchInterval(self) -> float:
+        return float(self.config['behaviour'].get('watchInterval', 5))
+
+    @property
+    def renderCacheSize(self) -> int:
+        """
+        :return: The amount of resized images that are kept
+        """
+        return int(self.config['behaviour'].get('renderCacheSize', 16))
+
     @property
     def turnOff(self) -> bool:
         return bool(int(self.config['behaviour']['turnOff']))
@@ -215,6 +339,10 @@ class Config:
     def sleepTime(self) -> int:
         return int(self.config['behaviour']['sleepTime'])
 
+    @property
+    def residentMode(self) -> bool:
+        return bool(int(self.config['behaviour'].get('residentMode', 0)))
+
     # ---------------------------- PATTERNS ----------------------------- #
 
     @property
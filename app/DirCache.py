@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from os import scandir, stat
+from typing import List, Tuple
+
+
+class DirCache:
+    """
+    DirCache keeps the listings of recently used directories in
+    memory so a random file can be picked without listing the
+    directory again. Only files with a supported file type are
+    stored. Every listing is stored together with the modification
+    time of its directory, which is checked before the listing is
+    used. If the directory changed the listing is made again.
+
+    The amount of listings is bounded by maxlen, when it is exceeded
+    the least recently used listing is removed.
+    """
+
+    def __init__(self, supportedFiletype: tuple[str, ...], maxlen: int = 256):
+        self.supportedFiletype: tuple[str, ...] = supportedFiletype
+        self.maxlen: int = maxlen
+        self._listings: OrderedDict[str, Tuple[int, List[str]]] = \
+            OrderedDict()
+
+    def __len__(self):
+        return len(self._listings)
+
+    def __contains__(self, directory: str):
+        return directory in self._listings
+
+    def files(self, directory: str) -> List[str]:
+        """
+        Returns the names of all supported files in the directory.
+        The modification time of the directory is compared to the
+        one stored with the listing, if they are the same the stored
+        listing is returned. Otherwise, the directory is listed
+        again and the listing is stored.
+
+        In case the directory does not exist the listing is removed
+        and an empty list is returned.
+        :param directory: The directory to list
+        :return: List of supported file names, should not be modified
+        """
+        try:
+            mtime = stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            self.invalidate(directory)
+            return []
+        listing = self._listings.get(directory)
+        if listing is not None and listing[0] == mtime:
+            self._listings.move_to_end(directory)
+            return listing[1]
+        files = self.listDir(directory)
+        self._listings[directory] = (mtime, files)
+        self._listings.move_to_end(directory)
+        if len(self._listings) > self.maxlen:
+            self._listings.popitem(last=False)
+        return files
+
+    def listDir(self, directory: str) -> List[str]:
+        """
+        Lists the directory and keeps only the files that
+        end with a supported file type.
+        :param directory: The directory to list
+        :return: List of supported file names
+        """
+        try:
+            with scandir(directory) as entries:
+                return [entry.name for entry in entries
+                        if entry.name.endswith(self.supportedFiletype)
+                        and entry.is_file()]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def invalidate(self, directory: str):
+        """
+        Removes the listing of the directory if it is stored.
+        :param directory: The directory of the listing
+        """
+        self._listings.pop(directory, None)
+
+    def clear(self):
+        self._listings.clear()
@@ -0,0 +1,150 @@
+from array import array
+from os import path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.MappedFile import MappedFile
+
+
+class DirList(MappedFile):
+    """
+    DirList is the on-disk list of every directory in the file tree
+    with its amount of supported files and its modification time.
+    It is memory-mapped when opened, the counts and times are read
+    through a memoryview on the map without being parsed. The
+    directory paths are only decoded when they are asked for.
+    Everything given out is a copy, so the map can be closed as
+    soon as it was read.
+
+    The file is laid out as:
+    header: magic, version, directory count, prefix count, pool size
+    prefix offsets: (prefix count + 1) uint64 into the pool
+    name offsets: (directory count + 1) uint64 into the pool
+    mtimes: directory count int64, st_mtime_ns of the directory
+    prefixes: directory count uint32, index of the prefix
+    counts: directory count uint32, amount of supported files
+    pool: every prefix and name encoded as utf-8
+
+    A directory is stored as its parent directory, the prefix, and
+    its name. Every prefix is only stored once, as the directories
+    that share a parent share it.
+    """
+    MAGIC: bytes = b'IQDL'
+    NAME: str = 'dirList'
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        dirCount, prefixCount, poolSize = self.header
+        self._prefixOffsets, self._nameOffsets, self._mtimes, \
+            self._prefixes, self._counts, self._pool = self.sections(
+                ('Q', prefixCount + 1), ('Q', dirCount + 1),
+                ('q', dirCount), ('I', dirCount), ('I', dirCount),
+                ('B', poolSize))
+        # the names follow the prefixes in the pool
+        if self._prefixOffsets[0] != 0 or \
+                self._nameOffsets[0] != self._prefixOffsets[prefixCount] or \
+                self._nameOffsets[dirCount] != poolSize or \
+                dirCount and max(self._prefixes) >= prefixCount:
+            self.damaged()
+        self._dirCount: int = dirCount
+        self._prefixCache: Dict[int, str] = {}
+
+    def __len__(self):
+        return self._dirCount
+
+    def __getitem__(self, index: int) -> str:
+        """
+        :param index: index of the directory
+        :return: directory path
+        """
+        if not 0 <= index < self._dirCount:
+            raise IndexError("dirList index out of range")
+        start, end = self._nameOffsets[index], self._nameOffsets[index + 1]
+        name = bytes(self._pool[start:end]).decode('utf-8')
+        return path.join(self.prefix(self._prefixes[index]), name)
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._dirCount):
+            yield self[index]
+
+    def entries(self) -> Iterator[Tuple[str, int, int]]:
+        """
+        Yields (directory, file count, mtime) of every directory.
+        """
+        for index in range(self._dirCount):
+            yield self[index], self._counts[index], self._mtimes[index]
+
+    def prefix(self, index: int) -> str:
+        prefix = self._prefixCache.get(index)
+        if prefix is None:
+            start = self._prefixOffsets[index]
+            end = self._prefixOffsets[index + 1]
+            prefix = bytes(self._pool[start:end]).decode('utf-8')
+            self._prefixCache[index] = prefix
+        return prefix
+
+    @property
+    def counts(self) -> array:
+        """
+        The counts are copied as a whole into an array, which keeps
+        them as 4 byte integers instead of an int object each.
+        :return: The file count of every directory
+        """
+        return array('I', self._counts.tobytes())
+
+    @property
+    def mtimes(self) -> List[int]:
+        """
+        :return: The modification time of every directory
+        """
+        return self._mtimes.tolist()
+
+    # ----------------------------- WRITE ------------------------------ #
+
+    @classmethod
+    def write(cls, filename: str,
+              directories: Iterable[Tuple[str, int, int]]):
+        """
+        Writes a new dirList to a temporary file and replaces the
+        old dirList with it once it is complete.
+        :param filename: The path of the dirList file
+        :param directories: (directory, file count, mtime) of every
+                            directory
+        """
+        prefixPool = bytearray()
+        prefixOffsets = array('Q', [0])
+        prefixIndex: Dict[str, int] = {}
+        names = bytearray()
+        nameOffsets = array('Q', [0])
+        mtimes = array('q')
+        prefixes = array('I')
+        counts = array('I')
+        for directory, count, mtime in directories:
+            prefix, name = path.split(directory)
+            if prefix not in prefixIndex:
+                prefixIndex[prefix] = len(prefixIndex)
+                prefixPool += prefix.encode('utf-8')
+                prefixOffsets.append(len(prefixPool))
+            prefixes.append(prefixIndex[prefix])
+            names += name.encode('utf-8')
+            nameOffsets.append(len(names))
+            counts.append(count)
+            mtimes.append(mtime)
+        # names are stored after the prefixes in the pool
+        base = len(prefixPool)
+        nameOffsets = array('Q', (offset + base for offset in nameOffsets))
+
+        cls.writeFile(
+            filename, (len(counts), len(prefixIndex),
+                       len(prefixPool) + len(names)),
+            prefixOffsets, nameOffsets, mtimes, prefixes, counts,
+            prefixPool, names)
+
+    def export(self, filename: str):
+        """
+        Writes the dirList as text, one directory|count|mtime
+        per line.
+        :param filename: The path of the text file
+        """
+        with open(filename, 'w', encoding='utf-8') as file:
+            for directory, count, mtime in self.entries():
+                file.write(f"{directory}|{count}|{mtime}\n")
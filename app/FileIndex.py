@@ -0,0 +1,150 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from os import path
+from random import randrange
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.MappedFile import MappedFile
+
+
+class FileIndex(MappedFile):
+    """
+    FileIndex is an on-disk index of every supported file in the
+    file tree. It is written by the same scan that writes the
+    dirList and is memory-mapped when opened, so opening it costs
+    almost nothing regardless of the amount of files, and a random
+    file is chosen with a single random integer.
+
+    The file is laid out as:
+    header: magic, version, directory count, file count, pool size
+    directory offsets: (directory count + 1) uint64 into the pool
+    file offsets: (file count + 1) uint64 into the pool
+    file directories: file count uint32, index of the directory
+    pool: every directory and file name encoded as utf-8
+
+    Directories are only stored once, file names are stored
+    without their directory.
+    """
+    MAGIC: bytes = b'IQFI'
+    NAME: str = 'file index'
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        dirCount, fileCount, poolSize = self.header
+        self._dirOffsets, self._fileOffsets, self._fileDirs, self._pool = \
+            self.sections(('Q', dirCount + 1), ('Q', fileCount + 1),
+                          ('I', fileCount), ('B', poolSize))
+        # the file names follow the directories in the pool, and the
+        # files are stored in the order of their directories
+        if self._dirOffsets[0] != 0 or \
+                self._fileOffsets[0] != self._dirOffsets[dirCount] or \
+                self._fileOffsets[fileCount] != poolSize or \
+                fileCount and self._fileDirs[fileCount - 1] >= dirCount:
+            self.damaged()
+        self._dirCount: int = dirCount
+        self._fileCount: int = fileCount
+        # directory: index of the directory, built on the first lookup
+        self._dirIndex: Dict[str, int] | None = None
+
+    def __len__(self):
+        return self._fileCount
+
+    def __getitem__(self, index: int) -> str:
+        """
+        Returns the full path of the file at the index.
+        :param index:
+        :return: file path
+        """
+        if not 0 <= index < self._fileCount:
+            raise IndexError("file index out of range")
+        start, end = self._fileOffsets[index], self._fileOffsets[index + 1]
+        filename = bytes(self._pool[start:end]).decode('utf-8')
+        return path.join(self.directory(self._fileDirs[index]), filename)
+
+    def __contains__(self, filePath: str) -> bool:
+        """
+        :param filePath: full path of a file
+        :return: True if the file is in the index
+        """
+        if self._dirIndex is None:
+            self._dirIndex = {self.directory(index): index
+                              for index in range(self._dirCount)}
+        directory, filename = path.split(filePath)
+        dirIndex = self._dirIndex.get(directory)
+        if dirIndex is None:
+            return False
+        # the files of a directory are stored next to each other,
+        # in the order of the directories
+        start = bisect_left(self._fileDirs, dirIndex)
+        end = bisect_right(self._fileDirs, dirIndex)
+        name = filename.encode('utf-8')
+        for index in range(start, end):
+            if self._pool[self._fileOffsets[index]:
+                          self._fileOffsets[index + 1]] == name:
+                return True
+        return False
+
+    @property
+    def dirCount(self) -> int:
+        return self._dirCount
+
+    def directory(self, index: int) -> str:
+        """
+        :param index: index of the directory
+        :return: directory path
+        """
+        start, end = self._dirOffsets[index], self._dirOffsets[index + 1]
+        return bytes(self._pool[start:end]).decode('utf-8')
+
+    def directories(self) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Yields every directory together with the names of its files.
+        """
+        files: Dict[int, List[str]] = {}
+        for index in range(self._fileCount):
+            start, end = self._fileOffsets[index], self._fileOffsets[index + 1]
+            files.setdefault(self._fileDirs[index], []).append(
+                bytes(self._pool[start:end]).decode('utf-8'))
+        for dirIndex in range(self._dirCount):
+            yield self.directory(dirIndex), files.get(dirIndex, [])
+
+    def randomPath(self) -> str:
+        """
+        Chooses a random file path, every file has the same
+        probability of being chosen.
+        :return: random file path
+        """
+        return self[randrange(self._fileCount)]
+
+    # ----------------------------- WRITE ------------------------------ #
+
+    @classmethod
+    def write(cls, filename: str,
+              directories: Iterable[Tuple[str, List[str]]]):
+        """
+        Writes a new index to a temporary file and replaces the
+        old index with it once it is complete.
+        :param filename: The path of the index file
+        :param directories: pairs of directory and supported file names
+        """
+        pool = bytearray()
+        dirOffsets = array('Q', [0])
+        fileOffsets = array('Q')
+        fileDirs = array('I')
+        names = bytearray()
+        for dirIndex, (directory, files) in enumerate(directories):
+            pool += directory.encode('utf-8')
+            dirOffsets.append(len(pool))
+            for file in files:
+                fileOffsets.append(len(names))
+                names += file.encode('utf-8')
+                fileDirs.append(dirIndex)
+        fileOffsets.append(len(names))
+        # file names are stored after the directories in the pool
+        base = len(pool)
+        fileOffsets = array('Q', (offset + base for offset in fileOffsets))
+        pool += names
+
+        cls.writeFile(filename, (len(dirOffsets) - 1, len(fileDirs),
+                                 len(pool)),
+                      dirOffsets, fileOffsets, fileDirs, pool)
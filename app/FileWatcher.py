@@ -0,0 +1,382 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+from abc import ABC, abstractmethod
+from os import path, scandir, stat
+from queue import Queue, Empty
+from re import match
+from threading import Event, Thread
+from typing import Dict, Iterator, List, Set, Tuple
+
+
+class FileWatcher(ABC):
+    """
+    FileWatcher watches the file tree for supported files being
+    created, deleted or moved and directories being created or
+    deleted. Events are put in a queue as (kind, path) tuples by
+    the watcher thread, and are taken out by the thread that owns
+    the data they apply to with pendingEvents.
+    Moves are reported as a delete of the old path and a
+    create of the new path.
+
+    Blacklisted directories are not watched.
+    create gives an InotifyWatcher on Linux and a PollingWatcher
+    everywhere else.
+    """
+    CREATED: str = 'created'
+    DELETED: str = 'deleted'
+    DIR_CREATED: str = 'dirCreated'
+    DIR_DELETED: str = 'dirDeleted'
+    # events were lost, everything watched has to be checked again
+    OVERFLOW: str = 'overflow'
+
+    def __init__(self, root: str, supportedFiletype: tuple[str, ...],
+                 blacklist: str = '', interval: float = 5):
+        self.root: str = path.abspath(root)
+        self.supportedFiletype: tuple[str, ...] = supportedFiletype
+        self.blacklist: str = blacklist
+        self.interval: float = interval
+        self.events: Queue[Tuple[str, str]] = Queue()
+        # set once the whole tree is watched, events before that
+        # don't cover every change
+        self.ready: Event = Event()
+        self._stop: Event = Event()
+        self._thread: Thread | None = None
+
+    @staticmethod
+    def create(root: str, supportedFiletype: tuple[str, ...],
+               blacklist: str = '', interval: float = 5) -> 'FileWatcher':
+        """
+        Creates the best watcher available on this platform.
+        """
+        if InotifyWatcher.available():
+            return InotifyWatcher(root, supportedFiletype, blacklist,
+                                  interval)
+        return PollingWatcher(root, supportedFiletype, blacklist, interval)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = Thread(target=self.run, name=type(self).__name__,
+                              daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    @abstractmethod
+    def run(self):
+        """
+        Watches the tree on the watcher thread until it is stopped,
+        sets ready once the whole tree is watched.
+        """
+
+    def pendingEvents(self) -> List[Tuple[str, str]]:
+        """
+        Takes every event out of the queue without waiting.
+        :return: list of (kind, path)
+        """
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except Empty:
+                return events
+
+    def watches(self, filePath: str) -> bool:
+        """
+        :return: True if the path is inside the watched tree
+        """
+        return filePath == self.root or \
+            filePath.startswith(self.root + path.sep)
+
+    def isBlacklisted(self, directory: str) -> bool:
+        return self.blacklist != '' and bool(match(self.blacklist, directory))
+
+    def isSupported(self, filename: str) -> bool:
+        return filename.endswith(self.supportedFiletype)
+
+    def push(self, kind: str, eventPath: str):
+        self.events.put((kind, eventPath))
+
+    def walkDirs(self, root: str) -> Iterator[str]:
+        """
+        Yields every directory in the tree starting at root,
+        blacklisted directories and everything below them
+        are skipped.
+        """
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            if self.isBlacklisted(directory):
+                continue
+            yield directory
+            try:
+                with scandir(directory) as entries:
+                    stack.extend(entry.path for entry in entries
+                                 if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+
+class PollingWatcher(FileWatcher):
+    """
+    Watches the tree by checking the modification time of every
+    directory each interval. Only directories whose modification
+    time changed are listed again, and compared to their previous
+    listing to find the events.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._snapshot: Dict[str, Tuple[int, Set[str], Set[str]]] = {}
+
+    def run(self):
+        for directory in self.walkDirs(self.root):
+            self._snapshot[directory] = self.listDir(directory)
+        self.ready.set()
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        for directory in list(self._snapshot):
+            if directory not in self._snapshot:
+                continue
+            mtime, files, subDirs = self._snapshot[directory]
+            try:
+                if stat(directory).st_mtime_ns == mtime:
+                    continue
+            except OSError:
+                self.removeTree(directory)
+                self.push(self.DIR_DELETED, directory)
+                continue
+            newListing = self.listDir(directory)
+            self._snapshot[directory] = newListing
+            _, newFiles, newSubDirs = newListing
+            for filename in files - newFiles:
+                self.push(self.DELETED, path.join(directory, filename))
+            for filename in newFiles - files:
+                self.push(self.CREATED, path.join(directory, filename))
+            for subDir in newSubDirs - subDirs:
+                self.addTree(path.join(directory, subDir))
+            for subDir in subDirs - newSubDirs:
+                subDir = path.join(directory, subDir)
+                if subDir in self._snapshot:
+                    self.removeTree(subDir)
+                    self.push(self.DIR_DELETED, subDir)
+
+    def listDir(self, directory: str) -> Tuple[int, Set[str], Set[str]]:
+        """
+        :return: (mtime, supported file names, subdirectory names)
+        """
+        files, subDirs = set(), set()
+        try:
+            mtime = stat(directory).st_mtime_ns
+            with scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subDirs.add(entry.name)
+                    elif self.isSupported(entry.name):
+                        files.add(entry.name)
+        except OSError:
+            mtime = 0
+        return mtime, files, subDirs
+
+    def addTree(self, root: str):
+        for directory in self.walkDirs(root):
+            listing = self._snapshot[directory] = self.listDir(directory)
+            self.push(self.DIR_CREATED, directory)
+            for filename in listing[1]:
+                self.push(self.CREATED, path.join(directory, filename))
+
+    def removeTree(self, root: str):
+        prefix = root + path.sep
+        for directory in [directory for directory in self._snapshot
+                          if directory == root or
+                          directory.startswith(prefix)]:
+            del self._snapshot[directory]
+
+
+class InotifyWatcher(PollingWatcher):
+    """
+    Watches the tree with inotify, every directory gets its own
+    watch and the kernel reports the changes as they happen.
+    In case inotify can't watch the whole tree, for example
+    because the watch limit is reached, it falls back to polling.
+    """
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_FROM: int = 0x00000040
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_DELETE_SELF: int = 0x00000400
+    IN_MOVE_SELF: int = 0x00000800
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+    IN_ISDIR: int = 0x40000000
+    MASK: int = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+        IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    EVENT: struct.Struct = struct.Struct('iIII')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                 use_errno=True)
+        self._fd: int = -1
+        self._watches: Dict[int, str] = {}
+        # files that were created and are still being written
+        self._writing: Set[str] = set()
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith('linux') and \
+            ctypes.util.find_library('c') is not None
+
+    def run(self):
+        try:
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if self._fd < 0:
+                self.raiseErrno()
+            for directory in self.walkDirs(self.root):
+                self.addWatch(directory)
+            self.ready.set()
+        except OSError:
+            self.close()
+            super().run()
+            return
+        try:
+            while not self._stop.is_set():
+                readable, *_ = select.select([self._fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self._fd, 65536)
+                except BlockingIOError:
+                    continue
+                self.handle(data)
+        finally:
+            self.close()
+
+    def handle(self, data: bytes):
+        """
+        Turns the raw inotify events into watcher events.
+        Files are reported as created once a new file is closed
+        after writing or a file is moved into a watched directory,
+        writing to a file that already existed is not reported.
+        A directory that is moved out of the tree is no longer
+        watched, and the root being deleted or moved is reported
+        as its deletion.
+        :param data: The bytes read from the inotify file descriptor
+        """
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                self.push(self.OVERFLOW, self.root)
+                continue
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                # other directories are reported by their parent
+                if directory == self.root:
+                    self.removeWatches(directory)
+                    self.push(self.DIR_DELETED, directory)
+                continue
+            eventPath = path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self.addTree(eventPath)
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    self.removeWatches(eventPath)
+                    self.push(self.DIR_DELETED, eventPath)
+            elif not self.isSupported(name):
+                continue
+            elif mask & self.IN_CREATE:
+                self._writing.add(eventPath)
+            elif mask & self.IN_CLOSE_WRITE:
+                if eventPath in self._writing:
+                    self._writing.remove(eventPath)
+                    self.push(self.CREATED, eventPath)
+            elif mask & self.IN_MOVED_TO:
+                self.push(self.CREATED, eventPath)
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                if eventPath in self._writing:
+                    # it was never reported
+                    self._writing.remove(eventPath)
+                else:
+                    self.push(self.DELETED, eventPath)
+
+    def addTree(self, root: str):
+        """
+        Watches a directory that was created or moved into the
+        tree, files that are already inside it are reported
+        as created.
+        After falling back to polling the directory is added to the
+        snapshot instead.
+        """
+        if self._fd < 0:
+            PollingWatcher.addTree(self, root)
+            return
+        for directory in self.walkDirs(root):
+            try:
+                self.addWatch(directory)
+            except OSError:
+                self.push(self.OVERFLOW, self.root)
+                return
+            self.push(self.DIR_CREATED, directory)
+            try:
+                with scandir(directory) as entries:
+                    for entry in entries:
+                        if self.isSupported(entry.name) and entry.is_file():
+                            self.push(self.CREATED, entry.path)
+            except OSError:
+                continue
+
+    def addWatch(self, directory: str):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            self.raiseErrno(directory)
+        self._watches[wd] = directory
+
+    def removeWatches(self, root: str):
+        """
+        Stops watching the directory and everything below it,
+        the watches of a directory that is moved would report
+        its events under the old path otherwise.
+        """
+        prefix = root + path.sep
+        for wd, directory in list(self._watches.items()):
+            if directory == root or directory.startswith(prefix):
+                # fails for a deleted directory, its watch is
+                # already gone
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        self._writing = {filePath for filePath in self._writing
+                         if not filePath.startswith(prefix)}
+
+    @staticmethod
+    def raiseErrno(filename: str = None):
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno), filename)
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._watches.clear()
+        self._writing.clear()
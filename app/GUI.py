@@ -1,8 +1,9 @@
+from concurrent.futures import Future
 from io import BytesIO
 from re import search
 from subprocess import run, Popen
 from threading import Thread
-from typing import Tuple, List
+from typing import Callable, Tuple, List
 from os import path
 
 import customtkinter as ctk
@@ -21,13 +22,25 @@ from app.ErrorFrame import ErrorFrame
 
 
 class GUI(ctk.CTk):
+    # ms without a resize after which a resize has ended
+    RESIZE_END: int = 500
 
     # ----------------------------- INITS ------------------------------ #
-    def __init__(self, guiData: GuiData):
+    def __init__(self, guiData: GuiData,
+                 onSessionEnd: Callable[[int, bool], int | None] = None):
+        """
+        :param guiData: The data the GUI shows
+        :param onSessionEnd: Is called with (sleepTime, turnOff) when
+                             the window is closed. In case it gives back
+                             a number of seconds, the window is hidden
+                             and shown again after that time instead of
+                             being destroyed.
+        """
         super().__init__()
         # -------------------------- SETUP -------------------------- #
 
         self.guiData: GuiData = guiData
+        self.onSessionEnd = onSessionEnd
         self.protocol("WM_DELETE_WINDOW", self.__onClose)
 
         self.wm_iconbitmap(self.guiData.windowIconPath)
@@ -39,6 +52,19 @@ class GUI(ctk.CTk):
         self.title(self.config.title)
 
         self.timer = None
+        self.resizeEndJob = None
+        self.loadLabelJob = None
+        self.scanLabelJob = None
+        self.waitingJob = None
+        self.renderJob = None
+        self.render: Future | None = None
+        self.navigationJob = None
+        self.pendingSteps: int = 0
+        # the amount of moves that failed and the last of them
+        self.failedMoves: int = 0
+        self.moveError: str = ''
+        self.canvasImage: int | None = None
+        self.closing: bool = False
         self._copyInProgress: bool = False
         self.statusLabel: ctk.CTkLabel | None = None
         self.imagePatternFrames: List[ctk.CTkFrame] = []
@@ -50,13 +76,17 @@ class GUI(ctk.CTk):
 
         # ------------------------- FRAMES -------------------------- #
         self.__navigationFrameInit()
-        self.__homeFrameInit()
+        if self.guiData.waiting:
+            self.__waitingFrameInit()
+        else:
+            self.__homeFrameInit()
 
         self.configFrame = None
 
         self.errorFrame = ErrorFrame(self, self.config.mainFgColor)
 
-        self.__keyBindsInit()
+        if not self.guiData.waiting:
+            self.__keyBindsInit()
 
     @property
     def config(self):
@@ -94,6 +124,55 @@ class GUI(ctk.CTk):
         self.configButton.grid(row=2, column=1, padx=10, pady=10,
                                sticky='w')
 
+    # ------------------------ WAITING FRAME ------------------------ #
+
+    def __waitingFrameInit(self):
+        """
+        Is shown in place of the home frame while the scan has not
+        found a directory with supported files yet. The home frame
+        is created once it has, until then only closing the app
+        works.
+        """
+        self.waitingFrame = ctk.CTkFrame(
+            self, corner_radius=0, fg_color=self.config.mainFgColor)
+        self.waitingFrame.grid(row=1, column=0, sticky="nsew")
+        self.waitingLabel = ctk.CTkLabel(self.waitingFrame, text="")
+        self.waitingLabel.pack(padx=20, pady=(200, 10), side='top')
+        ctk.CTkButton(
+            self.waitingFrame, text="Stop scan", width=90, height=25,
+            command=self.guiData.cancelScan
+        ).pack(padx=5, pady=5, side='top')
+        for button in (self.homeFrameButton, self.configButton):
+            button.configure(state='disabled')
+        self.bind('<Escape>', self.__onClose)
+        self.__waitForScan()
+
+    def __waitForScan(self):
+        """
+        Shows how far the scan is until it found a directory with
+        supported files, then replaces the waiting frame with the
+        home frame. In case the scan ends without finding one the
+        default images are shown.
+        It checks again every 250 ms.
+        """
+        self.waitingJob = None
+        if self.guiData.waitForScan():
+            self.waitingFrame.destroy()
+            for button in (self.homeFrameButton, self.configButton):
+                button.configure(state='normal')
+            self.__homeFrameInit()
+            self.__keyBindsInit()
+            return
+        if self.guiData.scanCancelled.is_set():
+            text = "stopping scan"
+        else:
+            dirs, files = self.guiData.scanProgress
+            text = f"waiting for the scan to find images\n" \
+                   f"{dirs} dirs, {files} files"
+        if self.waitingLabel.cget('text') != text:
+            self.waitingLabel.configure(text=text)
+        self.waitingJob = self.after(250, self.__waitForScan)
+
     # ------------------------- HOME FRAME -------------------------- #
 
     def __gridHomeFrame(self):
@@ -249,6 +328,25 @@ class GUI(ctk.CTk):
         )
         self.dataLabel.pack(padx=5, pady=5, side='top')
 
+        self.loadLabel = ctk.CTkLabel(
+            self.imageInfoFrame, text="", width=140
+        )
+        self.loadLabel.pack(padx=5, pady=0, side='top')
+        self.__updateLoadLabel()
+
+        self.scanFrame = ctk.CTkFrame(
+            self.imageInfoFrame, bg_color='transparent', fg_color='transparent'
+        )
+        self.scanLabel = ctk.CTkLabel(self.scanFrame, text="", width=140)
+        self.scanLabel.pack(padx=5, pady=0, side='top')
+        self.scanButton = ctk.CTkButton(
+            self.scanFrame, text="Stop scan", width=90, height=25,
+            command=self.guiData.cancelScan)
+        self.scanButton.pack(padx=5, pady=5, side='top')
+        if self.guiData.scanning:
+            self.scanFrame.pack(side='top')
+            self.__updateScanLabel()
+
         # ------------------------ PATTERNS ------------------------- #
         """
         outdated explanation:
@@ -375,6 +473,8 @@ class GUI(ctk.CTk):
 
     def __keyBindsInit(self):
         self.bind('<Control-c>', self.__copyImage)
+        self.bind('<Control-z>', self.__undoEvent)
+        self.bind('<Control-r>', self.__rescanEvent)
         self.bind('<Escape>', self.__onClose)
         self.bind('<Key-2>', self.__configButtonEvent)
         self.bind('<Key-1>', self.__homeFrameButtonEvent)
@@ -411,6 +511,8 @@ class GUI(ctk.CTk):
         self.__gridHomeFrame()
         self.updateConfigChanges()
         self.bind('<Control-c>', self.__copyImage)
+        self.bind('<Control-z>', self.__undoEvent)
+        self.bind('<Control-r>', self.__rescanEvent)
         self.bind('<Key-1>', self.__homeFrameButtonEvent)
         self.bind('<Key-2>', self.__configButtonEvent)
         self.updateKeyBinds(self.homeButtons)
@@ -421,20 +523,57 @@ class GUI(ctk.CTk):
         self.homeFrame.grid_forget()
         self.__gridConfigFrame()
         self.unbind('<Control-c>')
+        self.unbind('<Control-z>')
+        self.unbind('<Control-r>')
         self.unbind('<Key-1>')  # TODO make entryFrame's ignore these
         self.unbind('<Key-2>')
         self.unbindKeys(self.homeButtons)
 
     def __on_canvas_resize(self, event):
+        # Redraw right away with a preview, if the image is decoded
+        if self.imageList.currentLoaded.decoded:
+            self.__drawImage(event, refine=False)
+
         # Cancel any existing timer
         if self.timer:
             self.after_cancel(self.timer)
 
         # Start a new timer to update the canvas after the delay
         self.timer = self.after(
-            self.config.resizeDelay, self.__updateImageSize, event
+            self.resizeDelay, self.__updateImageSize, event
+        )
+
+        # The decode size only changes once the resize has ended
+        if self.resizeEndJob is not None:
+            self.after_cancel(self.resizeEndJob)
+        self.resizeEndJob = self.after(
+            self.RESIZE_END, self.__endResize, event
         )
 
+    def __endResize(self, event):
+        """
+        Is called once no resize happened for RESIZE_END ms, the
+        images are decoded for the new canvas size, in case their
+        decode is too small for it, and the image is drawn again.
+        """
+        self.resizeEndJob = None
+        self.__updateImageSize(event)
+
+    @property
+    def resizeDelay(self) -> int:
+        """
+        The time in ms to wait after the last resize event before
+        the image is rendered again. It follows the measured cost of
+        a render, so a slow render is not started for every step of
+        a resize. Until a render is measured the resizeDelay from
+        the config is used.
+        :return: delay in ms
+        """
+        cost = self.imageList.renderCost
+        if cost is None:
+            return self.config.resizeDelay
+        return min(max(int(cost * 2000), 10), 1000)
+
     @staticmethod
     def shiftEvent(event):
         """
@@ -442,10 +581,13 @@ class GUI(ctk.CTk):
         the method that changes the current image and
         then follows up by updating the currently displayed
         image and all related information by calling updateImage.
+        Navigation that is still being coalesced is applied first,
+        so the event acts on the image the user ended on.
         :param event: The method to be executed
         :return: the wrapper
         """
         def worker(self):
+            self.__endNavigation()
             event(self)
             self.updateImage()
         return worker
@@ -558,15 +700,66 @@ class GUI(ctk.CTk):
             self.guiData.updateSessionLog((0, 1))
         return False
 
-    @shiftEvent
-    @shiftLeft
+    def __undoEvent(self, *_):
+        """
+        Undoes the last keep or delete that moved an image, the image
+        is moved back and gets its old status. The session log is
+        corrected for the status the image had and has again.
+        """
+        self.__endNavigation()
+        for _, status, restored in self.imageList.undoMoves():
+            self.guiData.updateSessionLog(
+                ((restored is True) - (status is True),
+                 (restored is False) - (status is False)))
+        self.updateImage()
+
+    def __rescanEvent(self, *_):
+        """
+        Scans the tree for changes in the background, unless a scan
+        is still running.
+        """
+        if self.guiData.scanning:
+            return
+        self.guiData.startScan()
+        self.scanFrame.pack(side='top')
+        self.__updateScanLabel()
+
     def __previousButtonEvent(self):
-        return
+        self.__navigate(-1)
 
-    @shiftEvent
-    @shiftRight
     def __nextButtonEvent(self):
-        return None
+        self.__navigate(1)
+
+    def __navigate(self, steps: int):
+        """
+        Coalesces bursts of navigation, like a held down key.
+        The first step of a burst is applied and drawn right away.
+        Steps that follow within navigationDelay ms of each other are
+        only counted, and are applied in one go once the burst is
+        over. Images that are skipped are never decoded or drawn.
+        :param steps: 1 for the next image, -1 for the previous one
+        """
+        if self.navigationJob is None:
+            self.imageList.jump(steps)
+            self.updateImage()
+        else:
+            self.after_cancel(self.navigationJob)
+            self.pendingSteps += steps
+        self.navigationJob = self.after(self.config.navigationDelay,
+                                        self.__endNavigation)
+
+    def __endNavigation(self):
+        """
+        Ends the burst of navigation, the counted steps are applied
+        and the image they end on is drawn.
+        """
+        if self.navigationJob is not None:
+            self.after_cancel(self.navigationJob)
+            self.navigationJob = None
+        steps, self.pendingSteps = self.pendingSteps, 0
+        if steps != 0:
+            self.imageList.jump(steps)
+            self.updateImage()
 
     @shiftEvent
     def __firstImageEvent(self):
@@ -596,8 +789,8 @@ class GUI(ctk.CTk):
     def __copyImageThread(self, *_):
         # Open the image file in binary mode
         with BytesIO() as output:
-            self.imageList.currentImage.convert("RGB").save(output,
-                                                            "BMP")
+            self.imageList.currentFullImage.convert("RGB").save(output,
+                                                                "BMP")
             data = output.getvalue()[14:]
             win32clipboard.OpenClipboard()
             win32clipboard.EmptyClipboard()
@@ -607,15 +800,90 @@ class GUI(ctk.CTk):
         self._copyInProgress = False
 
     def __onClose(self, *_):
+        """
+        Ends the session. In case the session end handler gives back
+        a delay the window is hidden, and the image list with its
+        caches is kept for the next session. Otherwise the app
+        is closed once the queued moves are done.
+        """
+        if self.closing:
+            return
+        self.__endNavigation()
         self.guiData.writeSessionLog()
         self.guiData.writeBlacklist()
         self.config.width, self.config.height = \
             self.winfo_width(), self.winfo_height()
         self.config.screenCord = (self.winfo_rootx(), self.winfo_rooty())
         self.config.writeToConfig()
+        delay = None
+        if self.onSessionEnd is not None:
+            delay = self.onSessionEnd(self.config.sleepTime,
+                                      self.config.turnOff)
+        if delay is not None:
+            self.withdraw()
+            self.__pauseUpdates()
+            self.after(delay * 1000, self.__startSession)
+            return
+        self.closing = True
+        if self.waitingJob is not None:
+            self.after_cancel(self.waitingJob)
+            self.waitingJob = None
+        self.guiData.stopScan()
+        self.__finishClose()
+
+    def __finishClose(self):
+        """
+        Closes the app once every queued move is done, until then the
+        load label keeps showing how many moves are left.
+        It checks again every 100 ms.
+        """
+        if self.imageList is None:
+            self.destroy()
+            return
+        if self.imageList.pendingMoves:
+            self.after(100, self.__finishClose)
+            return
+        self.imageList.close()
         # self.quit()
         self.destroy()
 
+    def __pauseUpdates(self):
+        """
+        Stops the label updates and the file watcher while the window
+        is hidden, so a resident app does no work between sessions.
+        A running scan is left to finish, it is applied once the
+        next session starts.
+        """
+        for job in (self.loadLabelJob, self.scanLabelJob, self.waitingJob):
+            if job is not None:
+                self.after_cancel(job)
+        self.loadLabelJob = self.scanLabelJob = self.waitingJob = None
+        if self.imageList is not None:
+            self.imageList.setFileWatcher(None)
+
+    def __startSession(self):
+        """
+        Shows the hidden window again for a new session. The images
+        loaded in the last session are kept, the tree is only
+        scanned again if no images were found yet, otherwise a scan
+        is started with Control-r. The label updates and file
+        watcher are started again and the next image is shown.
+        """
+        self.guiData.createSessionLog()
+        if self.guiData.nothingFound and not self.guiData.scanning:
+            self.guiData.startScan()
+        self.deiconify()
+        if self.guiData.waiting:
+            self.__waitForScan()
+            return
+        if self.guiData.scanning:
+            self.scanFrame.pack(side='top')
+            self.__updateScanLabel()
+        self.__updateLoadLabel()
+        self.guiData.startFileWatcher()
+        self.imageList.jump(1)
+        self.updateImage()
+
     # ----------------------------- UPDATES ----------------------------- #
     def updateImage(self):
         """
@@ -638,23 +906,88 @@ class GUI(ctk.CTk):
                                  + self.imageList.current.pathEnd)
 
     def __updateImageSize(self, event):
-        canvas_ratio = event.width / event.height
-        image_ratio = self.imageList.currentRatio
-        # get coordinates
-        if canvas_ratio > image_ratio:  # canvas is wider than the image
-            height = int(event.height)
-            width = int(height * image_ratio)
-        else:  # canvas is narrower than the image
-            width = int(event.width)
-            height = int(width / image_ratio)
-
-        resized_image = self.imageList.currentImage.resize((width, height))
-        self.resized_tk = ImageTk.PhotoImage(resized_image)
-        self.canvas.create_image(
-            int(event.width / 2),
-            int(event.height / 2),
-            anchor='center',
-            image=self.resized_tk)
+        canvasSize = (int(event.width), int(event.height))
+        if self.resizeEndJob is None:
+            self.imageList.displaySize = canvasSize
+        self.__drawImage(event)
+        self.imageList.preRender(canvasSize)
+
+    def __drawImage(self, event, refine: bool = True):
+        """
+        Draws the current image fitted inside the canvas in two steps.
+        In case the Lanczos render is not done yet, a nearest
+        neighbour preview is drawn right away if the image is
+        decoded, the render replaces it once the worker is done.
+        A render of an image the user already moved on from is
+        cancelled.
+        :param event: holds the width and height of the canvas
+        :param refine: False to only draw the preview
+        """
+        canvasSize = (int(event.width), int(event.height))
+        render = self.imageList.renderCurrent(canvasSize) if refine else None
+        self.__cancelRender(render)
+        if (render is None or not render.done()) and \
+                self.imageList.currentLoaded.decoded:
+            self.__showImage(self.imageList.previewCurrent(canvasSize),
+                             canvasSize)
+        if render is not None:
+            self.__showRender(render, canvasSize)
+
+    def __cancelRender(self, render: Future | None = None):
+        """
+        Stops waiting on the render that is being waited on, unless
+        it is the given render. In case it has not started yet
+        it is cancelled.
+        :param render: The render that is still wanted
+        """
+        if self.renderJob is not None:
+            self.after_cancel(self.renderJob)
+            self.renderJob = None
+        if self.render is not None and self.render is not render:
+            self.render.cancel()
+        self.render = None
+
+    def __showRender(self, render: Future, canvasSize: Tuple[int, int]):
+        """
+        Shows the render on the canvas once it is done, until then
+        it checks again every few milliseconds.
+        In case the render failed the preview is shown instead, if
+        the image could not be decoded at all the canvas is cleared.
+        :param render: Future of the resized image
+        :param canvasSize: (width, height) of the canvas
+        """
+        self.renderJob = None
+        if not render.done():
+            self.render = render
+            self.renderJob = self.after(5, self.__showRender, render,
+                                        canvasSize)
+            return
+        self.render = None
+        if render.cancelled():
+            return
+        if render.exception() is None:
+            self.__showImage(render.result(), canvasSize)
+        elif self.imageList.currentLoaded.decoded:
+            self.__showImage(self.imageList.previewCurrent(canvasSize),
+                             canvasSize)
+        elif self.canvasImage is not None:
+            self.canvas.itemconfigure(self.canvasImage, image='')
+
+    def __showImage(self, image: Image, canvasSize: Tuple[int, int]):
+        """
+        Shows the image in the center of the canvas. Only the
+        PhotoImage is created on the main thread.
+        :param image: The resized image
+        :param canvasSize: (width, height) of the canvas
+        """
+        self.resized_tk = ImageTk.PhotoImage(image)
+        center = (canvasSize[0] // 2, canvasSize[1] // 2)
+        if self.canvasImage is None:
+            self.canvasImage = self.canvas.create_image(
+                *center, anchor='center', image=self.resized_tk)
+        else:
+            self.canvas.coords(self.canvasImage, *center)
+            self.canvas.itemconfigure(self.canvasImage, image=self.resized_tk)
 
     def __updateStatusLabel(self):
         statusOptions = {None: None, False: self.deletedLabel,
@@ -671,6 +1004,72 @@ class GUI(ctk.CTk):
     def updateDataLabel(self):
         self.dataLabel.configure(text=self.imageList.currentInfo)
 
+    def __updateLoadLabel(self):
+        """
+        Shows which images around the current image are still being
+        loaded, in order of priority: 'current' for the current image,
+        +n and -n for images to the right and left of it, and how many
+        images are still waiting to be moved, with the progress of
+        a copy to another device. Moves that failed are reverted and
+        the last failure is shown. The hit rates of the image cache
+        are shown below it.
+        It checks again every 250 ms.
+        """
+        self.__revertFailedMoves()
+        positions = [
+            'current' if offset == 0 else f"{offset:+d}"
+            for offset, _ in self.imageList.pendingLoads]
+        text = f"loading {', '.join(positions)}" if positions else ""
+        if moves := self.imageList.pendingMoves:
+            text = f"{text}\nmoving {moves}".strip()
+            if progress := self.imageList.moveProgress:
+                text += f" ({progress[0] * 100 // progress[1]}%)"
+        if self.failedMoves:
+            text = f"{text}\nfailed to move {self.failedMoves}: " \
+                   f"{self.moveError}".strip()
+        text = f"{text}\n{self.imageList.cacheStats}".strip()
+        if self.loadLabel.cget('text') != text:
+            self.loadLabel.configure(text=text)
+        self.loadLabelJob = self.after(250, self.__updateLoadLabel)
+
+    def __revertFailedMoves(self):
+        """
+        Gives the images whose move failed their old status back and
+        corrects the session log for it, like an undo.
+        """
+        failed = self.imageList.applyFailedMoves()
+        if not failed:
+            return
+        for imagePath, status, restored, error in failed:
+            self.guiData.updateSessionLog(
+                ((restored is True) - (status is True),
+                 (restored is False) - (status is False)))
+            reason = error.strerror or error
+            self.moveError = f"{imagePath.filename} ({reason})"
+        self.failedMoves += len(failed)
+        self.__updateStatusLabel()
+
+    def __updateScanLabel(self):
+        """
+        Adds the directories the background scan found to the image
+        list and shows how far the scan is. Once the scan is done the
+        label and its stop button are hidden.
+        It checks again every 250 ms while the scan runs.
+        """
+        self.scanLabelJob = None
+        self.guiData.applyScan()
+        if not self.guiData.scanning:
+            self.scanFrame.pack_forget()
+            return
+        if self.guiData.scanCancelled.is_set():
+            text = "stopping scan"
+        else:
+            dirs, files = self.guiData.scanProgress
+            text = f"scanning\n{dirs} dirs, {files} files"
+        if self.scanLabel.cget('text') != text:
+            self.scanLabel.configure(text=text)
+        self.scanLabelJob = self.after(250, self.__updateScanLabel)
+
     def updateConfigChanges(self):
         configTabs = (
             self.pathFrame, self.sourcePatternsFrame, self.badPatternsFrame,
@@ -1,27 +1,54 @@
 from datetime import datetime
-from os import walk, path, sep
-from re import match
-from typing import List
+from functools import partial
+from os import path, sep
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import Dict, List, Tuple
 
 from Config import Config
+from app.DirList import DirList
+from app.FileIndex import FileIndex
+from app.FileWatcher import FileWatcher
 from app.ImageList import ImageList
+from app.TreeScanner import TreeScanner
 
 
 class GuiData:
 
-    def __init__(self, config, update=None):
+    def __init__(self, config, update=None, progressive=False):
         self.config: Config = config
 
         self.blacklist = []
         self.dirList: List[str] = []
         self.dirProbabilities: List[int] = []
+        self.fileIndex: FileIndex | None = None
+        self.imageList: ImageList | None = None
+        self.scanner: TreeScanner | None = None
+        self.scanThread: Thread | None = None
+        self.scanQueue: Queue[Tuple[str | None, int | list | None]] = Queue()
+        self.scanFound: Event = Event()
+        self.scanCancelled: Event = Event()
+        self.scanResult: List[Tuple[str, int, List[str]]] | None = None
         self.createSessionLog()
         self.openBlacklist()
-        if update is True:
-            self.writeDirList()
-        self.openDirList()
-        self.imageList = ImageList(config, self.dirList, self.dirProbabilities,
-                                   config.maxLenImageList)
+        if update is True and progressive:
+            self.startScan()
+        elif update is True:
+            self.writeDirList(incremental=True)
+        if self.scanThread is not None and \
+                not path.exists(self.config.dirListPath):
+            self.openScannedDirs()
+        else:
+            self.openDirList()
+        if self.dirList:
+            self.createImageList()
+
+    def createImageList(self):
+        self.imageList = ImageList(self.config, self.dirList,
+                                   self.dirProbabilities,
+                                   self.config.maxLenImageList,
+                                   self.fileIndex)
+        self.startFileWatcher()
 
     @property
     def config(self) -> Config:
@@ -43,6 +70,18 @@ class GuiData:
         """
         return self.config.mainPath
 
+    @property
+    def rootPath(self) -> str:
+        """
+        The directory the file tree is walked from. In case the
+        main path does not exist the default path is used.
+        :return:
+        str: root directory
+        """
+        if not path.lexists(self.config.mainPath):
+            return self.config.defaultPath
+        return self.config.mainPath
+
     def writeBlacklist(self):
         """
         Writes the blacklist in memory to the file
@@ -82,50 +121,328 @@ class GuiData:
         """
         return '|'.join(self.blacklist).replace(sep, 2*sep)
 
-    def writeDirList(self):
+    def createScanner(self) -> TreeScanner:
+        return TreeScanner(self.config.supportedFiletype,
+                           self.blacklistPattern, self.config.scanWorkers)
+
+    def writeDirList(self, incremental: bool = False):
         """
-        Walks from the main path tree through every branch
-        and writes each path name with a file count into
-        the corresponding file.
+        Scans the tree from the main path and writes each directory
+        with its amount of supported files and its modification time
+        into the corresponding dirList file. Blacklisted directories
+        and everything below them are skipped.
+        The supported files found by the same scan are written
+        into the file index.
+        In case exportDirList is turned on, the dirList is also
+        written as text.
+
+        A scan that is running in the background is stopped first.
+        An incremental scan starts from the dirList and file index
+        that were written before, only directories that changed since
+        are listed again. A directory that is taken off the blacklist
+        is not found by it, as its parent did not change.
 
         # todo add error message if path doesn't exist
         """
-        # start_time = perf_counter()
-        blacklist = self.blacklistPattern
-        rootPath = self.config.mainPath
-        if not path.lexists(rootPath):
-            rootPath = self.config.defaultPath
-        with open(self.config.dirListPath, 'w', encoding='utf-8') as file:
-            for root, *_, files in walk(rootPath):
-                if match(blacklist, root) and blacklist != '':
-                    continue
-                file.write(f"{path.join(root)}|{len(files)}\n")
-        # end_time = perf_counter()
-        # print(end_time - start_time)
+        self.stopScan()
+        previous = self.scannedDirs() if incremental else None
+        self.saveDirList(self.createScanner().scan(self.rootPath, previous))
+
+    def saveDirList(self, directories: List[Tuple[str, int, List[str]]]):
+        """
+        Writes the directories of a scan to the dirList and the
+        file index.
+        :param directories: (directory, mtime, supported file names)
+        """
+        DirList.write(self.config.dirListPath,
+                      [(directory, len(files), mtime)
+                       for directory, mtime, files in directories])
+        if self.config.exportDirList:
+            with DirList(self.config.dirListPath) as dirList:
+                dirList.export(self.config.dirListExportPath)
+        self.closeFileIndex()
+        FileIndex.write(self.config.fileIndexPath,
+                        [(directory, files) for directory, _, files
+                         in directories if files])
+
+    # ----------------------------- SCAN ------------------------------ #
+
+    def startScan(self):
+        """
+        Starts an incremental scan of the tree in the background.
+        Every directory with supported files it finds is queued to
+        be added to the sampler by applyScan, so images can be
+        chosen from it before the scan is done.
+        Every scan gets its own queue and events, a scan that was
+        stopped but did not end yet can't mix with the next one.
+        """
+        self.scanner = self.createScanner()
+        self.scanQueue = Queue()
+        self.scanFound = Event()
+        self.scanCancelled = Event()
+        self.scanResult = None
+        self.scanThread = Thread(
+            target=self.scan, name='scan', daemon=True,
+            args=(self.scanner, self.scanQueue, self.scanFound,
+                  self.scanCancelled))
+        self.scanThread.start()
+
+    def scan(self, scanner: TreeScanner, queue: Queue, found: Event,
+             cancelled: Event):
+        """
+        Runs the scan, is run by the scan thread. Every directory
+        with supported files is queued as (directory, file count),
+        the end of the scan as (None, result). The result is None
+        if the scan failed.
+        """
+        result = None
+        try:
+            result = scanner.scan(self.rootPath, self.scannedDirs(),
+                                  partial(self.foundDir, queue, found),
+                                  cancelled)
+        finally:
+            queue.put((None, result))
+            found.set()
+
+    @staticmethod
+    def foundDir(queue: Queue, found: Event, directory: str, _,
+                 files: List[str]):
+        if files:
+            queue.put((directory, len(files)))
+            found.set()
+
+    @property
+    def scanning(self) -> bool:
+        return self.scanThread is not None
+
+    @property
+    def waiting(self) -> bool:
+        """
+        :return: True while there is no image list, as the scan has
+                 not found a directory with supported files yet
+        """
+        return self.imageList is None
+
+    @property
+    def nothingFound(self) -> bool:
+        """
+        :return: True if no directory with supported files is known,
+                 the images then come from the default path
+        """
+        return self.waiting or self.dirList == [self.config.defaultPath]
+
+    @property
+    def scanProgress(self) -> tuple[int, int] | None:
+        """
+        :return: (directories, files) the running scan has found,
+                 None if no scan is running
+        """
+        if self.scanner is None or self.scanThread is None:
+            return None
+        return self.scanner.scannedDirs, self.scanner.foundFiles
+
+    def cancelScan(self):
+        self.scanCancelled.set()
+
+    def stopScan(self):
+        """
+        Cancels the running scan without waiting for it, the
+        directories it found that were not added yet are dropped.
+        The scan thread ends on its own once the directories it is
+        listing are done.
+        """
+        if self.scanThread is None:
+            return
+        self.scanCancelled.set()
+        self.scanThread = None
+        self.scanResult = None
+
+    def openScannedDirs(self, timeout: float = 5):
+        """
+        Waits for the scan to find the first directory with supported
+        files, and uses the directories found so far as the dirList.
+        Is used when there is no dirList yet to start from.
+        In case nothing is found within the timeout the dirList stays
+        empty, there is no image list until waitForScan finds one.
+        :param timeout: The most seconds to wait
+        """
+        self.scanFound.wait(timeout)
+        self.dirList, self.dirProbabilities = [], []
+        self.takeFound()
+
+    def waitForScan(self) -> bool:
+        """
+        Takes the directories the scan found while there is no image
+        list, and creates it once there is one. In case the scan
+        ended without finding any, the default path is used.
+        Is called from the main thread until it gives True.
+        :return: True if there is an image list
+        """
+        if not self.waiting:
+            return True
+        if not self.takeFound() and self.scanning:
+            return False
+        if len(self.dirList) == 0:
+            # todo add error message if empty
+            self.dirList = [self.config.defaultPath]
+            self.dirProbabilities = [1]
+        self.createImageList()
+        return True
+
+    def takeFound(self) -> bool:
+        """
+        Adds the directories the scan queued to the dirList. In case
+        the scan is done, its end is left for applyScan.
+        :return: True if the dirList has a directory or the scan
+                 is done
+        """
+        scanned, done = self.takeScanned()
+        if done:
+            # left for applyScan to finish the scan
+            self.scanQueue.put((None, self.scanResult))
+        self.dirList.extend(directory for directory, _ in scanned)
+        self.dirProbabilities.extend(count for _, count in scanned)
+        return done or len(self.dirList) > 0
+
+    def takeScanned(self) -> Tuple[List[Tuple[str, int]], bool]:
+        """
+        Takes the directories the scan has queued. Once the end of
+        the scan is taken, its result is kept in scanResult.
+        :return: (directory, supported file count) of every directory,
+                 and True if the scan is done
+        """
+        scanned = []
+        while True:
+            try:
+                directory, item = self.scanQueue.get_nowait()
+            except Empty:
+                return scanned, False
+            if directory is None:
+                self.scanResult = item
+                return scanned, True
+            scanned.append((directory, item))
+
+    def applyScan(self):
+        """
+        Adds the directories the running scan has found to the
+        sampler. Once the scan is done its result is written to the
+        dirList and the file index, which are then opened in place
+        of the old ones. A cancelled or failed scan is not written,
+        the directories it found are only used this session.
+        Is called from the main thread, which owns the sampler and
+        the open dirList and file index. While there is no image
+        list the directories are left for waitForScan.
+        """
+        if self.scanThread is None or self.waiting:
+            return
+        scanned, done = self.takeScanned()
+        for directory, count in scanned:
+            self.imageList.addDirectory(directory, count)
+        if not done:
+            return
+        # the scan thread ends right after queueing its end
+        self.scanThread = None
+        result, self.scanResult = self.scanResult, None
+        if self.scanCancelled.is_set() or result is None:
+            return
+        self.saveDirList(result)
+        self.openDirList()
+
+    def scannedDirs(self) -> Dict[str, Tuple[int, List[str]]]:
+        """
+        Reads the directories of the last scan back from the dirList
+        and the file index. A directory whose file count does not
+        match the index gets no modification time, so it is listed
+        again.
+        :return: directory: (mtime, supported file names), empty if
+                 there is no complete earlier scan
+        """
+        scanned = {}
+        try:
+            with DirList(self.config.dirListPath) as dirList:
+                for directory, count, mtime in dirList.entries():
+                    scanned[directory] = (mtime, count, [])
+            with FileIndex(self.config.fileIndexPath) as fileIndex:
+                for directory, files in fileIndex.directories():
+                    if directory in scanned:
+                        scanned[directory][2].extend(files)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {directory: (mtime if count == len(files) else 0, files)
+                for directory, (mtime, count, files) in scanned.items()}
 
     def openDirList(self):
         """
-        Opens the path list and appends every path and their file
-        count to separate lists. These are later used to choose
-        a random path for image selection.
+        Reads the directories and their file counts from the
+        memory-mapped dirList, they are used to choose a random
+        path for image selection. The map is closed right after,
+        as the sampler keeps its own copy.
 
-        Incase the file does not exist a call
-        will be made to generate it.
+        Incase the file does not exist or is not a supported dirList
+        a call will be made to generate it.
+        If the image list already exists its directories are
+        updated with the new ones.
         """
-        self.dirList.clear()
-        self.dirProbabilities.clear()
         try:
-            with open(self.config.dirListPath, 'r', encoding='utf-8') as file:
-                for dir_, count in map(lambda x: x.split('|'), file):
-                    self.dirList.append(dir_)
-                    self.dirProbabilities.append(int(count))
-            if len(self.dirList) == 0:
-                # todo add error message if empty
-                self.dirList.append(self.config.defaultPath)
-                self.dirProbabilities.append(1)
-        except FileNotFoundError:
+            with DirList(self.config.dirListPath) as dirList:
+                self.dirList = list(dirList)
+                self.dirProbabilities = dirList.counts
+        except (FileNotFoundError, ValueError):
             self.writeDirList()
             self.openDirList()
+            return
+        if len(self.dirList) == 0:
+            # todo add error message if empty
+            self.dirList = [self.config.defaultPath]
+            self.dirProbabilities = [1]
+        self.openFileIndex()
+        if self.imageList is not None:
+            self.imageList.updateDirList(self.dirList, self.dirProbabilities)
+            self.imageList.fileIndex = self.fileIndex
+            self.startFileWatcher()
+
+    def openFileIndex(self):
+        """
+        Memory-maps the file index written alongside the dirList.
+        In case the index does not exist or can't be read, no index
+        is used and images are chosen through the dirList instead.
+        """
+        self.closeFileIndex()
+        try:
+            self.fileIndex = FileIndex(self.config.fileIndexPath)
+        except (FileNotFoundError, ValueError):
+            self.fileIndex = None
+
+    def startFileWatcher(self):
+        """
+        Starts watching the file tree for changes, which keeps
+        the sampler and file index of the image list up to date.
+        A watcher that is already watching the root with the same
+        blacklist keeps running, so the tree is not walked again
+        every time the dirList is opened. Does nothing if the
+        watcher is turned off in the config.
+        """
+        if self.imageList is None or not self.config.fileWatcher:
+            return
+        current = self.imageList.fileWatcher
+        if current is not None and current.running and \
+                current.root == path.abspath(self.rootPath) and \
+                current.blacklist == self.blacklistPattern:
+            # its events before the new dirList are part of it
+            self.imageList.setFileWatcher(current)
+            return
+        fileWatcher = FileWatcher.create(
+            self.rootPath, self.config.supportedFiletype,
+            self.blacklistPattern, self.config.watchInterval)
+        self.imageList.setFileWatcher(fileWatcher)
+        fileWatcher.start()
+
+    def closeFileIndex(self):
+        if self.fileIndex is not None:
+            if self.imageList is not None:
+                self.imageList.fileIndex = None
+            self.fileIndex.close()
+            self.fileIndex = None
 
     @property
     def windowIconPath(self) -> str:
@@ -0,0 +1,179 @@
+from collections import OrderedDict
+from os import stat
+from threading import Lock
+from typing import Dict, Hashable, Tuple
+
+from app.ImagePyramid import ImagePyramid
+
+
+class ImageCache:
+    """
+    ImageCache keeps recently seen images in memory so that going
+    back and forth through the image list does not decode the same
+    images again. Images are keyed by their path and modification
+    time, so a changed file is never served from the cache.
+
+    It has two tiers, each with its own byte budget and least
+    recently used eviction:
+    hot: decoded images with their pyramid, ready to be displayed
+    warm: the encoded file contents, which only need decoding
+
+    Hits and misses are counted for both tiers.
+    The cache is used by the loader threads, every access is
+    guarded by a lock.
+    """
+
+    def __init__(self, hotBudget: int, warmBudget: int):
+        self.hotBudget: int = hotBudget
+        self.warmBudget: int = warmBudget
+        self._hot: OrderedDict[Hashable, Tuple[ImagePyramid, int,
+                                               tuple | None, tuple]] = \
+            OrderedDict()
+        self._warm: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._hotBytes: int = 0
+        self._warmBytes: int = 0
+        self._lock: Lock = Lock()
+        self.hotHits: int = 0
+        self.warmHits: int = 0
+        self.misses: int = 0
+
+    def __repr__(self):
+        rates = self.hitRates
+        return f"ImageCache(hot={self._hotBytes / 1_048_576:.1f} MB, " \
+               f"warm={self._warmBytes / 1_048_576:.1f} MB, " \
+               f"hot hits={rates['hot']:.0%}, " \
+               f"warm hits={rates['warm']:.0%})"
+
+    @staticmethod
+    def key(filePath: str) -> Tuple[str, int] | None:
+        """
+        Creates the cache key of a file.
+        :param filePath: path to the image file
+        :return: (path, mtime), None if the file does not exist
+        """
+        try:
+            return filePath, stat(filePath).st_mtime_ns
+        except OSError:
+            return None
+
+    # ------------------------------ HOT ------------------------------- #
+
+    def getDecoded(self, key: Hashable, displaySize: tuple[int, int] = None
+                   ) -> Tuple[ImagePyramid, tuple[int, int]] | None:
+        """
+        Returns the decoded image if it is stored and it was
+        decoded at least as large as the display size.
+        :param key: cache key
+        :param displaySize: size the image is wanted at, None for full
+        :return: the pyramid of the decoded image and its full
+                 resolution, None on a miss
+        """
+        with self._lock:
+            entry = self._hot.get(key)
+            if entry is None or not self.covers(entry[2], displaySize):
+                return None
+            self._hot.move_to_end(key)
+            self.hotHits += 1
+            return entry[0], entry[3]
+
+    def putDecoded(self, key: Hashable, pyramid: ImagePyramid,
+                   displaySize: tuple[int, int] | None,
+                   fullResolution: tuple[int, int]):
+        """
+        Stores a decoded image with its pyramid, the least recently
+        used images are evicted until it fits inside the hot budget.
+        Images larger than the budget are not stored.
+        :param key: cache key
+        :param pyramid: the pyramid of the decoded image
+        :param displaySize: size the image was decoded for, None for full
+        :param fullResolution: resolution of the image file
+        """
+        size = pyramid.memory
+        if size > self.hotBudget:
+            return
+        with self._lock:
+            old = self._hot.pop(key, None)
+            if old is not None:
+                self._hotBytes -= old[1]
+            self._hot[key] = (pyramid, size, displaySize, fullResolution)
+            self._hotBytes += size
+            while self._hotBytes > self.hotBudget:
+                _, (_, evicted, *_) = self._hot.popitem(last=False)
+                self._hotBytes -= evicted
+
+    @staticmethod
+    def covers(decodedSize: tuple[int, int] | None,
+               displaySize: tuple[int, int] | None) -> bool:
+        """
+        :return: True if an image decoded for decodedSize is large
+                 enough to be displayed at displaySize
+        """
+        if decodedSize is None:
+            return True
+        if displaySize is None:
+            return False
+        return displaySize[0] <= decodedSize[0] and \
+            displaySize[1] <= decodedSize[1]
+
+    # ------------------------------ WARM ------------------------------ #
+
+    def getEncoded(self, key: Hashable) -> bytes | None:
+        """
+        :param key: cache key
+        :return: The encoded file contents, None on a miss
+        """
+        with self._lock:
+            data = self._warm.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._warm.move_to_end(key)
+            self.warmHits += 1
+            return data
+
+    def putEncoded(self, key: Hashable, data: bytes):
+        """
+        Stores the encoded file contents, the least recently used
+        files are evicted until it fits inside the warm budget.
+        Files larger than the budget are not stored.
+        :param key: cache key
+        :param data: file contents
+        """
+        if len(data) > self.warmBudget:
+            return
+        with self._lock:
+            old = self._warm.pop(key, None)
+            if old is not None:
+                self._warmBytes -= len(old)
+            self._warm[key] = data
+            self._warmBytes += len(data)
+            while self._warmBytes > self.warmBudget:
+                _, evicted = self._warm.popitem(last=False)
+                self._warmBytes -= len(evicted)
+
+    # ----------------------------- STATS ------------------------------ #
+
+    @property
+    def hitRates(self) -> Dict[str, float]:
+        """
+        The hit rate of both tiers. The warm tier is only asked
+        when the hot tier misses.
+        :return: {'hot': rate, 'warm': rate}
+        """
+        lookups = self.hotHits + self.warmHits + self.misses
+        warmLookups = self.warmHits + self.misses
+        return {
+            'hot': self.hotHits / lookups if lookups else 0.0,
+            'warm': self.warmHits / warmLookups if warmLookups else 0.0
+        }
+
+    @property
+    def usedBytes(self) -> Dict[str, int]:
+        return {'hot': self._hotBytes, 'warm': self._warmBytes}
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            self._warm.clear()
+            self._hotBytes = 0
+            self._warmBytes = 0
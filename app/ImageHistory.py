@@ -0,0 +1,107 @@
+from typing import Generic, Iterator, List, TypeVar
+
+T = TypeVar('T')
+
+
+class ImageHistory(Generic[T]):
+    """
+    ImageHistory is a ring buffer used as the list of seen images.
+    Items are stored in a fixed size list together with the
+    position of the first item, so appending, removing the first
+    or last item and getting an item at any index are all O(1).
+    A python list needs O(n) to remove its first item, and a deque
+    needs O(n) to get an item in the middle.
+
+    When the buffer is full its size is doubled. If a maxlen is
+    given the buffer starts out at that size, so it never has
+    to grow when the oldest image is removed every time a new
+    image is appended.
+    Removing an item in the middle shifts the shorter side
+    of the buffer.
+    """
+
+    def __init__(self, maxlen: int = None):
+        capacity = 16 if maxlen is None else max(1, maxlen + 1)
+        self._items: List[T | None] = [None] * capacity
+        self._start: int = 0
+        self._length: int = 0
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return f"ImageHistory({list(self)})"
+
+    def __iter__(self) -> Iterator[T]:
+        for index in range(self._length):
+            yield self._items[self._position(index)]
+
+    def __getitem__(self, index: int) -> T:
+        return self._items[self._position(self._normalize(index))]
+
+    def __setitem__(self, index: int, item: T):
+        self._items[self._position(self._normalize(index))] = item
+
+    def __delitem__(self, index: int):
+        """
+        Removes the item at the index. The first and last item
+        are removed in O(1), other items shift the shorter side
+        of the buffer into the gap.
+        :param index:
+        """
+        index = self._normalize(index)
+        if index < self._length // 2:
+            for i in range(index, 0, -1):
+                self._items[self._position(i)] = \
+                    self._items[self._position(i - 1)]
+            self._items[self._start] = None
+            self._start = (self._start + 1) % len(self._items)
+        else:
+            for i in range(index, self._length - 1):
+                self._items[self._position(i)] = \
+                    self._items[self._position(i + 1)]
+            self._items[self._position(self._length - 1)] = None
+        self._length -= 1
+
+    def append(self, item: T):
+        """
+        Adds an item to the end of the history.
+        :param item:
+        """
+        if self._length == len(self._items):
+            self._grow()
+        self._items[self._position(self._length)] = item
+        self._length += 1
+
+    def popleft(self) -> T:
+        """
+        Removes and returns the first item.
+        :return: the oldest item
+        """
+        item = self[0]
+        del self[0]
+        return item
+
+    def clear(self):
+        self._items = [None] * len(self._items)
+        self._start = 0
+        self._length = 0
+
+    def _position(self, index: int) -> int:
+        return (self._start + index) % len(self._items)
+
+    def _normalize(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        return index
+
+    def _grow(self):
+        """
+        Doubles the size of the buffer, the items are copied
+        in order so the first item is at the start again.
+        """
+        items = list(self)
+        self._items = items + [None] * len(items)
+        self._start = 0
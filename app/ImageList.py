@@ -1,12 +1,28 @@
-from os import path, makedirs, walk
-from random import choices, choice
-from shutil import move
-from typing import List
+from collections import deque
+from math import ceil
+from concurrent.futures import Future
+from os import path
+from random import choice, randrange
+from time import perf_counter
+from typing import Deque, List, Tuple
 
 from PIL import Image
 
 from Config import Config
+from app.DirCache import DirCache
+from app.FileIndex import FileIndex
+from app.FileWatcher import FileWatcher
+from app.ImageCache import ImageCache
+from app.ImageHistory import ImageHistory
+from app.ImageLoader import ImageLoader
 from app.ImagePath import ImagePath
+from app.LazyImage import LazyImage
+from app.LoadScheduler import LoadScheduler
+from app.MoveQueue import MoveQueue
+from app.PreviewCache import PreviewCache
+from app.ProcessDecoder import ProcessDecoder
+from app.Renderer import Renderer
+from app.WeightedSampler import WeightedSampler
 
 
 class ImageList:
@@ -18,17 +34,59 @@ class ImageList:
     of the actively referenced image in the list, however
     there are methods to retrieve image regardless of the pointer.
     """
+    # filter of the renders that are shown, and of the quick preview
+    # shown while that render is not done yet
+    RESAMPLE: int = Image.LANCZOS
+    PREVIEW_RESAMPLE: int = Image.NEAREST
+    # the least images loaded to the right and left of the current image
+    MIN_FORWARD: int = 2
+    MIN_BACKWARD: int = 1
+    # seconds of navigation the buffer depth is based on, and the time
+    # the buffer should be ahead of the user on top of the load time
+    NAVIGATION_WINDOW: float = 2
+    LOOKAHEAD: float = 0.25
 
     def __init__(self, config: Config, dirList: List[str],
-                 dirProbabilities: List[int] = None, maxlen: int = None):
+                 dirProbabilities: List[int] = None, maxlen: int = None,
+                 fileIndex: FileIndex = None):
         self.config = config
-        self.dirList: List[str] = dirList
-        self.dirProbabilities: List[int] | None = dirProbabilities
+        self.moveQueue: MoveQueue = MoveQueue(config.moveJournalPath)
+        self.fileIndex: FileIndex | None = fileIndex
+        self.sampler: WeightedSampler = WeightedSampler()
+        self.setDirList(dirList, dirProbabilities)
         self.index: int = 0
         self.maxlen: int = maxlen
-        self.loadBuffer: int = 2
-        self.images: List[ImagePath] = []
-        self.loadedImages: List[Image] = []
+        self.forwardBuffer: int = self.MIN_FORWARD
+        self.backwardBuffer: int = self.MIN_BACKWARD
+        self.navigation: Deque[Tuple[float, int]] = deque(maxlen=32)
+        self.images: ImageHistory[ImagePath] = ImageHistory(maxlen)
+        self.loadedImages: Deque[LazyImage] = deque()
+        self._displaySize: tuple[int, int] | None = None
+        self.cache: ImageCache = ImageCache(config.hotCacheSize,
+                                            config.warmCacheSize)
+        self.previewCache: PreviewCache | None = None
+        if config.previewCache:
+            self.previewCache = PreviewCache(config.previewPath,
+                                             config.previewCacheSize)
+        self.processDecoder: ProcessDecoder | None = None
+        if config.processDecode:
+            # there is always room for a full buffer of images
+            self.processDecoder = ProcessDecoder(
+                config.loadWorkers,
+                max(config.sharedMemorySize, config.bufferMemory))
+        self.loader: ImageLoader = ImageLoader(
+            self.cache, config.loadWorkers, self.previewCache,
+            config.readWorkers, config.readsPerDevice, config.decodeQueueSize,
+            self.processDecoder)
+        self.renderer: Renderer = Renderer(config.renderCacheSize)
+        self.dirCache: DirCache = DirCache(config.supportedFiletype,
+                                           config.dirCacheSize)
+        self.fileWatcher: FileWatcher | None = None
+        self.goneFiles: set[str] = set()
+        self.goneDirs: set[str] = set()
+        self.addedFiles: set[str] = set()
+        # the added files in the order they were reported, to choose from
+        self.addedOrder: List[str] = []
         self.preLoadImages()
 
     def __repr__(self):
@@ -85,28 +143,161 @@ class ImageList:
 
     @property
     def imageIndex(self) -> int:
-        return len(self.loadedImages) - self.loadBuffer - 1
+        return len(self.loadedImages) - self.forwardBuffer - 1
 
     def bufferIndex(self, left: bool = False) -> int:
+        """
+        :param left: True for the left side of the buffer
+        :return: The index in images of the next image to load on
+                 the left of the loaded images, or of the last image
+                 to load on the right
+        """
         if left:
-            return self.index - self.loadBuffer
-        return self.index + self.loadBuffer
+            return self.index - self.imageIndex - 1
+        return self.index + self.forwardBuffer
+
+    @property
+    def cacheStats(self) -> str:
+        """
+        :return: The hit rates of both tiers of the image cache,
+                 empty if nothing was looked up yet
+        """
+        if self.cache.hotHits + self.cache.warmHits + self.cache.misses == 0:
+            return ""
+        rates = self.cache.hitRates
+        return f"cache hits {rates['hot']:.0%} hot, {rates['warm']:.0%} warm"
+
+    @property
+    def bufferStats(self) -> str:
+        """
+        :return: The depth and memory use of the load buffer
+        """
+        backward, forward = self.bufferDepth
+        return f"buffer -{backward}/+{forward}, " \
+               f"{self.bufferMemory / 1_048_576:.1f} MB"
+
+    @property
+    def currentLoaded(self) -> LazyImage:
+        return self.loadedImages[self.imageIndex]
 
     @property
     def currentImage(self) -> Image:
-        return self.loadedImages[self.imageIndex][0]
+        """
+        The decoded current image, waits for the loader in case
+        it is not done decoding yet.
+        :return: current Image object
+        """
+        return self.currentLoaded.image
+
+    def renderCurrent(self, canvasSize: tuple[int, int]) -> Future:
+        """
+        Renders the current image fitted inside the canvas on the
+        render worker.
+        :param canvasSize: (width, height) of the canvas
+        :return: A Future of the resized current image
+        """
+        loadedImage = self.currentLoaded
+        return self.renderer.render(
+            loadedImage, loadedImage.fitSize(canvasSize), self.RESAMPLE)
+
+    def previewCurrent(self, canvasSize: tuple[int, int]) -> Image:
+        """
+        Resizes the current image fitted inside the canvas with
+        nearest neighbour from its pyramid. It is cheap enough to
+        do on the main thread, and is shown until the render
+        from renderCurrent is done.
+        :param canvasSize: (width, height) of the canvas
+        :return: The resized current image
+        """
+        loadedImage = self.currentLoaded
+        return loadedImage.resized(loadedImage.fitSize(canvasSize),
+                                   self.PREVIEW_RESAMPLE)
+
+    @property
+    def renderCost(self) -> float | None:
+        """
+        :return: The average time a render takes in seconds, None
+                 if nothing was rendered yet
+        """
+        return self.renderer.cost
+
+    def preRender(self, canvasSize: tuple[int, int]):
+        """
+        Renders the loaded images around the current image fitted
+        inside the canvas, nearest first, so shifting to them only
+        has to show the render. Renders of images that are no
+        longer loaded are cancelled.
+        :param canvasSize: (width, height) of the canvas
+        """
+        current = self.imageIndex
+        order = sorted(range(len(self.loadedImages)),
+                       key=lambda i: (abs(i - current), i < current))
+        for i in order:
+            loadedImage = self.loadedImages[i]
+            self.renderer.render(loadedImage, loadedImage.fitSize(canvasSize),
+                                 self.RESAMPLE)
+        self.renderer.cancelExcept(loadedImage.imagePath.path
+                                   for loadedImage in self.loadedImages)
 
     @property
     def currentSize(self) -> str:
-        return self.loadedImages[self.imageIndex][1]
+        return self.currentLoaded.fileSize
+
+    @property
+    def currentResolution(self) -> tuple[int, int]:
+        """
+        The full resolution of the current image, read from the
+        image header. It can be larger than the decoded currentImage.
+        :return: (width, height)
+        """
+        return self.currentLoaded.resolution
 
     @property
     def currentInfo(self) -> str:
-        return ImagePath.info(self.currentImage, self.currentSize)
+        return self.currentLoaded.info
 
     @property
     def currentRatio(self) -> float:
-        return ImagePath.ratio(self.currentImage)
+        return self.currentLoaded.ratio
+
+    @property
+    def currentFullImage(self) -> Image:
+        """
+        The current image decoded at full resolution. Only used
+        when the full image is needed, like copying it.
+        :return: current Image object at full resolution
+        """
+        return self.currentLoaded.fullImage()
+
+    # ---------------------------- DISPLAY ---------------------------- #
+
+    @property
+    def displaySize(self) -> tuple[int, int] | None:
+        """
+        The size images are decoded at. None if display
+        resolution decoding is turned off or no size is known yet,
+        in which case images are decoded at full resolution.
+        :return: (width, height) or None
+        """
+        if not self.config.displayDecode:
+            return None
+        return self._displaySize
+
+    @displaySize.setter
+    def displaySize(self, displaySize: tuple[int, int]):
+        """
+        Sets the size images are decoded at. In case the new size
+        is larger than the old size, the loaded images whose decode
+        is too small for it are loaded again.
+        :param displaySize: (width, height)
+        """
+        oldSize = self._displaySize
+        self._displaySize = displaySize
+        if oldSize is not None and displaySize[0] <= oldSize[0] and \
+                displaySize[1] <= oldSize[1]:
+            return
+        if self.displaySize is not None:
+            self.reloadImages()
 
     def moveCurrent(self, movePath):
         """
@@ -115,6 +306,108 @@ class ImageList:
         """
         self.moveImage(self.current, movePath)
 
+    # ---------------------------- BUFFER ----------------------------- #
+
+    @property
+    def bufferDepth(self) -> tuple[int, int]:
+        """
+        :return: (backwardBuffer, forwardBuffer), the amount of images
+                 kept loaded to the left and right of the current image
+        """
+        return self.backwardBuffer, self.forwardBuffer
+
+    @property
+    def bufferMemory(self) -> int:
+        """
+        :return: The bytes taken by the decoded images in the buffer
+        """
+        return sum(loadedImage.memory for loadedImage in self.loadedImages)
+
+    def navigated(self, steps: int):
+        """
+        Records the navigation, adapts the buffer depth to it and
+        gives the loads their new priority.
+        :param steps: positive for steps to the right, negative to the left
+        """
+        self.navigation.append((perf_counter(), steps))
+        self.adaptBuffer()
+        self.prioritizeLoads()
+
+    def adaptBuffer(self):
+        """
+        Adapts the buffer depth to how the user navigates. Each side
+        holds at least the images the user goes through in the time
+        a load takes plus LOOKAHEAD, based on the navigation of the
+        last NAVIGATION_WINDOW seconds, up to maxLoadBuffer images.
+        Users mostly go forward, so the sides are sized separately.
+        In case the decoded images would take more than the buffer
+        memory budget the backward side is shrunk first, then the
+        forward side.
+        A side shrinks by one image per step at most, so the buffer
+        does not drop images it may need again right after.
+        """
+        now = perf_counter()
+        forwardSteps = backwardSteps = 0
+        for moment, steps in self.navigation:
+            if now - moment > self.NAVIGATION_WINDOW:
+                continue
+            if steps > 0:
+                forwardSteps += steps
+            else:
+                backwardSteps -= steps
+        ahead = (self.loader.loadTime or 0) + self.LOOKAHEAD
+        maxDepth = self.config.maxLoadBuffer
+        forward = min(maxDepth, self.MIN_FORWARD + ceil(
+            forwardSteps / self.NAVIGATION_WINDOW * ahead))
+        backward = min(maxDepth, self.MIN_BACKWARD + ceil(
+            backwardSteps / self.NAVIGATION_WINDOW * ahead))
+        forward = max(forward, self.forwardBuffer - 1)
+        backward = max(backward, self.backwardBuffer - 1)
+
+        decoded = [memory for memory in (loadedImage.memory for loadedImage
+                                         in self.loadedImages) if memory > 0]
+        if decoded:
+            perImage = sum(decoded) / len(decoded)
+            fits = max(2, int(self.config.bufferMemory // perImage))
+            if forward + backward + 1 > fits:
+                backward = max(0, fits - 1 - forward)
+                forward = max(1, fits - 1 - backward)
+        self.setBufferDepth(forward, backward)
+
+    def setBufferDepth(self, forward: int, backward: int):
+        """
+        Changes the amount of images loaded on both sides of the
+        current image. Images are unloaded from the ends of the
+        buffer, or loaded next to them, until both sides match.
+        :param forward: images to load to the right
+        :param backward: images to load to the left at most
+        """
+        left = self.imageIndex
+        right = len(self.loadedImages) - left - 1
+        self.forwardBuffer, self.backwardBuffer = forward, backward
+        while right > forward:
+            self.unloadImage(-1)
+            right -= 1
+        while right < forward:
+            index = self.index + right + 1
+            while index >= len(self.images):
+                self.images.append(self.randomImagePath)
+            if not self.pathExistsAt(index):
+                self.removeImage(index)
+                continue
+            self.loadImage(self.imageAt(index))
+            right += 1
+        while left > backward:
+            self.unloadImage(0)
+            left -= 1
+        while left < backward and self.index - left - 1 >= 0:
+            index = self.index - left - 1
+            if not self.pathExistsAt(index):
+                self.removeImage(index)
+                continue
+            self.loadImage(self.imageAt(index), left=True)
+            left += 1
+
     # ---------------------------- SHIFT ------------------------------ #
 
     def nextImage(self, statusCurrent: bool = None):
@@ -137,10 +430,12 @@ class ImageList:
         """
         if statusCurrent is not None:
             self.current.status = statusCurrent
+        self.applyFileEvents()
         self.index += 1
         self.shiftRight()
         if self.maxlen is not None and len(self.images) > self.maxlen:
             self.removeImage(0)
+        self.navigated(1)
 
     def previousImage(self):
         """
@@ -151,54 +446,114 @@ class ImageList:
         """
         if self.index == 0:
             return
+        self.applyFileEvents()
         self.index -= 1
         self.shiftLeft()
+        self.navigated(-1)
 
     def firstImage(self):
         """
         Sets the current image index to be the index of
         the first image.
         """
-        oldIndex = self.index
-        self.index = 0
-        if oldIndex > 0:
+        self.applyFileEvents()
+        if self.index > 0:
             self.loadStart()
+        self.prioritizeLoads()
 
     def lastImage(self):
         """
         Sets the current image index to be the index of
         the last image.
         """
-        oldIndex = self.index
-        self.index = len(self.images) - 1 - self.loadBuffer
-        if oldIndex < len(self.images) - 1 - self.loadBuffer:
+        self.applyFileEvents()
+        if self.index < self.lastIndex:
             self.loadEnd()
+        self.prioritizeLoads()
+
+    def jump(self, steps: int):
+        """
+        Moves the current image index by steps in one go.
+        In case the jump stays within the load buffer it shifts one
+        image at a time, which only loads images that end up in the
+        buffer anyway. Longer jumps move the index at once and load
+        the buffer around the new index with loadWindow, the images
+        that are jumped over are never loaded.
+        New images are appended when jumping past the end of the
+        list, jumping past the start stops at the first image.
+        :param steps: positive to move right, negative to move left
+        """
+        if steps <= self.forwardBuffer and -steps <= self.backwardBuffer:
+            for _ in range(abs(steps)):
+                if steps > 0:
+                    self.nextImage()
+                else:
+                    self.previousImage()
+            return
+        self.applyFileEvents()
+        self.index = max(self.index + steps, 0)
+        while len(self.images) - 1 - self.forwardBuffer < self.index:
+            self.images.append(self.randomImagePath)
+        while self.maxlen is not None and len(self.images) > self.maxlen:
+            self.removeImage(0)
+        self.loadWindow()
+        self.navigated(steps)
+
+    def loadWindow(self):
+        """
+        Loads the images around the current index, clearing the
+        current loadedImages first. The current image is loaded
+        first, then the forwardBuffer images to the right of it and
+        at most backwardBuffer images to the left of it.
+        Images whose path does not exist are removed, in case
+        there are not enough images to the right new ones are
+        appended.
+        """
+        self.unloadImages()
+        offset = 0
+        while offset <= self.forwardBuffer:
+            index = self.index + offset
+            if index >= len(self.images):
+                self.images.append(self.randomImagePath)
+            if not self.pathExistsAt(index):
+                self.removeImage(index)
+                continue
+            self.loadImage(self.imageAt(index))
+            offset += 1
+        offset = 1
+        while offset <= self.backwardBuffer and self.index - offset >= 0:
+            index = self.index - offset
+            if not self.pathExistsAt(index):
+                self.removeImage(index)
+                continue
+            self.loadImage(self.imageAt(index), left=True)
+            offset += 1
 
     def shiftLeft(self):
         """
         Shifts the loadedImage array to the left
         of the image list by one. It acts as a buffer
         for image loading and handling.
-        If the current index is smaller than the loadBuffer
-        it does nothing as it's already loaded everything to
-        the right.
+        The last loaded image is unloaded, as the previous current
+        image is now one of the forwardBuffer images to the right.
+        In case less than backwardBuffer images are loaded to the
+        left, the image to the left of them is loaded, if there is
+        one.
 
         If the path to the left does not exist, it will
         remove the element from the list through removeImage.
-        This reduces the index by 1. It then recursively call
-        shiftLeft until it finds an image that exists.
+        This reduces the index by 1. It then tries the next image
+        to the left until it finds an image that exists.
         """
-        bufferIndex = self.bufferIndex(True)
-
-        if self.index < self.loadBuffer:
-            self.loadedImages.pop()
-            return
-        if not self.pathExistsAt(bufferIndex):
-            self.removeImage(bufferIndex)
-            self.shiftLeft()
-            return
-        self.loadedImages.pop()
-        self.loadImage(self.imageAt(bufferIndex), left=True)
+        self.unloadImage(-1)
+        while self.imageIndex < self.backwardBuffer:
+            bufferIndex = self.bufferIndex(True)
+            if bufferIndex < 0:
+                return
+            if not self.pathExistsAt(bufferIndex):
+                self.removeImage(bufferIndex)
+                continue
+            self.loadImage(self.imageAt(bufferIndex), left=True)
 
     def shiftRight(self):
         """
@@ -206,161 +561,183 @@ class ImageList:
         of the image list by one. It acts as a buffer
         for image loading and handling.
 
-        If the current index is higher than the
-        last index of the list, minus the loadBuffer, it will
-        add a new ImagePath object to the list.
+        If the list does not reach forwardBuffer images past the
+        current index, new ImagePath objects are added to the list.
         If the path at the bufferIndex does not exist, it will
         remove the image and recursively call shiftRight until
         an image that exists is found.
 
-        The image at the bufferIndex is added to LoadedImages
-        If the current index is higher than the loadBuffer it will
-        remove the first element of loadedImages
-
-        might be slightly outdated
+        The image at the bufferIndex is added to LoadedImages.
+        If more than backwardBuffer images are loaded to the left
+        of the current image, the first ones are unloaded.
         """
-        bufferIndex = self.bufferIndex()
-        lastImage = self.index > len(self.images) - 1 - self.loadBuffer
-        if lastImage:
+        while self.bufferIndex() >= len(self.images):
             self.images.append(self.randomImagePath)
+        bufferIndex = self.bufferIndex()
         if not self.pathExistsAt(bufferIndex):
             self.removeImage(bufferIndex)
             self.shiftRight()
             return
-        loadBufferFull = len(self.loadedImages) > 2 * self.loadBuffer + 1
-        if loadBufferFull:
-            self.loadedImages.pop(0)
         self.loadImage(self.imageAt(bufferIndex))
+        while self.imageIndex > self.backwardBuffer:
+            self.unloadImage(0)
 
     def loadStart(self):
         """
-        loads the first loadBuffer + 1 images from the
-        images list. Before loading, it clears the current
-        loadedImages and will add images to loadedImages until
-        its length is either loadBuffer + 1 or it's no longer possible
-        to load enough images from self.images.
-
-        To know what image to load it keeps track of an index.
-        Before loading an image it will check if the path of the
-        ImagePath object at the index exists.
-        If the path does not exist it will remove the image
-        from self.images and try again.
-        If the path exists it will load the image at the index
-        and increment the index it will be looking at by one.
+        Loads the window around the first image, the first image
+        and the forwardBuffer images to the right of it.
+        Images whose path does not exist are removed, in case
+        there are not enough images new ones are appended.
         """
-        self.loadedImages.clear()
-        length = self.loadBuffer + 1
-        index = 0
-        while len(self.loadedImages) != length and \
-                len(self.images) > length:
-            if not self.pathExistsAt(index):
-                self.removeImage(index)
-                continue
-            self.loadImage(self.imageAt(index))
-            index += 1
-        if len(self.images) < length:
-            # todo implement adding new images
-            raise
+        self.index = 0
+        self.loadWindow()
 
     def loadEnd(self):
         """
-        loads the last 2 * loadBuffer + 1 images from the
-        images list. Before loading, it clears the current
-        loadedImages and will add images to loadedImages until its
-        length is either 2 * loadBuffer + 1 or it's no longer possible
-        to load enough images from self.images.
-
-        To know what image to load it keeps track of an index.
-        The index starts at the last position of self.images
-        and will decrease from there.
+        Loads the window around the last image that still has
+        forwardBuffer images to the right of it, together with at
+        most backwardBuffer images to the left of it. In case the
+        list is shorter than that, the window starts at the first
+        image.
+        Images whose path does not exist are removed, in case
+        there are not enough images new ones are appended.
+        """
+        self.index = self.lastIndex
+        self.loadWindow()
 
-        Before loading an image it will check if the path of the
-        ImagePath object at the index exists.
-        If the path does not exist it will remove the image
-        from the list.
-        If the path exists it will load the image at the index.
-        Regardless of removal or loading, the index will
-        always be decreased by 1.
+    @property
+    def lastIndex(self) -> int:
         """
-        self.loadedImages.clear()
-        length = self.loadBuffer * 2 + 1
-        index = len(self.images) - 1
-        while len(self.loadedImages) != length and \
-                len(self.images) > length:
-            if self.pathExistsAt(index):
-                self.loadImage(self.imageAt(index), left=True)
-            else:
-                self.removeImage(index)
-            index -= 1
-        if len(self.images) < length:
-            # todo implement adding new images
-            raise
+        :return: The index of the last image that has forwardBuffer
+                 images to the right of it, 0 if there is none
+        """
+        return max(len(self.images) - 1 - self.forwardBuffer, 0)
 
     # ------------------------- RANDOM IMAGE -------------------------- #
 
+    def setDirList(self, dirList: List[str],
+                   dirProbabilities: List[int] = None):
+        """
+        Replaces the directories that random images are chosen from.
+        The directories are put into a WeightedSampler using the file
+        count as weights. In case the probabilities are None, every
+        directory gets the same weight.
+        :param dirList: List of directories
+        :param dirProbabilities: File count of every directory
+        """
+        self.sampler = WeightedSampler(dirList, dirProbabilities)
+
+    def addDirectory(self, directory: str, count: int):
+        """
+        Adds a directory a running scan found to the sampler, or
+        updates its weight if it is already in it.
+        :param directory: The directory
+        :param count: The amount of supported files in it
+        """
+        if count > 0:
+            self.sampler.add(directory, count)
+
+    def updateDirList(self, dirList: List[str], dirProbabilities: List[int]):
+        """
+        Brings the sampler in line with the directories, only
+        the weights that changed are updated.
+        :param dirList: List of directories
+        :param dirProbabilities: File count of every directory
+        """
+        counts = dict(zip(dirList, dirProbabilities))
+        for directory in [directory for directory in self.sampler
+                          if directory not in counts]:
+            self.sampler.remove(directory)
+        for directory, count in counts.items():
+            if self.sampler.weight(directory) != count or \
+                    directory not in self.sampler:
+                self.sampler.add(directory, count)
+
     @property
     def randomPath(self) -> str:
         """
-        Chooses a random path from the path list using the
+        Chooses a random path from the sampler using the
         file count as probabilities for each path.
-        In case the probabilities is None, it will simply choose
-        a random path.
         :return:
         Str: random path
         """
-        if self.dirProbabilities is not None:
-            return choices(self.dirList, weights=self.dirProbabilities, k=1)[0]
-        return choice(self.dirList)
+        return self.sampler.sample()
 
     @property
     def randomFilePath(self) -> str:
         """
-        Chooses a random file path from the path provided
+        Chooses a random file path.
+        If a file index is available, a random file is chosen from
+        it with indexedFilePath. Otherwise, or in case it fails,
+        a random file is chosen from the path provided
         by randomPath.
-        If the list is empty it will remove the used directory
-        from the list.
-        It will load in all files from the given
-        path and choose a random file from it.
+        The supported files of the directory are retrieved from
+        the dirCache, which only lists the directory again if it
+        has been modified since it was last listed. The weight of the
+        directory in the sampler is then set to the amount of
+        supported files, so its probability follows the real count.
+        If the directory has no supported files it will remove the
+        used directory from the sampler and choose a new directory.
+
         If the pathname of the new image is the exact same as
-        the previous path and there are at least 2 files in the list
-        it will skip to the next iteration. If the length of the
+        the previous path it will choose again. If the length of the
         dirList is 1 and there is only 1 file left, a popup
         indicating this will come (to be implemented).
-        If there is simply 1 file in the files list it will
-        choose a new directory.
-
-        In case the file is a supported file type it will return
-        the file path.
-
-        If the file path is not supported it will try again
-        up till 20 times. In case no supported file is chosen
-        a new call to randomPath will be made.
-        It keeps looping until a supported file is found.
         :return:
         Str: image path
         """
+        if pathString := self.indexedFilePath:
+            return pathString
         while True:
             directory = self.randomPath
-            files = next(walk(directory))[2]
+            files = self.dirCache.files(directory)
             if len(files) == 0:
-                index = self.dirList.index(directory)
-                del self.dirList[index]
-                del self.dirProbabilities[index]
+                self.sampler.remove(directory)
+                self.dirCache.invalidate(directory)
                 # todo raise
                 continue
-            for i in range(20):
-                file = choice(files)
-                pathString = path.join(directory, file)
-                if len(self.images) > 1 and \
-                        pathString == self.images[-1].properPath:
-                    if len(self.dirList) == 1 and len(files) == 1:
-                        return ''
-                        # TODO break this shit cuz this is fucky wucky
-                    elif len(files) == 1:
-                        break
-                    continue
-                if file.endswith(self.config.supportedFiletype):
-                    return pathString
+            self.sampler.update(directory, len(files))
+            pathString = path.join(directory, choice(files))
+            if len(self.images) > 1 and \
+                    pathString == self.images[-1].properPath:
+                if len(self.sampler) == 1 and len(files) == 1:
+                    return ''
+                    # TODO break this shit cuz this is fucky wucky
+                continue
+            return pathString
+
+    @property
+    def indexedFilePath(self) -> str:
+        """
+        Chooses a random file path from the file index, every
+        indexed file has the same probability of being chosen.
+        Files the file watcher reported as created since the index
+        was written are chosen with the same probability.
+        Files that no longer exist, no longer are in a sampled
+        directory or are the same as the previous image are
+        skipped. It tries up till 20 times.
+        While the file watcher is running, the events it reported
+        are used instead of checking if the file exists.
+        :return:
+        Str: image path, empty if no index is available or no
+        usable file was found
+        """
+        if self.fileIndex is None or len(self.fileIndex) == 0:
+            return ''
+        indexLength = len(self.fileIndex)
+        for _ in range(20):
+            pick = randrange(indexLength + len(self.addedOrder))
+            if pick < indexLength:
+                pathString = self.fileIndex[pick]
+            else:
+                pathString = self.addedOrder[pick - indexLength]
+            if len(self.images) > 1 and \
+                    pathString == self.images[-1].properPath:
+                continue
+            if path.dirname(pathString) in self.sampler and \
+                    self.pathExists(pathString):
+                return pathString
+        return ''
 
     @property
     def randomImagePath(self) -> ImagePath:
@@ -377,17 +754,19 @@ class ImageList:
         """
         Pre loads both
         """
-        for _ in range(self.loadBuffer + 1):
+        for _ in range(self.forwardBuffer + 1):
             imagePath: ImagePath = self.randomImagePath
             self.images.append(imagePath)
             self.loadImage(imagePath)
+        self.prioritizeLoads()
 
     def loadImage(self, imagePath: ImagePath, left=False):
         """
         Loads an image object and related information.
-        It takes the Image object and makes a copy of it
-        to store it into memory, it also retrieves the size
-        of the image and stores it.
+        A LazyImage is created for the image, which hands it to the
+        loader to be decoded in the background at about the display
+        size. Its resolution and file size are available without
+        waiting for the decode.
 
         The image is then added to loadedImages.
         If left is True, images are inserted at the start
@@ -396,18 +775,97 @@ class ImageList:
         :param imagePath: Is used to load the image from
         :param left:
         """
-        image: Image = imagePath.image
-        size: str = imagePath.size
-        loadedImage = (image.copy(), size)
+        loadedImage = LazyImage(imagePath, self.loader, self.displaySize)
         if left:
-            self.loadedImages.insert(0, loadedImage)
+            self.loadedImages.appendleft(loadedImage)
         else:
             self.loadedImages.append(loadedImage)
 
+    def prioritizeLoads(self):
+        """
+        Gives every loaded image the priority of its position:
+        the current image first, then the images to the right,
+        then the images to the left, nearest first.
+        Is called after the current index changed.
+        """
+        current = self.imageIndex
+        for i, loadedImage in enumerate(self.loadedImages):
+            if i == current:
+                priority = (LoadScheduler.CURRENT, 0)
+            elif i > current:
+                priority = (LoadScheduler.FORWARD, i - current)
+            else:
+                priority = (LoadScheduler.BACKWARD, current - i)
+            loadedImage.prioritize(priority)
+
+    @property
+    def pendingLoads(self) -> List[Tuple[int, LazyImage]]:
+        """
+        The loaded images that are not decoded yet, with their
+        position relative to the current image.
+        :return: list of (offset, LazyImage), current image first
+        """
+        current = self.imageIndex
+        pending = [(i - current, loadedImage)
+                   for i, loadedImage in enumerate(self.loadedImages)
+                   if not loadedImage.loaded]
+        return sorted(pending, key=lambda item: item[1].priority)
+
+    def unloadImage(self, index: int):
+        """
+        Removes the first or last loaded image from loadedImages.
+        In case the image is still being decoded it is cancelled.
+        :param index: 0 for the first, -1 for the last loaded image
+        """
+        if index == 0:
+            self.loadedImages.popleft().close()
+        else:
+            self.loadedImages.pop().close()
+
+    def unloadImages(self):
+        """
+        Removes all loaded images, cancelling the ones
+        still waiting to be decoded.
+        """
+        for loadedImage in self.loadedImages:
+            loadedImage.close()
+        self.loadedImages.clear()
+
+    def reloadImages(self):
+        """
+        Loads the images in loadedImages again at the current
+        display size, in case their decode is too small for it.
+        As the decode is scaled down in whole or power of two
+        steps, most images still cover a somewhat larger size.
+        Renders of the old decodes are dropped.
+        """
+        reloaded = False
+        for loadedImage in self.loadedImages:
+            if not loadedImage.covers(self.displaySize):
+                loadedImage.load(self.loader, self.displaySize)
+                reloaded = True
+        if reloaded:
+            self.renderer.clear()
+            self.prioritizeLoads()
+
+    def close(self):
+        """
+        Cancels all loads and renders, stops the loader, renderer
+        and file watcher and empties the cache. Waits for the queued
+        moves to be done.
+        """
+        self.setFileWatcher(None)
+        self.renderer.shutdown()
+        self.unloadImages()
+        self.loader.shutdown()
+        self.cache.clear()
+        self.moveQueue.close()
+
     def removeImage(self, index: int):
         """
         Removes ImagePath object from the image list
-        at the specified index
+        at the specified index. Removing the first image, which
+        happens every time maxlen is exceeded, is O(1).
         :param index:
         :return:
         """
@@ -431,22 +889,113 @@ class ImageList:
         :param index:
         :return: a boolean, True if it exists
         """
-        return path.exists(self.imageAt(index).path)
+        return self.pathExists(self.imageAt(index).path)
+
+    def pathExists(self, filePath: str) -> bool:
+        """
+        Checks if the file exists. If the file is inside the tree
+        watched by a running file watcher that has finished its
+        initial snapshot, the events it reported are used instead of
+        checking the file system.
+        :param filePath:
+        :return: a boolean, True if it exists
+        """
+        if self.fileWatcher is None or not self.fileWatcher.running or \
+                not self.fileWatcher.ready.is_set() or \
+                not self.fileWatcher.watches(filePath):
+            return path.exists(filePath)
+        if filePath in self.goneFiles:
+            return False
+        directory = path.dirname(filePath)
+        while self.fileWatcher.watches(directory):
+            if directory in self.goneDirs:
+                return False
+            directory = path.dirname(directory)
+        return True
+
+    # ------------------------- FILE WATCHER -------------------------- #
 
-    @staticmethod
-    def moveImage(imagePath: ImagePath, newPath: str):
+    def setFileWatcher(self, fileWatcher: FileWatcher | None):
+        """
+        Replaces the file watcher, the old one is stopped
+        and everything it reported is forgotten. Passing the
+        current watcher keeps it running and only forgets what
+        it reported, once the dirList was read again.
+        :param fileWatcher: a started FileWatcher, or None
+        """
+        if self.fileWatcher is not None and \
+                self.fileWatcher is not fileWatcher:
+            self.fileWatcher.stop()
+        self.fileWatcher = fileWatcher
+        self.goneFiles.clear()
+        self.goneDirs.clear()
+        self.addedFiles.clear()
+        self.addedOrder.clear()
+
+    def applyFileEvents(self):
+        """
+        Applies the events reported by the file watcher.
+        Created files are added to the sampler and to the files
+        that can be chosen next to the file index, deleted files and
+        directories are marked as gone. Buffered ImagePath objects
+        whose file is gone are removed when they are shifted to.
+
+        In case the watcher lost events it is stopped, and existence
+        is checked on the file system again.
+        """
+        if self.fileWatcher is None:
+            return
+        for kind, eventPath in self.fileWatcher.pendingEvents():
+            directory = path.dirname(eventPath)
+            match kind:
+                case FileWatcher.CREATED:
+                    known = eventPath in self.addedFiles or \
+                        (self.fileIndex is not None and
+                         eventPath in self.fileIndex)
+                    if eventPath in self.goneFiles:
+                        self.goneFiles.discard(eventPath)
+                    elif known:
+                        # reported again, it is already counted
+                        continue
+                    if directory in self.sampler:
+                        self.sampler.increment(directory, 1)
+                    else:
+                        self.sampler.add(directory, 1)
+                    if not known:
+                        self.addedFiles.add(eventPath)
+                        self.addedOrder.append(eventPath)
+                case FileWatcher.DELETED:
+                    self.goneFiles.add(eventPath)
+                    self.sampler.increment(directory, -1)
+                case FileWatcher.DIR_CREATED:
+                    self.goneDirs.discard(eventPath)
+                case FileWatcher.DIR_DELETED:
+                    self.goneDirs.add(eventPath)
+                    self.sampler.remove(eventPath)
+                    self.dirCache.invalidate(eventPath)
+                case FileWatcher.OVERFLOW:
+                    self.setFileWatcher(None)
+                    return
+
+    def moveImage(self, imagePath: ImagePath, newPath: str):
         """
         The method moves an ImagePath object to a new path.
         If the new path is keep or delete, the new path will be
         set to their respective path for the current image.
         If there is no match, the newPath wil be constructed with
-        the directory path and the filename. In this case makedirs is
-        run to make sure that the path exists.
+        the directory path and the filename.
 
-        After that the image is moved from its current path to the
-        new path.
+        After that the move of the image from its current path to the
+        new path is queued on the move queue, which creates the
+        directory of the new path and moves the file in the
+        background. Until then the image points at its old path.
+        A decision for an image whose move has not been done yet
+        replaces or follows that move in the queue.
         In case the new path did not match anything the properPath
         is set to be the new path.
+        The weights of the old and new directory are updated in the
+        sampler, in case they are part of it. If a file watcher is
+        running it reports the move instead.
 
         :param imagePath: the ImagePath object
         :param newPath: The place the image should be moved to
@@ -460,12 +1009,65 @@ class ImageList:
             case _:
                 matched = False
                 newPath = path.join(newPath, imagePath.filename)
-                makedirs(path.dirname(newPath), exist_ok=True)
-        try:
-            move(imagePath.path, newPath)
-        except FileNotFoundError as e:
-            if not path.exists(newPath):
-                # todo add implementation if neither move locations exist
-                raise e
+        oldPath = imagePath.decidedPath
+        self.moveQueue.move(oldPath, newPath, imagePath)
+        if oldPath != newPath:
+            self.moveSampler(oldPath, newPath)
         if not matched:
             imagePath.properPath = newPath
+
+    def moveSampler(self, oldPath: str, newPath: str):
+        if self.fileWatcher is None or not self.fileWatcher.running:
+            self.sampler.increment(path.dirname(oldPath), -1)
+            self.sampler.increment(path.dirname(newPath), 1)
+
+    def undoMoves(self, count: int = 1) -> List[Tuple[ImagePath, bool, bool]]:
+        """
+        Undoes the last moves, newest first. The file is moved back
+        and the image gets the status and proper path it had
+        before it was moved.
+        :param count: The amount of moves to undo
+        :return: (imagePath, status it had, status it has again)
+                 for every undone move
+        """
+        undone = []
+        for task in self.moveQueue.undo(count):
+            imagePath = task.imagePath
+            if imagePath is None:
+                continue
+            self.moveSampler(task.dst, task.src)
+            undone.append((imagePath, imagePath.status, task.previousStatus))
+            imagePath.status = task.previousStatus
+            imagePath.properPath = task.previousProperPath
+        return undone
+
+    def applyFailedMoves(self) -> List[Tuple[ImagePath, bool, bool, OSError]]:
+        """
+        Reverts the moves that failed in the background. The file is
+        still where it was, so the image points at it again and
+        gets the status and proper path it had before it was moved.
+        The sampler is reverted like the move never happened.
+        :return: (imagePath, status it had, status it has again, error)
+                 for every failed move
+        """
+        failed = []
+        for task in self.moveQueue.failedMoves():
+            imagePath = task.imagePath
+            if imagePath is None:
+                continue
+            self.moveSampler(task.dst, task.src)
+            if imagePath.movingFrom == task.src:
+                imagePath.movingFrom = None
+            failed.append((imagePath, imagePath.status, task.previousStatus,
+                           task.error))
+            imagePath.status = task.previousStatus
+            imagePath.properPath = task.previousProperPath
+        return failed
+
+    @property
+    def pendingMoves(self) -> int:
+        return self.moveQueue.pending
+
+    @property
+    def moveProgress(self) -> tuple[int, int] | None:
+        return self.moveQueue.progress
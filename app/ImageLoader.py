@@ -0,0 +1,249 @@
+from concurrent.futures import CancelledError, Future
+from itertools import count
+from os import stat
+from queue import Empty, Full, PriorityQueue
+from threading import BoundedSemaphore, Event, Lock, Thread
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from app.ImageCache import ImageCache
+from app.ImagePath import ImagePath
+from app.ImagePyramid import ImagePyramid
+from app.LoadScheduler import LoadScheduler, LoadTask
+from app.PreviewCache import PreviewCache
+from app.ProcessDecoder import ProcessDecoder
+
+
+class ImageLoader:
+    """
+    ImageLoader decodes images on a pool of worker threads.
+    Loading an image returns a Future right away, so the
+    images around the current image can be decoded in the
+    background while the current image is displayed.
+    Only when the result of a Future is asked for before
+    it is done, the caller has to wait for it.
+
+    Loads are run by a LoadScheduler in order of priority, and
+    can be given a new priority or be cancelled while they wait
+    or run.
+
+    A load gives the ImagePyramid of the decoded image, it is built
+    by the worker that decoded the image. Decoded images with their
+    pyramid and the file contents are kept in an ImageCache, images
+    that are already decoded are returned right away.
+    If a PreviewCache is given, images are read from their preview
+    on disk when possible, and previews are written for images
+    that are decoded from their original file.
+
+    Loading is split in two stages, so reading from a slow drive
+    and decoding overlap. The scheduler runs the read stage, which
+    reads whole files into memory with at most readsPerDevice reads
+    at the same time on one device. The read files are put in a
+    bounded priority queue, which the decode workers take them from
+    in the order of the priority the load had, like the scheduler.
+    In case the decoders fall behind the readers wait, so no more
+    than decodeQueueSize read files are held waiting.
+    If a ProcessDecoder is given, the decode workers hand the
+    decoding to its processes.
+
+    The time from submitting a load until it is done is measured,
+    loadTime is a moving average of it.
+    """
+    # weight of the newest measurement in the moving average
+    LOAD_TIME_WEIGHT: float = 0.25
+    # stops a decode worker, it sorts before every load
+    STOP: tuple = ((-1,), -1, None, None)
+
+    def __init__(self, cache: ImageCache, workers: int = 2,
+                 previewCache: PreviewCache = None, readWorkers: int = 4,
+                 readsPerDevice: int = 2, decodeQueueSize: int = 4,
+                 processDecoder: ProcessDecoder = None):
+        self.cache: ImageCache = cache
+        self.previewCache: PreviewCache | None = previewCache
+        self.processDecoder: ProcessDecoder | None = processDecoder
+        self.loadTime: float | None = None
+        self._loadTimeLock: Lock = Lock()
+        self.readsPerDevice: int = readsPerDevice
+        self._devices: Dict[int, BoundedSemaphore] = {}
+        self._devicesLock: Lock = Lock()
+        self.decodeQueue: PriorityQueue[
+            Tuple[tuple, int, LoadTask | None, tuple | None]] = \
+            PriorityQueue(maxsize=decodeQueueSize)
+        self._decodeOrder = count()
+        self._stop: Event = Event()
+        self.scheduler: LoadScheduler = LoadScheduler(readWorkers,
+                                                      'ImageReader')
+        self._decoders: List[Thread] = [
+            Thread(target=self.decode, name=f"ImageDecoder_{i}", daemon=True)
+            for i in range(workers)]
+        for decoder in self._decoders:
+            decoder.start()
+
+    def submit(self, imagePath: ImagePath,
+               displaySize: tuple[int, int] = None,
+               priority: tuple = (LoadScheduler.SPECULATIVE, 0)) -> Future:
+        """
+        Schedules the image to be decoded by one of the workers.
+        :param imagePath: The image to decode
+        :param displaySize: The size to decode at, None for full size
+        :param priority: (kind, distance) of the load
+        :return: A Future of the ImagePyramid of the decoded image
+        """
+        key = self.cache.key(imagePath.path)
+        if key is not None and \
+                (decoded := self.cache.getDecoded(key, displaySize)):
+            future = Future()
+            imagePath.fullResolution = decoded[1]
+            future.set_result(decoded[0])
+            return future
+        future = self.scheduler.submit(self.load, imagePath, displaySize,
+                                       key, priority=priority,
+                                       name=imagePath.filename)
+        start = perf_counter()
+        future.add_done_callback(
+            lambda done: self.measure(done, perf_counter() - start))
+        return future
+
+    def measure(self, future: Future, elapsed: float):
+        """
+        Adds the time a finished load took to loadTime, cancelled
+        and failed loads are left out.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._loadTimeLock:
+            if self.loadTime is None:
+                self.loadTime = elapsed
+            else:
+                self.loadTime += self.LOAD_TIME_WEIGHT * \
+                    (elapsed - self.loadTime)
+
+    def prioritize(self, future: Future, priority: tuple):
+        self.scheduler.prioritize(future, priority)
+
+    def cancel(self, future: Future):
+        """
+        Cancels the load, a load that already started is stopped
+        before its next step.
+        """
+        self.scheduler.cancel(future)
+
+    @property
+    def pending(self) -> List[Tuple[tuple, str, bool]]:
+        """
+        :return: (priority, filename, running) of every load that
+                 is waiting or running, highest priority first
+        """
+        return self.scheduler.pending()
+
+    def load(self, imagePath: ImagePath, displaySize: tuple[int, int] = None,
+             key: tuple[str, int] = None) -> ImagePyramid | None:
+        """
+        The read stage of a load. The file contents are taken from
+        the warm tier of the cache if they are in memory. Otherwise,
+        the preview on disk is used if there is one that is large
+        enough, which finishes the load, or the file is read and
+        stored in the warm tier. The file contents are handed to
+        the decode stage.
+        In case the load is cancelled while it runs, it stops
+        before reading the file and before decoding it.
+        :param imagePath: The image to decode
+        :param displaySize: The size to decode at, None for full size
+        :param key: The cache key of the image, None to skip the cache
+        :return: The pyramid of the decoded preview, None if the load
+                 was handed to the decode stage
+        """
+        if key is None:
+            return ImagePyramid(imagePath.displayImage(displaySize))
+        data = self.cache.getEncoded(key)
+        if data is None:
+            if self.previewCache is not None and \
+                    (image := self.previewCache.get(imagePath, displaySize)):
+                pyramid = ImagePyramid(image)
+                self.cache.putDecoded(key, pyramid, displaySize,
+                                      imagePath.fullResolution)
+                return pyramid
+            self.scheduler.checkpoint()
+            with self.deviceSlot(imagePath.path):
+                data = imagePath.read()
+            self.cache.putEncoded(key, data)
+        self.scheduler.checkpoint()
+        task = self.scheduler.defer()
+        self.decodeQueue.put((task.priority, next(self._decodeOrder), task,
+                              (imagePath, displaySize, key, data)))
+        return None
+
+    def deviceSlot(self, filePath: str) -> BoundedSemaphore:
+        """
+        :return: The semaphore that limits the reads at the same
+                 time on the device the file is on
+        """
+        try:
+            device = stat(filePath).st_dev
+        except OSError:
+            device = -1
+        with self._devicesLock:
+            if device not in self._devices:
+                self._devices[device] = BoundedSemaphore(self.readsPerDevice)
+            return self._devices[device]
+
+    def decode(self):
+        """
+        The decode stage, run by every decode worker. It decodes the
+        read files at the display size, builds their pyramid and
+        stores it in the hot tier of the cache, and a preview is
+        written in the background.
+        Loads that were cancelled while waiting in the queue are
+        not decoded.
+        """
+        while not self._stop.is_set():
+            _, _, task, item = self.decodeQueue.get()
+            if task is None:
+                return
+            imagePath, displaySize, key, data = item
+            if task.abandoned:
+                self.scheduler.complete(task, exception=CancelledError())
+                continue
+            try:
+                if self.processDecoder is None:
+                    image = imagePath.displayImage(displaySize, data)
+                    pyramid = ImagePyramid(image)
+                else:
+                    image, sharedBytes = self.processDecoder.decode(
+                        imagePath, displaySize, data)
+                    pyramid = ImagePyramid(image, sharedBytes=sharedBytes)
+            except BaseException as e:
+                self.scheduler.complete(task, exception=e)
+                continue
+            self.cache.putDecoded(key, pyramid, displaySize,
+                                  imagePath.fullResolution)
+            if self.previewCache is not None:
+                self.previewCache.fill(imagePath, image)
+            self.scheduler.complete(task, pyramid)
+
+    def shutdown(self):
+        """
+        Stops the workers without waiting for them, images that have
+        not been started reading yet are cancelled, and so are read
+        images that were not decoded yet.
+        """
+        self.scheduler.shutdown()
+        self._stop.set()
+        while True:
+            try:
+                _, _, task, _ = self.decodeQueue.get_nowait()
+            except Empty:
+                break
+            if task is not None:
+                self.scheduler.complete(task, exception=CancelledError())
+        for _ in self._decoders:
+            try:
+                self.decodeQueue.put_nowait(self.STOP)
+            except Full:
+                # a reader filled the queue again, the decoders
+                # stop once they take their next load
+                break
+        if self.processDecoder is not None:
+            self.processDecoder.shutdown()
+        if self.previewCache is not None:
+            self.previewCache.shutdown()
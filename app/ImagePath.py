@@ -1,3 +1,6 @@
+from io import BytesIO
+from math import ceil
+
 from PIL import Image
 from os import path, sep
 
@@ -8,6 +11,10 @@ class ImagePath:
         self.properPath: str = imagePath
         self.deleteDir: str = deleteDir
         self.status: bool = status
+        self.fullResolution: tuple[int, int] | None = None
+        self.imageFormat: str | None = None
+        # where the file is while a queued move of it is not done
+        self.movingFrom: str | None = None
 
     def __repr__(self):
         return f"ImagePath({self.properPath}, status={self.status})"
@@ -32,6 +39,87 @@ class ImagePath:
             # todo make it do something
             raise
 
+    def displayImage(self, displaySize: tuple[int, int] = None,
+                     data: bytes = None) -> Image:
+        """
+        Decodes the image at about the resolution it will be
+        displayed at. The full resolution from the image header is
+        stored in fullResolution before decoding.
+
+        JPEG images use draft, which lets the decoder scale the
+        image down by 1/2, 1/4 or 1/8 while decoding. Other formats
+        are decoded and then reduced by the largest whole factor
+        that keeps the image at least as large as the display size.
+        The decoded image is never smaller than the image would be
+        when fitted into the display size.
+        The image is only copied if the file is still open after
+        decoding, which is the case for animated images.
+
+        In case displaySize is None the image is decoded at
+        full resolution. If data is given the image is decoded from
+        it instead of the file.
+        :param displaySize: (width, height) the image is displayed in
+        :param data: The encoded contents of the image file
+        :return: A decoded Pillow Image object, the file is closed
+        """
+        image = self.image if data is None else Image.open(BytesIO(data))
+        try:
+            self.fullResolution = image.size
+            self.imageFormat = image.format
+            target = self.fitSize(image.size, displaySize)
+            if target is not None and image.format == 'JPEG':
+                image.draft(image.mode, target)
+            image.load()
+            if target is not None and image.mode not in ('1', 'P'):
+                factor = min(image.width // target[0],
+                             image.height // target[1])
+                if factor > 1:
+                    return image.reduce(factor)
+            if getattr(image, 'fp', None) is None:
+                # load closed the file, the image can be used as is
+                return image
+            return image.copy()
+        finally:
+            # closing a loaded image releases its pixels, so only
+            # the file is closed if the image itself is returned
+            if getattr(image, 'fp', None) is not None:
+                image.close()
+
+    def header(self) -> tuple[tuple[int, int], str | None]:
+        """
+        Reads the resolution and format from the image header
+        without decoding the image. The file is closed right away.
+        If the image has already been decoded the stored values
+        are used instead.
+        :return: ((width, height), format)
+        """
+        if self.fullResolution is None or self.imageFormat is None:
+            with self.image as image:
+                self.fullResolution = image.size
+                self.imageFormat = image.format
+        return self.fullResolution, self.imageFormat
+
+    @staticmethod
+    def fitSize(resolution: tuple[int, int],
+                displaySize: tuple[int, int] | None
+                ) -> tuple[int, int] | None:
+        """
+        Calculates the size of the image when fitted inside the
+        display size while keeping its ratio.
+        :param resolution: (width, height) of the image
+        :param displaySize: (width, height) of the display
+        :return: The fitted size, None if the image is not larger
+                 than the display or there is no display size
+        """
+        if displaySize is None or min(displaySize) <= 0:
+            return None
+        scale = min(displaySize[0] / resolution[0],
+                    displaySize[1] / resolution[1])
+        if scale >= 1:
+            return None
+        return (max(1, ceil(resolution[0] * scale)),
+                max(1, ceil(resolution[1] * scale)))
+
     # ----------------------------- PATHS ------------------------------- #
 
     @property
@@ -91,10 +179,24 @@ class ImagePath:
         """
         If the image has not been deleted it returns the
         proper path. In case the image has been deleted
-        it will return the delete path
+        it will return the delete path.
+        While the image is waiting to be moved, it returns
+        the path the file is still at.
 
         :return: the current path to the image
         """
+        if self.movingFrom is not None:
+            return self.movingFrom
+        return self.decidedPath
+
+    @property
+    def decidedPath(self) -> str:
+        """
+        The path the image is at once its queued moves are done.
+        It is the proper path unless the image has been deleted.
+
+        :return: the path the status of the image points at
+        """
         if self.status is not False:
             return self.properPath
         return self.deletePath
@@ -145,6 +247,16 @@ class ImagePath:
         """
         self._status = newStatus
 
+    def read(self) -> bytes:
+        """
+        Reads the encoded contents of the image file. The file is
+        opened unbuffered, so it is read in one large read of its
+        whole size instead of in blocks.
+        :return: the file contents
+        """
+        with open(self.path, 'rb', buffering=0) as file:
+            return file.read()
+
     @property
     def size(self) -> str:
         """
@@ -171,14 +283,14 @@ class ImagePath:
         return image.size
 
     @staticmethod
-    def ratio(image: Image) -> float:
+    def ratio(resolution: tuple[int, int]) -> float:
         """
         :return: The ratio of the image resolution
         """
-        return image.width / image.height
+        return resolution[0] / resolution[1]
 
     @staticmethod
-    def info(image: Image, size: str) -> str:
-        return f"res: {image.width} x {image.height}\n" \
+    def info(resolution: tuple[int, int], size: str) -> str:
+        return f"res: {resolution[0]} x {resolution[1]}\n" \
                f"size: {size}"
 
@@ -0,0 +1,82 @@
+from typing import List
+
+from PIL import Image
+
+
+class ImagePyramid:
+    """
+    ImagePyramid holds an image together with versions of it at
+    1/2, 1/4 and 1/8 of its size. Resizing starts from the smallest
+    level that is still at least as large as the target size, so
+    a resize never has to go through every pixel of the full
+    image when the target is much smaller.
+
+    Levels are made with reduce, which averages blocks of pixels
+    and is much cheaper than a resize. Levels smaller than
+    minSize are not made.
+
+    In case the image is a view on shared memory, sharedBytes is
+    the size of the memory it takes instead of its pixels.
+    """
+    LEVELS: int = 4
+
+    def __init__(self, image: Image, minSize: int = 64,
+                 sharedBytes: int = 0):
+        self.sharedBytes: int = sharedBytes
+        self.levels: List[Image] = [image]
+        level = image
+        while len(self.levels) < self.LEVELS and \
+                min(level.width, level.height) // 2 >= minSize:
+            if level.mode in ('1', 'P'):
+                level = level.resize((level.width // 2, level.height // 2),
+                                     Image.NEAREST)
+            else:
+                level = level.reduce(2)
+            self.levels.append(level)
+
+    @property
+    def image(self) -> Image:
+        """
+        :return: The image at the largest level
+        """
+        return self.levels[0]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.image.size
+
+    @property
+    def memory(self) -> int:
+        """
+        :return: An estimate of the memory used by the pixels
+                 of every level
+        """
+        levels = self.levels[1:] if self.sharedBytes else self.levels
+        return self.sharedBytes + sum(
+            level.width * level.height * len(level.getbands())
+            for level in levels)
+
+    def levelFor(self, size: tuple[int, int]) -> Image:
+        """
+        :param size: (width, height) the image will be resized to
+        :return: The smallest level at least as large as size
+        """
+        for level in reversed(self.levels):
+            if level.width >= size[0] and level.height >= size[1]:
+                return level
+        return self.image
+
+    def resize(self, size: tuple[int, int], resample: int = None) -> Image:
+        """
+        Resizes the image starting from the nearest level
+        above the target size.
+        :param size: (width, height)
+        :param resample: Pillow resampling filter, None for the default
+        :return: The resized image
+        """
+        level = self.levelFor(size)
+        if level.size == size:
+            return level
+        if resample is None:
+            return level.resize(size)
+        return level.resize(size, resample)
@@ -0,0 +1,218 @@
+from concurrent.futures import CancelledError, Future
+
+from PIL import Image
+
+from app.ImageLoader import ImageLoader
+from app.ImagePath import ImagePath
+from app.ImagePyramid import ImagePyramid
+from app.LoadScheduler import LoadScheduler
+
+
+class LazyImage:
+    """
+    LazyImage is a handle to an image in the load buffer of the
+    ImageList. The pixels are decoded by the ImageLoader, while the
+    width, height and format are read from the image header.
+    Asking for the metadata never waits for the pixels to be
+    decoded, only the image property does.
+
+    The loader gives the ImagePyramid of the decoded image, which
+    is built by the worker that decoded it and is used to resize
+    the image for display.
+
+    Files are only opened inside a with statement or by a
+    decode that closes them when it is done, a LazyImage never
+    holds on to an open file. Closing it cancels the decode
+    and drops the pixels.
+    """
+
+    def __init__(self, imagePath: ImagePath, loader: ImageLoader,
+                 displaySize: tuple[int, int] = None,
+                 priority: tuple = (LoadScheduler.SPECULATIVE, 0)):
+        self.imagePath: ImagePath = imagePath
+        self.loader: ImageLoader = loader
+        self.priority: tuple = priority
+        self.fileSize: str = imagePath.size
+        self._resolution: tuple[int, int] | None = None
+        self._format: str | None = None
+        self._future: Future | None = None
+        self.load(loader, displaySize)
+
+    def __repr__(self):
+        return f"LazyImage({self.imagePath.properPath}, " \
+               f"loaded={self.loaded})"
+
+    # ---------------------------- HEADER ----------------------------- #
+
+    @property
+    def resolution(self) -> tuple[int, int]:
+        """
+        The full resolution of the image, read from the header.
+        :return: (width, height)
+        """
+        if self._resolution is None:
+            self.readHeader()
+        return self._resolution
+
+    @property
+    def width(self) -> int:
+        return self.resolution[0]
+
+    @property
+    def height(self) -> int:
+        return self.resolution[1]
+
+    @property
+    def format(self) -> str | None:
+        if self._resolution is None:
+            self.readHeader()
+        return self._format
+
+    @property
+    def ratio(self) -> float:
+        return ImagePath.ratio(self.resolution)
+
+    @property
+    def info(self) -> str:
+        return ImagePath.info(self.resolution, self.fileSize)
+
+    def fitSize(self, canvasSize: tuple[int, int]) -> tuple[int, int]:
+        """
+        The largest size the image fits inside the canvas at,
+        keeping its ratio.
+        :param canvasSize: (width, height) of the canvas
+        :return: (width, height)
+        """
+        canvasWidth, canvasHeight = canvasSize
+        ratio = self.ratio
+        if canvasWidth / canvasHeight > ratio:  # canvas is wider
+            return int(canvasHeight * ratio), canvasHeight
+        return canvasWidth, int(canvasWidth / ratio)
+
+    def readHeader(self):
+        """
+        Reads the resolution and format from the image header.
+        """
+        self._resolution, self._format = self.imagePath.header()
+
+    # ---------------------------- PIXELS ----------------------------- #
+
+    @property
+    def loaded(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    @property
+    def decoded(self) -> bool:
+        """
+        :return: True if the image is decoded without errors
+        """
+        future = self._future
+        return future is not None and future.done() and \
+            not future.cancelled() and future.exception() is None
+
+    @property
+    def decode(self) -> Future | None:
+        """
+        :return: The future of the decode, None if the image is closed
+        """
+        return self._future
+
+    @property
+    def image(self) -> Image:
+        """
+        The decoded image, waits for the loader in case it is
+        not done decoding yet.
+        :return: The decoded Image object
+        :raises CancelledError: In case the image was closed
+        """
+        return self.pyramid.image
+
+    @property
+    def memory(self) -> int:
+        """
+        The bytes taken by the decoded image and its pyramid.
+        :return: bytes, 0 if the image is not decoded
+        """
+        if not self.decoded:
+            return 0
+        return self._future.result().memory
+
+    @property
+    def pyramid(self) -> ImagePyramid:
+        """
+        The pyramid of the decoded image, waits for the loader in
+        case it is not done decoding yet.
+        :return: ImagePyramid of the decoded image
+        :raises CancelledError: In case the image was closed
+        """
+        future = self._future
+        if future is None:
+            raise CancelledError("the image is closed")
+        return future.result()
+
+    def resized(self, size: tuple[int, int], resample: int = None) -> Image:
+        """
+        Resizes the decoded image from the nearest pyramid level.
+        :param size: (width, height)
+        :param resample: Pillow resampling filter, None for the default
+        :return: The resized image
+        """
+        return self.pyramid.resize(size, resample)
+
+    def fullImage(self) -> Image:
+        """
+        The image decoded at full resolution. In case the
+        decoded image already is at full resolution it is reused.
+        :return: The Image object at full resolution
+        """
+        image = self.image
+        if image.size == self.resolution:
+            return image
+        return self.imagePath.displayImage()
+
+    def covers(self, displaySize: tuple[int, int] | None) -> bool:
+        """
+        Checks if the decoded image is large enough to be shown
+        fitted inside the display size.
+        :param displaySize: (width, height), None for full size
+        :return: True if the image is decoded and large enough
+        """
+        if not self.decoded:
+            return False
+        size = self._future.result().size
+        target = ImagePath.fitSize(self.resolution, displaySize)
+        if target is None:
+            return size == self.resolution
+        return size[0] >= target[0] and size[1] >= target[1]
+
+    def load(self, loader: ImageLoader, displaySize: tuple[int, int] = None):
+        """
+        Hands the image to the loader to be decoded at the
+        display size, an earlier decode is cancelled.
+        :param loader: The loader that decodes the image
+        :param displaySize: The size to decode at, None for full size
+        """
+        if self._future is not None:
+            self.loader.cancel(self._future)
+        self.loader = loader
+        self._future = loader.submit(self.imagePath, displaySize,
+                                     self.priority)
+
+    def prioritize(self, priority: tuple):
+        """
+        Changes the priority of the decode, in case it has not
+        started yet.
+        :param priority: (kind, distance)
+        """
+        self.priority = priority
+        if self._future is not None and not self._future.done():
+            self.loader.prioritize(self._future, priority)
+
+    def close(self):
+        """
+        Cancels the decode, or stops it if it already started,
+        and releases the decoded pixels.
+        """
+        if self._future is not None:
+            self.loader.cancel(self._future)
+            self._future = None
@@ -0,0 +1,189 @@
+from concurrent.futures import CancelledError, Future
+from heapq import heappop, heappush
+from itertools import count
+from threading import Condition, Thread, local
+from typing import Callable, List, Tuple
+
+
+class LoadTask:
+    """
+    A function scheduled on the LoadScheduler together with the
+    Future of its result. abandoned is set when the task is
+    cancelled while it is already running.
+    """
+
+    def __init__(self, fn: Callable, args: tuple, priority: tuple,
+                 name: str = ''):
+        self.fn: Callable = fn
+        self.args: tuple = args
+        self.priority: tuple = priority
+        self.name: str = name
+        self.future: Future = Future()
+        self.running: bool = False
+        self.abandoned: bool = False
+        self.deferred: bool = False
+
+
+class LoadScheduler:
+    """
+    LoadScheduler runs loads on a pool of worker threads in order
+    of priority, instead of in the order they were submitted.
+    A priority is a (kind, distance) tuple, where kind is one of
+    CURRENT, FORWARD, BACKWARD or SPECULATIVE and distance is how
+    far the image is from the current image. Lower runs first.
+
+    The priority of a waiting load can be changed when the user
+    navigates, and loads can be cancelled. A waiting load is
+    cancelled right away, a running load is abandoned: it stops
+    at the next checkpoint its function reaches and its Future
+    raises CancelledError.
+
+    A load can hand its remaining work to another stage with defer,
+    the worker is then free for the next load while the load stays
+    pending until the other stage calls complete.
+    """
+    CURRENT: int = 0
+    FORWARD: int = 1
+    BACKWARD: int = 2
+    SPECULATIVE: int = 3
+
+    def __init__(self, workers: int = 2, name: str = 'LoadScheduler'):
+        self._queue: List[Tuple[tuple, int, LoadTask]] = []
+        self._tasks: dict[Future, LoadTask] = {}
+        self._order = count()
+        self._condition: Condition = Condition()
+        self._local = local()
+        self._shutdown: bool = False
+        self._threads: List[Thread] = [
+            Thread(target=self.work, name=f"{name}_{i}", daemon=True)
+            for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args,
+               priority: tuple = (SPECULATIVE, 0), name: str = '') -> Future:
+        """
+        Schedules fn(*args) to run at the priority.
+        :param fn: The function to run
+        :param priority: (kind, distance)
+        :param name: Describes the load in pending
+        :return: The Future of the result of fn
+        """
+        task = LoadTask(fn, args, priority, name)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new loads after shutdown')
+            self._tasks[task.future] = task
+            heappush(self._queue, (priority, next(self._order), task))
+            self._condition.notify()
+        return task.future
+
+    def prioritize(self, future: Future, priority: tuple):
+        """
+        Changes the priority of a load that has not started yet.
+        The old entry stays in the queue and is skipped once it
+        comes up, as its priority no longer matches the task.
+        """
+        with self._condition:
+            task = self._tasks.get(future)
+            if task is None or task.running or task.priority == priority:
+                return
+            task.priority = priority
+            heappush(self._queue, (priority, next(self._order), task))
+            self._condition.notify()
+
+    def cancel(self, future: Future) -> bool:
+        """
+        Cancels the load, a running load is abandoned.
+        :return: True if the load was waiting or running
+        """
+        with self._condition:
+            task = self._tasks.pop(future, None)
+            if task is None:
+                return False
+            if task.running:
+                task.abandoned = True
+                return True
+        return future.cancel()
+
+    def checkpoint(self):
+        """
+        Is called by a load in between its steps, raises
+        CancelledError if the load was abandoned.
+        """
+        task = getattr(self._local, 'task', None)
+        if task is not None and task.abandoned:
+            raise CancelledError()
+
+    def defer(self) -> LoadTask:
+        """
+        Is called by a load to finish it outside of the worker.
+        The result of the function is then ignored, the Future is
+        only done once complete is called with the returned task.
+        :return: The task of the load that is running
+        """
+        task = self._local.task
+        task.deferred = True
+        return task
+
+    def complete(self, task: LoadTask, result=None,
+                 exception: BaseException = None):
+        """
+        Finishes a deferred load. An abandoned load raises
+        CancelledError regardless of its result.
+        """
+        with self._condition:
+            if self._tasks.get(task.future) is task:
+                del self._tasks[task.future]
+        if task.abandoned:
+            task.future.set_exception(CancelledError())
+        elif exception is not None:
+            task.future.set_exception(exception)
+        else:
+            task.future.set_result(result)
+
+    def pending(self) -> List[Tuple[tuple, str, bool]]:
+        """
+        :return: (priority, name, running) of every load that is
+                 waiting or running, highest priority first
+        """
+        with self._condition:
+            return sorted((task.priority, task.name, task.running)
+                          for task in self._tasks.values())
+
+    def work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if self._shutdown:
+                    return
+                priority, _, task = heappop(self._queue)
+                if task.running or priority != task.priority or \
+                        self._tasks.get(task.future) is not task or \
+                        not task.future.set_running_or_notify_cancel():
+                    continue
+                task.running = True
+            self._local.task = task
+            try:
+                result = task.fn(*task.args)
+            except BaseException as e:
+                self.complete(task, exception=e)
+            else:
+                if not task.deferred:
+                    self.complete(task, result)
+            finally:
+                self._local.task = None
+
+    def shutdown(self):
+        """
+        Stops the workers, loads that have not started are cancelled.
+        """
+        with self._condition:
+            self._shutdown = True
+            for task in self._tasks.values():
+                if not task.running:
+                    task.future.cancel()
+            self._tasks.clear()
+            self._queue.clear()
+            self._condition.notify_all()
@@ -0,0 +1,107 @@
+import mmap
+import struct
+from array import array
+from os import replace
+from typing import List, Tuple
+
+
+class MappedFile:
+    """
+    MappedFile is the base of the on-disk files that are
+    memory-mapped when opened, the dirList and the file index.
+    It checks the header and size of the file and gives out
+    memoryviews on the sections behind the header, which are read
+    without being parsed.
+
+    The header is: magic, version and three uint64 counts, their
+    meaning is up to the file. The sections follow it back to back.
+    """
+    MAGIC: bytes = b''
+    VERSION: int = 1
+    HEADER: struct.Struct = struct.Struct('=4sIQQQ')
+    # the name of the file in error messages
+    NAME: str = 'file'
+
+    def __init__(self, filename: str):
+        self.filename: str = filename
+        self._views: List[memoryview] = []
+        self._file = open(filename, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        if len(self._mmap) < self.HEADER.size:
+            self.close()
+            raise ValueError(f"{filename} is not a supported {self.NAME}")
+        magic, version, *counts = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"{filename} is not a supported {self.NAME}")
+        self.header: Tuple[int, int, int] = tuple(counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def sections(self, *sections: Tuple[str, int]) -> List[memoryview]:
+        """
+        Maps the sections that follow the header. The file has to end
+        right after the last section.
+        :param sections: (format, item count) of every section
+        :return: A view cast to the format of every section
+        """
+        size = self.HEADER.size + sum(
+            struct.calcsize(form) * count for form, count in sections)
+        if len(self._mmap) != size:
+            self.damaged()
+        view = memoryview(self._mmap)
+        self._views.append(view)
+        views = []
+        start = self.HEADER.size
+        for form, count in sections:
+            end = start + struct.calcsize(form) * count
+            views.append(view[start:end].cast(form))
+            start = end
+        self._views.extend(views)
+        return views
+
+    def damaged(self):
+        """
+        Closes the file and raises the error for a file whose
+        sections don't match its header.
+        """
+        self.close()
+        raise ValueError(f"{self.filename} is cut off or damaged")
+
+    def close(self):
+        """
+        Releases the views and closes the memory map and file.
+        Needs to be called before the file is rewritten.
+        """
+        # the sections are views on the first view
+        while self._views:
+            self._views.pop().release()
+        if hasattr(self, '_mmap') and not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    @classmethod
+    def writeFile(cls, filename: str, counts: Tuple[int, int, int],
+                  *sections: array | bytes | bytearray):
+        """
+        Writes the header and sections to a temporary file and
+        replaces the old file with it once it is complete.
+        :param filename: The path of the file
+        :param counts: The counts of the header
+        :param sections: The sections in the order they are mapped
+        """
+        temporary = f"{filename}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, *counts))
+            for section in sections:
+                file.write(section)
+        replace(temporary, filename)
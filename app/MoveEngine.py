@@ -0,0 +1,113 @@
+from errno import EXDEV
+from hashlib import blake2b
+from os import fsync, makedirs, path, replace, stat, unlink
+from shutil import copystat
+from threading import Lock
+from typing import Callable, Dict
+
+
+class MoveEngine:
+    """
+    MoveEngine moves files, by renaming them when the destination is
+    on the same device as the file and by copying them otherwise.
+
+    The device of a destination directory is looked up once and
+    cached, a directory that does not exist yet gets the device of
+    its nearest existing parent.
+
+    A copy is streamed in chunks to a temporary file next to the
+    destination, while a checksum of the file is kept. The copy is
+    synced to disk, read back and checked against the checksum
+    before it replaces the destination and the file is removed.
+    A copy that fails leaves the file where it was.
+
+    Either way an existing file at the destination is replaced,
+    on every platform.
+    """
+    CHUNK: int = 1_048_576
+    PART: str = '.part'
+
+    def __init__(self):
+        self._devices: Dict[str, int] = {}
+        self._lock: Lock = Lock()
+
+    def device(self, directory: str) -> int:
+        """
+        :param directory: A directory, it does not have to exist
+        :return: The device ID of the directory
+        """
+        with self._lock:
+            device = self._devices.get(directory)
+        if device is not None:
+            return device
+        existing = directory
+        while not path.exists(existing) and path.dirname(existing) != existing:
+            existing = path.dirname(existing)
+        device = stat(existing).st_dev
+        if existing == directory:
+            # only cached once it exists, it may be created on
+            # another device than its parent
+            with self._lock:
+                self._devices[directory] = device
+        return device
+
+    def sameDevice(self, src: str, dst: str) -> bool:
+        return stat(src).st_dev == self.device(path.dirname(dst))
+
+    def move(self, src: str, dst: str,
+             progress: Callable[[int, int], None] = None):
+        """
+        Moves the file, with a rename on the same device and a
+        verified copy across devices. A file at dst is replaced.
+        :param src: Where the file is
+        :param dst: Where the file is moved to
+        :param progress: Is called with (copied, total) bytes while
+                         the file is copied
+        """
+        makedirs(path.dirname(dst), exist_ok=True)
+        if self.sameDevice(src, dst):
+            try:
+                replace(src, dst)
+                return
+            except OSError as e:
+                if e.errno != EXDEV:
+                    raise
+        self.copy(src, dst, progress)
+        unlink(src)
+
+    def copy(self, src: str, dst: str,
+             progress: Callable[[int, int], None] = None):
+        """
+        Copies the file through a temporary file that is checked
+        against the checksum of the file before it is renamed to dst.
+        """
+        part = dst + self.PART
+        total = stat(src).st_size
+        checksum = blake2b()
+        copied = 0
+        try:
+            with open(src, 'rb', buffering=0) as source, \
+                    open(part, 'wb', buffering=0) as target:
+                while chunk := source.read(self.CHUNK):
+                    checksum.update(chunk)
+                    target.write(chunk)
+                    copied += len(chunk)
+                    if progress is not None:
+                        progress(copied, total)
+                fsync(target.fileno())
+            if copied != total or self.checksum(part) != checksum.digest():
+                raise OSError(f"copy of {src} to {dst} does not match")
+            copystat(src, part)
+            replace(part, dst)
+        except BaseException:
+            if path.exists(part):
+                unlink(part)
+            raise
+
+    @classmethod
+    def checksum(cls, filePath: str) -> bytes:
+        checksum = blake2b()
+        with open(filePath, 'rb', buffering=0) as file:
+            while chunk := file.read(cls.CHUNK):
+                checksum.update(chunk)
+        return checksum.digest()
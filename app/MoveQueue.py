@@ -0,0 +1,387 @@
+import json
+from collections import deque
+from functools import partial
+from os import fsync, makedirs, path
+from queue import Queue, Empty
+from threading import Lock, Thread
+from time import time_ns
+from typing import Deque, Dict, List
+
+from app.ImagePath import ImagePath
+from app.MoveEngine import MoveEngine
+
+
+class MoveTask:
+    """
+    A move of a file from src to dst in the MoveQueue. The status
+    and proper path the ImagePath had before the move are kept, so
+    the decision that caused the move can be undone.
+    """
+    QUEUED: str = 'queued'
+    RUNNING: str = 'running'
+    DONE: str = 'done'
+    CANCELLED: str = 'cancelled'
+    FAILED: str = 'failed'
+
+    def __init__(self, taskId: int, src: str, dst: str,
+                 imagePath: ImagePath = None):
+        self.taskId: int = taskId
+        self.src: str = src
+        self.dst: str = dst
+        self.imagePath: ImagePath | None = imagePath
+        self.previousStatus: bool | None = None
+        self.previousProperPath: str | None = None
+        if imagePath is not None:
+            self.previousStatus = imagePath.status
+            self.previousProperPath = imagePath.properPath
+        self.state: str = self.QUEUED
+        # the running move of the same image whose destination is src
+        self.after: MoveTask | None = None
+        self.error: OSError | None = None
+        # bytes copied of the file, in case it is moved to another device
+        self.copied: int = 0
+        self.size: int = 0
+
+    def __repr__(self):
+        return f"MoveTask({self.taskId}, {self.src} -> {self.dst}, " \
+               f"{self.state})"
+
+
+class MoveQueue:
+    """
+    MoveQueue moves files on a background thread, in the order they
+    were queued, so keeping or deleting an image does not wait for
+    the file to be moved.
+
+    Every move is written to a journal before it is done and marked
+    done after, the journal is synced to disk once per batch of
+    moves instead of once per move. In case the app stops while
+    moves are not done, they are done when the journal is replayed
+    by the worker on the next start, before the moves queued since.
+    The journal is emptied once every move in it is done.
+
+    The last moves are kept in history, undoing the last n moves
+    takes them from the end of it. A move that has not started yet
+    is cancelled, a move that already happened is moved back.
+
+    While a move is not done, the ImagePath it belongs to points at
+    the file where it is, through movingFrom. A new decision for an
+    image whose move has not started replaces that move, a decision
+    for an image whose move is running moves the file on after it.
+    A move that failed is
+    handed out once by failedMoves, so the decision can be reverted
+    by the thread that owns the ImagePath.
+
+    The files are moved by a MoveEngine, which renames them on the
+    same device and copies them to another device.
+    """
+    # the most moves that share a sync of the journal
+    BATCH: int = 32
+
+    def __init__(self, journalPath: str, history: int = 100,
+                 engine: MoveEngine = None):
+        self.journalPath: str = journalPath
+        self.engine: MoveEngine = engine or MoveEngine()
+        self.running: MoveTask | None = None
+        self.history: Deque[MoveTask] = deque(maxlen=history)
+        self._failed: Queue[MoveTask] = Queue()
+        self._queue: Queue[MoveTask | None] = Queue()
+        self._lock: Lock = Lock()
+        # the moves of earlier sessions in the journal never share
+        # an id with a move of this session
+        self._nextId: int = time_ns()
+        self._pending: int = 0
+        # the last move of an image that is not done yet
+        self._latest: Dict[ImagePath, MoveTask] = {}
+        makedirs(path.dirname(path.abspath(journalPath)), exist_ok=True)
+        self.replayed: int = 0
+        # the part of the journal that was written before this session
+        self._replayEnd: int = path.getsize(journalPath) \
+            if path.exists(journalPath) else 0
+        self._journal = open(journalPath, 'a', encoding='utf-8')
+        if self._replayEnd:
+            # the last line of the earlier session may be cut off
+            self._journal.write('\n')
+        self._thread: Thread = Thread(target=self.work, name='MoveQueue',
+                                      daemon=True)
+        self._thread.start()
+
+    # ---------------------------- JOURNAL ---------------------------- #
+
+    def replay(self) -> int:
+        """
+        Does the moves that an earlier session wrote to the journal
+        and did not mark done or cancelled, in the order they were
+        written. Is run by the worker before the moves of this
+        session. A move whose file is no longer at its source is
+        skipped, it either already happened or the file is gone.
+        The moves stay in the journal until it is emptied on close,
+        done again they would be skipped.
+        :return: The amount of moves that were done
+        """
+        if self._replayEnd == 0:
+            return 0
+        with open(self.journalPath, 'rb') as journal:
+            lines = journal.read(self._replayEnd).decode(
+                'utf-8', 'replace').splitlines()
+        openMoves = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line is cut off if the app stopped
+                # while writing it
+                continue
+            if 'move' in record:
+                openMoves[record['move']] = (record['src'], record['dst'])
+            else:
+                openMoves.pop(record.get('done', record.get('cancel')), None)
+        replayed = 0
+        for src, dst in openMoves.values():
+            if not path.exists(src):
+                continue
+            try:
+                self.engine.move(src, dst)
+                replayed += 1
+            except OSError:
+                continue
+        return replayed
+
+    def write(self, record: dict):
+        """
+        Writes a record to the journal, it is synced to disk by the
+        worker before the move is done.
+        """
+        with self._lock:
+            self._journal.write(json.dumps(record) + '\n')
+
+    def sync(self):
+        with self._lock:
+            self._journal.flush()
+            fsync(self._journal.fileno())
+
+    # ----------------------------- MOVES ----------------------------- #
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: The amount of moves that are not done yet
+        """
+        return self._pending
+
+    @property
+    def progress(self) -> tuple[int, int] | None:
+        """
+        :return: (copied, total) bytes of the file that is being
+                 copied to another device, None if no file is
+        """
+        task = self.running
+        if task is None or task.size == 0:
+            return None
+        return task.copied, task.size
+
+    def move(self, src: str, dst: str, imagePath: ImagePath = None
+             ) -> MoveTask | None:
+        """
+        Queues a move of the file and writes it to the journal.
+
+        In case the image has a move that has not started yet, that
+        move is cancelled and the file is moved from where it still
+        is. The move takes over the status the image had before the
+        cancelled one, as it replaces that decision in history.
+        In case the move of the image is running, the file is moved
+        on from where that move puts it, once it is done.
+        :param src: Where the file is once the moves of the image
+                    are done
+        :param dst: Where the file is moved to
+        :param imagePath: The image that is moved, it points at the
+                          file until the move is done
+        :return: The queued move, None if the file is already at dst
+        """
+        cancelled = after = task = None
+        with self._lock:
+            previous = self._latest.get(imagePath)
+            if previous is not None and previous.state == MoveTask.QUEUED:
+                previous.state = MoveTask.CANCELLED
+                self._pending -= 1
+                cancelled = previous
+                src, after = previous.src, previous.after
+            elif previous is not None and previous.state == MoveTask.RUNNING:
+                src, after = previous.dst, previous
+            if src != dst:
+                task = MoveTask(self._nextId, src, dst, imagePath)
+                task.after = after
+                if cancelled is not None:
+                    task.previousStatus = cancelled.previousStatus
+                    task.previousProperPath = cancelled.previousProperPath
+                self._nextId += 1
+                self._pending += 1
+            if imagePath is not None:
+                if task is not None:
+                    self._latest[imagePath] = task
+                elif after is not None:
+                    self._latest[imagePath] = after
+                else:
+                    self._latest.pop(imagePath, None)
+                if after is None:
+                    # the file is at src, a running move updates
+                    # movingFrom once it is done
+                    imagePath.movingFrom = None if task is None else src
+        if cancelled is not None:
+            self.write({'cancel': cancelled.taskId})
+            if cancelled in self.history:
+                self.history.remove(cancelled)
+        if task is None:
+            return None
+        self.write({'move': task.taskId, 'src': src, 'dst': dst})
+        self.history.append(task)
+        self._queue.put(task)
+        return task
+
+    def undo(self, count: int = 1) -> List[MoveTask]:
+        """
+        Undoes the last moves, newest first. A move that has not
+        started yet is cancelled, otherwise the file is moved
+        back to where it was. A move that failed left the file
+        where it was.
+        :param count: The amount of moves to undo
+        :return: The moves that were undone
+        """
+        undone = []
+        while len(undone) < count and self.history:
+            task = self.history.pop()
+            with self._lock:
+                cancelled = task.state == MoveTask.QUEUED
+                if cancelled:
+                    task.state = MoveTask.CANCELLED
+                    self._pending -= 1
+                    if self._latest.get(task.imagePath) is task:
+                        after = task.after
+                        if after is not None and \
+                                after.state == MoveTask.RUNNING:
+                            self._latest[task.imagePath] = after
+                        else:
+                            del self._latest[task.imagePath]
+            if cancelled:
+                self.write({'cancel': task.taskId})
+            if cancelled or task.state == MoveTask.FAILED:
+                # the file is still where it was
+                if task.imagePath is not None and \
+                        task.imagePath.movingFrom == task.src:
+                    task.imagePath.movingFrom = None
+            else:
+                self.move(task.dst, task.src, task.imagePath)
+                # the move back is not a decision that can be undone
+                self.history.pop()
+            undone.append(task)
+        return undone
+
+    def work(self):
+        """
+        Replays the journal, then takes batches of moves from the
+        queue, syncs the journal once and does the moves in order.
+        """
+        self.replayed = self.replay()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            self.sync()
+            for task in batch:
+                if task is None:
+                    return
+                with self._lock:
+                    if task.state != MoveTask.QUEUED:
+                        continue
+                    task.state = MoveTask.RUNNING
+                self.perform(task)
+
+    def perform(self, task: MoveTask):
+        """
+        Moves the file with the engine, in case the file is gone but
+        the destination exists the move already happened. The
+        progress of a copy is kept on the task.
+        """
+        self.running = task
+        try:
+            self.engine.move(task.src, task.dst, partial(self.copied, task))
+        except OSError as e:
+            if isinstance(e, FileNotFoundError) and path.exists(task.dst):
+                e = None
+            task.error = e
+        self.running = None
+        imagePath = task.imagePath
+        follower = None
+        with self._lock:
+            task.state = MoveTask.DONE if task.error is None \
+                else MoveTask.FAILED
+            self._pending -= 1
+            latest = self._latest.get(imagePath)
+            if latest is task:
+                del self._latest[imagePath]
+            elif latest is not None and latest.after is task:
+                latest.after = None
+                if task.error is None:
+                    # the file waits for the next move where this
+                    # one put it
+                    imagePath.movingFrom = latest.src
+                else:
+                    # the file never got to where the next move
+                    # takes it from
+                    latest.state = MoveTask.FAILED
+                    latest.error = task.error
+                    self._pending -= 1
+                    del self._latest[imagePath]
+                    follower = latest
+            if task.error is None and imagePath is not None and \
+                    imagePath.movingFrom == task.src:
+                imagePath.movingFrom = None
+        if task.error is not None:
+            # the decision is reverted, the move is not tried again
+            # when the journal is replayed. The decision that
+            # followed it is reverted first, so the image ends up
+            # with the status it had before this one.
+            if follower is not None:
+                self.write({'cancel': follower.taskId})
+                self._failed.put(follower)
+            self.write({'cancel': task.taskId})
+            self._failed.put(task)
+            return
+        self.write({'done': task.taskId})
+
+    def failedMoves(self) -> List[MoveTask]:
+        """
+        Takes the moves that failed since the last call without
+        waiting. They are taken out of history, as their file never
+        left its source there is nothing to undo.
+        :return: The failed moves, oldest first
+        """
+        failed = []
+        while True:
+            try:
+                task = self._failed.get_nowait()
+            except Empty:
+                break
+            if task in self.history:
+                self.history.remove(task)
+            failed.append(task)
+        return failed
+
+    @staticmethod
+    def copied(task: MoveTask, copied: int, size: int):
+        task.copied, task.size = copied, size
+
+    def close(self):
+        """
+        Waits for every queued move to be done and empties
+        the journal.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        with self._lock:
+            self._journal.close()
+        with open(self.journalPath, 'w', encoding='utf-8'):
+            pass
@@ -0,0 +1,224 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+from os import makedirs, path, remove, replace, scandir, stat, utime
+from threading import Lock
+
+from PIL import Image, PngImagePlugin
+
+from app.ImagePath import ImagePath
+
+
+class PreviewCache:
+    """
+    PreviewCache stores display sized copies of images on disk, so
+    later sessions can show an image from a small preview instead
+    of decoding the original file again.
+
+    Previews are content addressed, their filename is a hash of the
+    path, file size and modification time of the original, so a
+    changed original never uses an old preview.
+    Opaque images are stored as JPEG, images with transparency
+    as PNG. The full resolution of the original is stored in the
+    comment of the preview, so it is known without opening the
+    original. A preview is written again once the image is
+    decoded larger than the preview that is stored.
+
+    Previews are written on a background thread. The total size
+    of the previews is capped, when it is exceeded the least
+    recently used previews are removed. Using a preview updates
+    its modification time, which is what the order is based on
+    when the cache is opened again.
+    """
+    EXTENSIONS: tuple[str, ...] = ('.jpg', '.png')
+
+    def __init__(self, directory: str, maxBytes: int):
+        self.directory: str = directory
+        self.maxBytes: int = maxBytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._bytes: int = 0
+        self._lock: Lock = Lock()
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='PreviewCache')
+        makedirs(directory, exist_ok=True)
+        self.executor.submit(self.scan)
+
+    def scan(self):
+        """
+        Reads the previews already on disk, oldest first.
+        """
+        previews = []
+        with scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.EXTENSIONS) and entry.is_file():
+                    info = entry.stat()
+                    previews.append((info.st_mtime_ns, entry.name,
+                                     info.st_size))
+        with self._lock:
+            for _, name, size in sorted(previews):
+                if name not in self._entries:
+                    self._entries[name] = size
+                    self._bytes += size
+        self.evict()
+
+    @staticmethod
+    def key(imagePath: ImagePath) -> str | None:
+        """
+        :return: The hash of the path, size and modification time of
+                 the image, None if the image does not exist
+        """
+        try:
+            info = stat(imagePath.path)
+        except OSError:
+            return None
+        return sha1(f"{imagePath.path}|{info.st_size}|{info.st_mtime_ns}"
+                    .encode('utf-8')).hexdigest()
+
+    def get(self, imagePath: ImagePath,
+            displaySize: tuple[int, int] = None) -> Image.Image | None:
+        """
+        Returns the preview of the image if there is one that is
+        large enough for the display size.
+        A preview is always smaller than its original, so it is
+        only large enough if it does not have to be scaled up to
+        fit the display. The full resolution of the image is set
+        from the preview.
+        :param imagePath: The original image
+        :param displaySize: The size the image is displayed at
+        :return: The decoded preview, None if there is no usable one
+        """
+        if displaySize is None:
+            return None
+        key = self.key(imagePath)
+        if key is None:
+            return None
+        for extension in self.EXTENSIONS:
+            name = key + extension
+            previewPath = path.join(self.directory, name)
+            try:
+                with Image.open(previewPath) as preview:
+                    if min(displaySize[0] / preview.width,
+                           displaySize[1] / preview.height) > 1:
+                        return None
+                    preview.load()
+                    image = preview.copy()
+                    fullResolution = self.readResolution(preview)
+            except OSError:
+                continue
+            if fullResolution is None:
+                # written before the resolution was stored
+                fullResolution = imagePath.header()[0]
+            imagePath.fullResolution = fullResolution
+            self.touch(name, previewPath)
+            return image
+        return None
+
+    @staticmethod
+    def readResolution(preview: Image.Image) -> tuple[int, int] | None:
+        """
+        :return: The full resolution stored in the comment of the
+                 preview, None if there is none
+        """
+        comment = preview.info.get('comment')
+        if isinstance(comment, bytes):
+            comment = comment.decode('ascii', 'ignore')
+        try:
+            width, height = comment.split('x')
+            return int(width), int(height)
+        except (AttributeError, ValueError):
+            return None
+
+    def fill(self, imagePath: ImagePath, image: Image):
+        """
+        Writes a preview of the image in the background.
+        Nothing is written if the image is already at full
+        resolution, as the preview would not be any smaller.
+        :param imagePath: The original image
+        :param image: The image decoded at display size
+        """
+        if imagePath.fullResolution is None or \
+                image.size == imagePath.fullResolution:
+            return
+        self.executor.submit(self.write, imagePath, image)
+
+    def write(self, imagePath: ImagePath, image: Image):
+        key = self.key(imagePath)
+        if key is None:
+            return
+        comment = "{}x{}".format(*imagePath.fullResolution)
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or \
+            'transparency' in image.info
+        if transparent:
+            name = key + '.png'
+            pngInfo = PngImagePlugin.PngInfo()
+            pngInfo.add_text('comment', comment)
+            options = {'pnginfo': pngInfo}
+        else:
+            name, image = key + '.jpg', image.convert('RGB')
+            options = {'quality': 90, 'comment': comment.encode('ascii')}
+        previewPath = path.join(self.directory, name)
+        with self._lock:
+            stored = name in self._entries
+        if stored and not self.isLarger(image, previewPath):
+            return
+        temporary = previewPath + '.tmp'
+        try:
+            image.save(temporary, 'PNG' if transparent else 'JPEG',
+                       **options)
+            replace(temporary, previewPath)
+            size = path.getsize(previewPath)
+        except OSError:
+            return
+        with self._lock:
+            # a preview that is written again replaces the old one
+            self._bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+        self.evict()
+
+    @staticmethod
+    def isLarger(image: Image.Image, previewPath: str) -> bool:
+        """
+        :return: True if the image is larger than the stored preview,
+                 or the preview can't be read
+        """
+        try:
+            with Image.open(previewPath) as preview:
+                return image.width > preview.width or \
+                    image.height > preview.height
+        except OSError:
+            return True
+
+    def touch(self, name: str, previewPath: str):
+        """
+        Marks the preview as most recently used.
+        """
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+        try:
+            utime(previewPath)
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Removes the least recently used previews until the total
+        size is under the cap.
+        """
+        while True:
+            with self._lock:
+                if self._bytes <= self.maxBytes or not self._entries:
+                    return
+                name, size = self._entries.popitem(last=False)
+                self._bytes -= size
+            try:
+                remove(path.join(self.directory, name))
+            except OSError:
+                pass
+
+    @property
+    def usedBytes(self) -> int:
+        return self._bytes
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
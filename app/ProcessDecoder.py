@@ -0,0 +1,133 @@
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple
+from weakref import finalize
+
+from PIL import Image
+
+from app.ImagePath import ImagePath
+from app.SharedBlockPool import SharedBlockPool
+
+
+def decodeInto(data: bytes, displaySize: tuple[int, int] | None,
+               blockName: str | None, blockSize: int) -> tuple:
+    """
+    Decodes the image in a worker process and writes the pixels
+    into the shared block. The pixels are converted to a mode that
+    Pillow can wrap without copying. In case there is no block or
+    the pixels don't fit in it, the pixels are sent back instead.
+    :param data: The encoded contents of the image file
+    :param displaySize: The size to decode at, None for full size
+    :param blockName: Name of the shared block to write into
+    :param blockSize: Size of the shared block
+    :return: (mode, size, pixels or None, fullResolution, format)
+    """
+    imagePath = ImagePath('', '')
+    image = imagePath.displayImage(displaySize, data)
+    image = image.convert(ProcessDecoder.sharedMode(image))
+    pixels = image.tobytes()
+    if blockName is not None and len(pixels) <= blockSize:
+        block = SharedMemory(name=blockName)
+        try:
+            block.buf[:len(pixels)] = pixels
+        finally:
+            block.close()
+        pixels = None
+    return (image.mode, image.size, pixels, imagePath.fullResolution,
+            imagePath.imageFormat)
+
+
+class ProcessDecoder:
+    """
+    ProcessDecoder decodes images in a pool of processes, so large
+    decodes don't hold the GIL of the process running the GUI.
+
+    Processes are spawned instead of forked, forking a process
+    that runs the loader threads can copy a held lock into the
+    child.
+
+    The pixels are handed back through shared memory blocks from
+    a SharedBlockPool. The decoded image is a view on the block,
+    no pixels are copied in the main process. The block goes back
+    to the pool once the image is garbage collected. As blocks are
+    rounded up, the size of the block is given with the image, so
+    it is counted against the memory budgets instead of the pixels.
+    """
+    # modes Pillow can wrap a buffer in without copying it
+    SHARED_MODES: tuple[str, ...] = ('L', 'RGBA', 'RGBX')
+
+    def __init__(self, workers: int, budget: int):
+        self.pool: SharedBlockPool = SharedBlockPool(budget)
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context('spawn'))
+
+    @classmethod
+    def sharedMode(cls, image: Image) -> str:
+        """
+        :return: The mode the image is converted to before it is
+                 written in a block
+        """
+        if image.mode in cls.SHARED_MODES:
+            return image.mode
+        if image.mode == '1':
+            return 'L'
+        if 'A' in image.getbands() or 'transparency' in image.info:
+            return 'RGBA'
+        return 'RGBX'
+
+    @staticmethod
+    def maxBytes(resolution: tuple[int, int],
+                 displaySize: tuple[int, int] | None) -> int:
+        """
+        The most bytes the decoded image can take. An image decoded
+        at the display size is less than twice the fitted size in
+        both directions, with 4 bytes per pixel at most.
+        """
+        target = ImagePath.fitSize(resolution, displaySize)
+        if target is None:
+            return resolution[0] * resolution[1] * 4
+        return target[0] * 2 * target[1] * 2 * 4
+
+    def decode(self, imagePath: ImagePath, displaySize: tuple[int, int],
+               data: bytes) -> Tuple[Image.Image, int]:
+        """
+        Decodes the image in a worker process and waits for it.
+        :param imagePath: The image, its fullResolution and imageFormat
+                          are set from the decode
+        :param displaySize: The size to decode at, None for full size
+        :param data: The encoded contents of the image file
+        :return: The decoded image and the bytes of the shared block
+                 it is kept in, 0 if it is not kept in one
+        """
+        with Image.open(BytesIO(data)) as header:
+            resolution = header.size
+        block = self.pool.acquire(self.maxBytes(resolution, displaySize))
+        try:
+            mode, size, pixels, fullResolution, imageFormat = \
+                self.executor.submit(
+                    decodeInto, data, displaySize,
+                    None if block is None else block.name,
+                    0 if block is None else block.size).result()
+        except BaseException:
+            if block is not None:
+                self.pool.release(block)
+            raise
+        imagePath.fullResolution = fullResolution
+        imagePath.imageFormat = imageFormat
+        if pixels is not None:
+            if block is not None:
+                self.pool.release(block)
+            return Image.frombytes(mode, size, pixels), 0
+        # 1 byte per pixel for L, 4 for RGBA and RGBX
+        length = size[0] * size[1] * len(mode)
+        image = Image.frombuffer(mode, size, block.buf[:length], 'raw',
+                                 mode, 0, 1)
+        # not at exit, the block can't be closed while the image exists
+        finalize(image, self.pool.release, block).atexit = False
+        return image, block.size
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from time import perf_counter
+from typing import Hashable, Iterable
+
+from PIL import Image
+
+from app.LazyImage import LazyImage
+
+
+class Renderer:
+    """
+    Renderer resizes images for display on a worker thread, so the
+    Tk main thread only has to wrap the result in a PhotoImage.
+
+    Renders are cached by image path, size and resampling filter.
+    Going back to an image that was rendered before at the same
+    canvas size gives back the cached render. The cache holds
+    maxlen renders, the least recently used render is dropped
+    first.
+
+    A render is only handed to the worker once the decode of its
+    image is done, so the worker never waits on a decode and a
+    render of the current image is not stuck behind renders of
+    images that are still being decoded.
+
+    The time a render takes is measured. cost is a moving
+    average of it.
+    """
+    # weight of the newest measurement in the moving average
+    COST_WEIGHT: float = 0.25
+
+    def __init__(self, maxlen: int = 16, workers: int = 1):
+        self.maxlen: int = maxlen
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='Renderer')
+        self._renders: OrderedDict[Hashable, Future] = OrderedDict()
+        self._lock: Lock = Lock()
+        self.cost: float | None = None
+
+    @staticmethod
+    def key(loadedImage: LazyImage, size: tuple[int, int],
+            resample: int = None) -> Hashable:
+        return loadedImage.imagePath.path, size, resample
+
+    def render(self, loadedImage: LazyImage, size: tuple[int, int],
+               resample: int = None) -> Future:
+        """
+        Gives back the render of the image at the size, from the
+        cache or by scheduling it on the worker once the image is
+        decoded. Renders that were cancelled or failed are
+        scheduled again.
+        :param loadedImage: The image to render
+        :param size: (width, height) of the render
+        :param resample: Pillow resampling filter, None for the default
+        :return: A Future of the resized Image
+        """
+        key = self.key(loadedImage, size, resample)
+        with self._lock:
+            future = self._renders.get(key)
+            if future is not None and not future.cancelled() and \
+                    (not future.done() or future.exception() is None):
+                self._renders.move_to_end(key)
+                return future
+            future = Future()
+            self._renders[key] = future
+            while len(self._renders) > self.maxlen:
+                _, evicted = self._renders.popitem(last=False)
+                evicted.cancel()
+        decode = loadedImage.decode
+        if decode is None:
+            future.set_exception(CancelledError("the image is closed"))
+        else:
+            decode.add_done_callback(partial(
+                self.schedule, future, loadedImage, size, resample))
+        return future
+
+    def schedule(self, future: Future, loadedImage: LazyImage,
+                 size: tuple[int, int], resample: int, _):
+        """
+        Hands the render to the worker, is called once the decode
+        is done. A render that was cancelled in the meantime is
+        not handed over.
+        """
+        if future.cancelled():
+            return
+        try:
+            self.executor.submit(self.resize, future, loadedImage, size,
+                                 resample)
+        except RuntimeError:
+            # the renderer is shut down
+            future.cancel()
+
+    def resize(self, future: Future, loadedImage: LazyImage,
+               size: tuple[int, int], resample: int = None):
+        """
+        Resizes the decoded image into the future of the render and
+        measures the cost. Is run by the worker.
+        """
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            start = perf_counter()
+            image = loadedImage.resized(size, resample)
+            elapsed = perf_counter() - start
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        with self._lock:
+            if self.cost is None:
+                self.cost = elapsed
+            else:
+                self.cost += self.COST_WEIGHT * (elapsed - self.cost)
+        future.set_result(image)
+
+    def cancelExcept(self, paths: Iterable[str]):
+        """
+        Cancels the renders that have not started yet for every
+        image whose path is not in paths.
+        :param paths: paths of the images that are still needed
+        """
+        paths = set(paths)
+        with self._lock:
+            for key, future in list(self._renders.items()):
+                if key[0] not in paths and future.cancel():
+                    del self._renders[key]
+
+    def clear(self):
+        with self._lock:
+            for future in self._renders.values():
+                future.cancel()
+            self._renders.clear()
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Dict, List
+
+
+class SharedBlockPool:
+    """
+    SharedBlockPool hands out shared memory blocks that decode
+    processes write pixels into, and takes them back once the
+    image using them is gone, so the blocks are reused instead of
+    being created for every image.
+
+    Block sizes are rounded up to a power of two of at least
+    MIN_BLOCK bytes, a request is served by a free block of the
+    same size. The blocks together never take more than budget
+    bytes, free blocks of other sizes are dropped to make room.
+    In case there is no room, acquire gives None.
+    """
+    MIN_BLOCK: int = 1_048_576
+
+    def __init__(self, budget: int):
+        self.budget: int = budget
+        self._free: Dict[int, List[SharedMemory]] = {}
+        self._bytes: int = 0
+        self._inUse: int = 0
+        self._lock: Lock = Lock()
+        self._closed: bool = False
+        self._retired: List[SharedMemory] = []
+
+    @classmethod
+    def blockSize(cls, nbytes: int) -> int:
+        size = cls.MIN_BLOCK
+        while size < nbytes:
+            size *= 2
+        return size
+
+    def acquire(self, nbytes: int) -> SharedMemory | None:
+        """
+        :param nbytes: The amount of bytes the block has to hold
+        :return: A block of at least nbytes, None if it does not fit
+                 in the budget
+        """
+        size = self.blockSize(nbytes)
+        with self._lock:
+            if self._closed:
+                return None
+            if blocks := self._free.get(size):
+                self._inUse += 1
+                return blocks.pop()
+            while self._bytes + size > self.budget and self.dropFree(size):
+                pass
+            if self._bytes + size > self.budget:
+                return None
+            self._bytes += size
+            self._inUse += 1
+        try:
+            return SharedMemory(create=True, size=size)
+        except OSError:
+            with self._lock:
+                self._bytes -= size
+                self._inUse -= 1
+            return None
+
+    def release(self, block: SharedMemory):
+        """
+        Gives a block back to the pool, once nothing uses it anymore.
+        It is called while the image using the block is being
+        collected, so after close the block is only unlinked. It
+        is closed when the pool is collected, as the image still
+        points at it.
+        """
+        with self._lock:
+            self._inUse -= 1
+            if not self._closed:
+                self._free.setdefault(block.size, []).append(block)
+                return
+            self._bytes -= block.size
+            self._retired.append(block)
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+    def dropFree(self, keep: int) -> bool:
+        """
+        Destroys one free block of a different size than keep.
+        Is called with the lock held.
+        :return: False if there was no such block
+        """
+        for size, blocks in self._free.items():
+            if size != keep and blocks:
+                self._bytes -= size
+                self.destroy(blocks.pop())
+                return True
+        return False
+
+    @staticmethod
+    def destroy(block: SharedMemory):
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+    @property
+    def usedBytes(self) -> int:
+        return self._bytes
+
+    def close(self):
+        """
+        Destroys the free blocks, blocks that are still in use are
+        unlinked when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            for blocks in self._free.values():
+                for block in blocks:
+                    self._bytes -= block.size
+                    self.destroy(block)
+            self._free.clear()
@@ -0,0 +1,146 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import path, scandir, stat
+from queue import Queue
+from re import compile
+from threading import Event
+from typing import Callable, Dict, List, Tuple
+
+
+class TreeScanner:
+    """
+    TreeScanner lists every directory in a file tree together with
+    the supported files in it and its modification time.
+
+    Every directory is listed with scandir by a pool of worker
+    threads, so sibling subtrees are listed at the same time.
+    A directory that matches the blacklist is never listed, so
+    nothing below it is visited either.
+
+    A scan can start from the result of an earlier scan. A file
+    or directory that is added, removed or renamed changes the
+    modification time of the directory it is in, so a directory
+    whose time did not change is not listed again. Its files and
+    subdirectories are taken from the earlier scan, and only its
+    subdirectories are checked. Refreshing a tree that did not
+    change is a stat of every directory.
+
+    While a scan runs, the directories it has listed and the files
+    it has found so far are counted, and every directory can be
+    handed to a callback as soon as it is listed. A scan can be
+    cancelled through an Event, it then stops listing and gives
+    back what it has found.
+    """
+
+    def __init__(self, supportedFiletype: tuple[str, ...],
+                 blacklist: str = '', workers: int = 8):
+        self.supportedFiletype: tuple[str, ...] = supportedFiletype
+        self.blacklist = compile(blacklist) if blacklist != '' else None
+        self.workers: int = workers
+        self.scannedDirs: int = 0
+        self.foundFiles: int = 0
+
+    def isBlacklisted(self, directory: str) -> bool:
+        return self.blacklist is not None and \
+            self.blacklist.match(directory) is not None
+
+    def listDir(self, directory: str) -> Tuple[List[str], List[str]]:
+        """
+        :param directory: The directory to list
+        :return: (supported file names, subdirectories)
+        :raises OSError: In case the directory can't be read
+        """
+        files = []
+        subdirs = []
+        with scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(self.supportedFiletype):
+                    files.append(entry.name)
+        return files, subdirs
+
+    def refreshDir(self, directory: str,
+                   known: Tuple[int, List[str], List[str]] | None
+                   ) -> Tuple[str, int | None, List[str], List[str]]:
+        """
+        Lists the directory, unless it did not change since it was
+        listed before.
+        :param directory: The directory to list
+        :param known: (mtime, files, subdirectories) from the earlier
+                      scan, None if the directory is new
+        :return: (directory, mtime, files, subdirectories), mtime is
+                 None if the directory is gone and 0 if it could not
+                 be listed, so it is listed again by the next scan
+        """
+        try:
+            mtime = stat(directory).st_mtime_ns
+        except OSError:
+            return directory, None, [], []
+        if known is not None and known[0] == mtime:
+            return directory, mtime, known[1], known[2]
+        # the time is taken before listing, a change made while
+        # listing is picked up by the next scan
+        try:
+            return (directory, mtime) + self.listDir(directory)
+        except OSError:
+            # what was found before is kept until it can be listed
+            if known is not None:
+                return directory, 0, known[1], known[2]
+            return directory, 0, [], []
+
+    def scan(self, root: str,
+             previous: Dict[str, Tuple[int, List[str]]] = None,
+             found: Callable[[str, int, List[str]], None] = None,
+             cancelled: Event = None) -> List[Tuple[str, int, List[str]]]:
+        """
+        Lists the tree starting at root.
+        :param root: The directory the scan starts from
+        :param previous: directory: (mtime, supported file names)
+                         of an earlier scan of the tree
+        :param found: Is called with (directory, mtime, supported file
+                      names) of every directory once it is listed
+        :param cancelled: Stops the scan once it is set
+        :return: (directory, mtime, supported file names) of every
+                 directory that is not blacklisted, sorted by directory
+        """
+        root = path.normpath(root)
+        if self.isBlacklisted(root):
+            return []
+        known: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        if previous:
+            for directory, (mtime, files) in previous.items():
+                known[directory] = (mtime, files, [])
+            for directory in previous:
+                parent = known.get(path.dirname(directory))
+                if parent is not None and directory != root:
+                    parent[2].append(directory)
+        self.scannedDirs = 0
+        self.foundFiles = 0
+        directories = []
+        finished: Queue[Future] = Queue()
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix='TreeScanner') as executor:
+            executor.submit(self.refreshDir, root, known.get(root))\
+                .add_done_callback(finished.put)
+            pending = 1
+            while pending:
+                if cancelled is not None and cancelled.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                directory, mtime, files, subdirs = finished.get().result()
+                pending -= 1
+                if mtime is None:
+                    continue
+                directories.append((directory, mtime, files))
+                self.scannedDirs += 1
+                self.foundFiles += len(files)
+                if found is not None:
+                    found(directory, mtime, files)
+                for subdir in subdirs:
+                    if not self.isBlacklisted(subdir):
+                        executor.submit(self.refreshDir, subdir,
+                                        known.get(subdir))\
+                            .add_done_callback(finished.put)
+                        pending += 1
+        directories.sort()
+        return directories
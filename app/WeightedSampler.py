@@ -0,0 +1,189 @@
+from array import array
+from itertools import repeat
+from random import randrange
+from typing import Dict, Hashable, Iterable, List
+
+
+class WeightedSampler:
+    """
+    WeightedSampler chooses a random key with a probability
+    proportional to its weight. The weights are stored in a
+    Fenwick tree (binary indexed tree) so that sampling, changing a
+    weight, adding a key and removing a key all take O(log n),
+    instead of the O(n) needed by random.choices to rebuild the
+    cumulative weights every call.
+
+    Every key is stored in a slot, removed keys leave their slot
+    free so it can be reused by the next key that is added.
+    When there are no free slots left the capacity is doubled.
+    The weights and the tree are kept in int64 arrays, so a large
+    dirList costs 16 bytes a directory on top of its keys.
+    """
+
+    def __init__(self, keys: Iterable[Hashable] = (),
+                 weights: Iterable[int] | None = None):
+        keys = list(keys)
+        if weights is None:
+            weights = repeat(1, len(keys))
+        weights = array('q', (max(0, int(weight)) for weight in weights))
+        if len(keys) != len(weights):
+            raise ValueError("keys and weights must have the same length")
+        self._slots: Dict[Hashable, int] = {}
+        self._keys: List[Hashable | None] = []
+        self._weights: array = array('q')
+        self._free: List[int] = []
+        for key, weight in zip(keys, weights):
+            if key in self._slots:
+                self._weights[self._slots[key]] += weight
+                continue
+            self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._weights.append(weight)
+        self._build(max(1, len(self._keys)))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable):
+        return key in self._slots
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    @property
+    def total(self) -> int:
+        """
+        The sum of all weights
+        :return: total weight
+        """
+        return self._total
+
+    def weight(self, key: Hashable) -> int:
+        """
+        :param key:
+        :return: The weight of the key, 0 if the key is not present
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return 0
+        return self._weights[slot]
+
+    # ---------------------------- UPDATES ---------------------------- #
+
+    def add(self, key: Hashable, weight: int = 1):
+        """
+        Adds a key with the given weight. If the key already
+        exists its weight is replaced.
+        :param key:
+        :param weight: non-negative weight
+        """
+        if key in self._slots:
+            self.update(key, weight)
+            return
+        if not self._free:
+            self._build(2 * self._capacity)
+        slot = self._free.pop()
+        self._slots[key] = slot
+        self._keys[slot] = key
+        self._weights[slot] = 0
+        self.update(key, weight)
+
+    def update(self, key: Hashable, weight: int):
+        """
+        Sets the weight of an existing key.
+        Weights lower than 0 are set to 0.
+        :param key:
+        :param weight: the new weight
+        """
+        slot = self._slots[key]
+        weight = max(0, int(weight))
+        self._change(slot, weight - self._weights[slot])
+
+    def increment(self, key: Hashable, amount: int = 1):
+        """
+        Increases the weight of an existing key by amount,
+        a negative amount decreases it. Does nothing if the
+        key is not present.
+        :param key:
+        :param amount:
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return
+        self.update(key, self._weights[slot] + amount)
+
+    def remove(self, key: Hashable):
+        """
+        Removes the key, its slot is freed to be reused.
+        Does nothing if the key is not present.
+        :param key:
+        """
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._change(slot, -self._weights[slot])
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def clear(self):
+        self._slots.clear()
+        self._keys.clear()
+        del self._weights[:]
+        self._free.clear()
+        self._build(1)
+
+    # ---------------------------- SAMPLING --------------------------- #
+
+    def sample(self) -> Hashable:
+        """
+        Chooses a random key, using the weights as probabilities.
+        Walks down the Fenwick tree to find the slot in which
+        a random number between 0 and the total weight falls.
+        :return: a random key
+        """
+        if self._total <= 0:
+            raise IndexError("cannot sample from an empty sampler")
+        remaining = randrange(self._total)
+        position = 0
+        step = self._highBit
+        while step:
+            nextPosition = position + step
+            if nextPosition <= self._capacity and \
+                    self._tree[nextPosition] <= remaining:
+                position = nextPosition
+                remaining -= self._tree[nextPosition]
+            step >>= 1
+        return self._keys[position]
+
+    # ----------------------------- TREE ------------------------------ #
+
+    def _change(self, slot: int, delta: int):
+        if delta == 0:
+            return
+        self._weights[slot] += delta
+        self._total += delta
+        index = slot + 1
+        while index <= self._capacity:
+            self._tree[index] += delta
+            index += index & -index
+
+    # noinspection PyAttributeOutsideInit
+    def _build(self, capacity: int):
+        """
+        Builds the Fenwick tree in O(n) for the given capacity.
+        Unused slots are padded and added to the free slots.
+        :param capacity: amount of slots in the tree
+        """
+        used = len(self._keys)
+        self._keys.extend([None] * (capacity - used))
+        self._weights.extend(repeat(0, capacity - used))
+        self._free.extend(range(capacity - 1, used - 1, -1))
+        self._capacity: int = capacity
+        self._highBit: int = 1 << (capacity.bit_length() - 1)
+        tree = array('q', [0]) + self._weights
+        for index in range(1, capacity + 1):
+            parent = index + (index & -index)
+            if parent <= capacity:
+                tree[parent] += tree[index]
+        self._tree: array = tree
+        self._total: int = sum(self._weights)
@@ -5,7 +5,8 @@ from app.GUI import GUI
 
 def main():
     config = Config('config.ini')
-    guiData = GuiData(config, update=True)
+    guiData = GuiData(config, update=True,
+                      progressive=config.progressiveStartup)
     gui = GUI(guiData)
     gui.mainloop()
     print(config.sleepTime)
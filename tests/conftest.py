@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# the app is imported from the root of the repository, like run.py does
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
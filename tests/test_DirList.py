@@ -0,0 +1,46 @@
+from os import path
+
+import pytest
+
+from app.DirList import DirList
+
+DIRECTORIES = [
+    (path.join('root', 'a'), ['x.jpg', 'y.png']),
+    (path.join('root', 'a', 'b'), []),
+    (path.join('root', 'c'), ['z.jpg']),
+    (path.join('root', 'ü'), ['ä.jpg']),
+]
+
+
+def test_dir_list_round_trip(tmp_path):
+    filename = str(tmp_path / 'dirList.bin')
+    entries = [(directory, len(files), 1_700_000_000_000_000_000 + index)
+               for index, (directory, files) in enumerate(DIRECTORIES)]
+    DirList.write(filename, entries)
+    with DirList(filename) as dirList:
+        assert len(dirList) == 4
+        assert list(dirList) == [directory for directory, *_ in entries]
+        assert list(dirList.entries()) == entries
+        assert list(dirList.counts) == [2, 0, 1, 1]
+        assert dirList.mtimes == [mtime for *_, mtime in entries]
+        exportPath = tmp_path / 'dirList.txt'
+        dirList.export(str(exportPath))
+    assert exportPath.read_text(encoding='utf-8').splitlines() == [
+        f"{directory}|{count}|{mtime}" for directory, count, mtime in entries]
+
+
+def test_dir_list_rejects_other_files(tmp_path):
+    filename = tmp_path / 'dirList.bin'
+    filename.write_bytes(b'not a dirList' * 4)
+    with pytest.raises(ValueError):
+        DirList(str(filename))
+
+
+@pytest.mark.parametrize('length', [0, 10, DirList.HEADER.size, -1])
+def test_dir_list_rejects_cut_off_files(tmp_path, length):
+    filename = tmp_path / 'dirList.bin'
+    DirList.write(str(filename), [(directory, len(files), 0)
+                                  for directory, files in DIRECTORIES])
+    filename.write_bytes(filename.read_bytes()[:length])
+    with pytest.raises(ValueError):
+        DirList(str(filename))
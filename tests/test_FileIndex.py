@@ -0,0 +1,64 @@
+from os import path
+
+import pytest
+
+from app.FileIndex import FileIndex
+
+DIRECTORIES = [
+    (path.join('root', 'a'), ['x.jpg', 'y.png']),
+    (path.join('root', 'a', 'b'), []),
+    (path.join('root', 'c'), ['z.jpg']),
+    (path.join('root', 'ü'), ['ä.jpg']),
+]
+
+
+@pytest.fixture
+def fileIndex(tmp_path):
+    filename = str(tmp_path / 'fileIndex.bin')
+    FileIndex.write(filename, DIRECTORIES)
+    with FileIndex(filename) as fileIndex:
+        yield fileIndex
+
+
+def test_file_index_round_trip(fileIndex):
+    assert len(fileIndex) == 4
+    assert fileIndex.dirCount == 4
+    assert list(fileIndex.directories()) == DIRECTORIES
+    assert [fileIndex[index] for index in range(len(fileIndex))] == [
+        path.join(directory, file)
+        for directory, files in DIRECTORIES for file in files]
+    with pytest.raises(IndexError):
+        fileIndex[4]
+
+
+def test_file_index_contains(fileIndex):
+    for directory, files in DIRECTORIES:
+        for file in files:
+            assert path.join(directory, file) in fileIndex
+    assert path.join('root', 'a', 'z.jpg') not in fileIndex
+    assert path.join('root', 'a', 'b', 'x.jpg') not in fileIndex
+    assert path.join('elsewhere', 'x.jpg') not in fileIndex
+
+
+@pytest.mark.parametrize('length', [0, 10, FileIndex.HEADER.size, -1])
+def test_file_index_rejects_cut_off_files(tmp_path, length):
+    filename = tmp_path / 'fileIndex.bin'
+    FileIndex.write(str(filename), DIRECTORIES)
+    data = filename.read_bytes()
+    filename.write_bytes(data[:length])
+    with pytest.raises(ValueError):
+        FileIndex(str(filename))
+
+
+def test_file_index_rejects_wrong_counts(tmp_path):
+    filename = tmp_path / 'fileIndex.bin'
+    FileIndex.write(str(filename), DIRECTORIES)
+    data = bytearray(filename.read_bytes())
+    magic, version, dirCount, fileCount, poolSize = \
+        FileIndex.HEADER.unpack_from(data)
+    # the same size, but the sections no longer line up
+    FileIndex.HEADER.pack_into(data, 0, magic, version, dirCount + 1,
+                               fileCount, poolSize - 8)
+    filename.write_bytes(data)
+    with pytest.raises(ValueError):
+        FileIndex(str(filename))
@@ -0,0 +1,106 @@
+import shutil
+from os import makedirs
+from time import sleep
+
+import pytest
+
+from app.FileWatcher import FileWatcher, InotifyWatcher, PollingWatcher
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    makedirs(root / 'a')
+    (root / 'a' / '1.jpg').write_bytes(b'1')
+    (root / 'a' / 'notes.txt').write_bytes(b'')
+    return root
+
+
+def collect(watcher: FileWatcher, until, timeout: float = 5):
+    """
+    Collects events until the condition holds for them.
+    """
+    events = []
+    for _ in range(int(timeout / 0.02)):
+        events.extend(watcher.pendingEvents())
+        if until(events):
+            return events
+        sleep(0.02)
+    return events
+
+
+def test_polling_reports_changed_directories(tree):
+    watcher = PollingWatcher(str(tree), ('.jpg',))
+    watcher._stop.set()
+    watcher.run()
+    assert watcher.ready.is_set()
+    (tree / 'a' / '1.jpg').unlink()
+    (tree / 'a' / '2.jpg').write_bytes(b'2')
+    (tree / 'a' / '3.txt').write_bytes(b'')
+    makedirs(tree / 'b')
+    (tree / 'b' / '4.jpg').write_bytes(b'4')
+    watcher.poll()
+    assert sorted(watcher.pendingEvents()) == sorted([
+        (FileWatcher.DELETED, str(tree / 'a' / '1.jpg')),
+        (FileWatcher.CREATED, str(tree / 'a' / '2.jpg')),
+        (FileWatcher.DIR_CREATED, str(tree / 'b')),
+        (FileWatcher.CREATED, str(tree / 'b' / '4.jpg'))])
+    shutil.rmtree(tree / 'b')
+    watcher.poll()
+    assert watcher.pendingEvents() == [(FileWatcher.DIR_DELETED,
+                                        str(tree / 'b'))]
+
+
+def test_blacklisted_directories_are_not_watched(tree):
+    makedirs(tree / 'skip')
+    watcher = PollingWatcher(str(tree), ('.jpg',), '.*skip$')
+    watcher._stop.set()
+    watcher.run()
+    (tree / 'skip' / '5.jpg').write_bytes(b'5')
+    watcher.poll()
+    assert watcher.pendingEvents() == []
+
+
+inotify = pytest.mark.skipif(not InotifyWatcher.available(),
+                             reason="inotify is only available on Linux")
+
+
+@pytest.fixture
+def inotifyWatcher(tree):
+    watcher = InotifyWatcher(str(tree), ('.jpg',))
+    watcher.start()
+    assert watcher.ready.wait(5)
+    yield watcher
+    watcher.stop()
+
+
+@inotify
+def test_inotify_reports_new_files_once(tree, inotifyWatcher):
+    (tree / 'a' / '2.jpg').write_bytes(b'2')
+    # writing to a file that is already listed is no new file
+    (tree / 'a' / '1.jpg').write_bytes(b'one')
+    (tree / 'a' / '3.jpg').write_bytes(b'3')
+    events = collect(inotifyWatcher, lambda events: len(events) >= 2)
+    sleep(0.1)
+    events.extend(inotifyWatcher.pendingEvents())
+    assert events == [(FileWatcher.CREATED, str(tree / 'a' / '2.jpg')),
+                      (FileWatcher.CREATED, str(tree / 'a' / '3.jpg'))]
+
+
+@inotify
+def test_inotify_forgets_directories_moved_out(tree, tmp_path,
+                                               inotifyWatcher):
+    shutil.move(str(tree / 'a'), str(tmp_path / 'moved'))
+    events = collect(inotifyWatcher, lambda events: len(events) >= 1)
+    assert events == [(FileWatcher.DIR_DELETED, str(tree / 'a'))]
+    (tmp_path / 'moved' / '2.jpg').write_bytes(b'2')
+    sleep(0.2)
+    assert inotifyWatcher.pendingEvents() == []
+
+
+@inotify
+def test_inotify_reports_the_root_being_removed(tree, inotifyWatcher):
+    shutil.rmtree(tree)
+    events = collect(inotifyWatcher, lambda events:
+                     (FileWatcher.DIR_DELETED, str(tree)) in events)
+    assert (FileWatcher.DIR_DELETED, str(tree)) in events
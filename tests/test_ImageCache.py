@@ -0,0 +1,66 @@
+from os import utime
+
+from PIL import Image
+
+from app.ImageCache import ImageCache
+from app.ImagePyramid import ImagePyramid
+
+# 640x480 RGB with its 320x240 and 160x120 levels
+PYRAMID_BYTES = 3 * (640 * 480 + 320 * 240 + 160 * 120)
+
+
+def pyramid() -> ImagePyramid:
+    return ImagePyramid(Image.new('RGB', (640, 480)))
+
+
+def test_hot_tier_evicts_the_least_recently_used():
+    cache = ImageCache(2 * PYRAMID_BYTES, 0)
+    first, second, third = pyramid(), pyramid(), pyramid()
+    cache.putDecoded('first', first, None, (640, 480))
+    cache.putDecoded('second', second, None, (640, 480))
+    assert cache.getDecoded('first') == (first, (640, 480))
+    cache.putDecoded('third', third, None, (640, 480))
+    assert cache.getDecoded('second') is None
+    assert cache.getDecoded('first')[0] is first
+    assert cache.getDecoded('third')[0] is third
+    assert cache.usedBytes['hot'] == 2 * PYRAMID_BYTES
+
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = ImageCache(2 * PYRAMID_BYTES, 0)
+    cache.putDecoded('image', pyramid(), None, (640, 480))
+    cache.putDecoded('image', pyramid(), None, (640, 480))
+    assert cache.usedBytes['hot'] == PYRAMID_BYTES
+
+
+def test_entries_larger_than_the_budget_are_not_stored():
+    cache = ImageCache(PYRAMID_BYTES - 1, 4)
+    cache.putDecoded('image', pyramid(), None, (640, 480))
+    cache.putEncoded('image', b'12345')
+    assert cache.usedBytes == {'hot': 0, 'warm': 0}
+    assert cache.getDecoded('image') is None
+    assert cache.getEncoded('image') is None
+
+
+def test_warm_tier_evicts_by_bytes_and_counts_hits():
+    cache = ImageCache(0, 10)
+    cache.putEncoded('first', b'12345')
+    cache.putEncoded('second', b'12345')
+    assert cache.getEncoded('first') == b'12345'
+    cache.putEncoded('third', b'1234')
+    assert cache.getEncoded('second') is None
+    assert cache.getEncoded('third') == b'1234'
+    assert cache.usedBytes['warm'] == 9
+    assert (cache.warmHits, cache.misses) == (2, 1)
+    assert cache.hitRates == {'hot': 0.0, 'warm': 2 / 3}
+
+
+def test_key_changes_with_the_file(tmp_path):
+    filename = tmp_path / 'image.png'
+    filename.write_bytes(b'')
+    utime(filename, ns=(0, 1_000_000_000))
+    key = ImageCache.key(str(filename))
+    assert key == (str(filename), 1_000_000_000)
+    utime(filename, ns=(0, 2_000_000_000))
+    assert ImageCache.key(str(filename)) != key
+    assert ImageCache.key(str(tmp_path / 'gone.png')) is None
@@ -0,0 +1,52 @@
+import pytest
+
+from app.ImageHistory import ImageHistory
+
+
+def test_append_and_index():
+    history = ImageHistory()
+    for item in range(5):
+        history.append(item)
+    assert len(history) == 5
+    assert list(history) == [0, 1, 2, 3, 4]
+    assert history[0] == 0
+    assert history[-1] == 4
+    with pytest.raises(IndexError):
+        history[5]
+
+
+def test_popleft_wraps_around():
+    history = ImageHistory(maxlen=3)
+    for item in range(10):
+        history.append(item)
+        if len(history) > 3:
+            assert history.popleft() == item - 3
+    assert list(history) == [7, 8, 9]
+
+
+def test_grows_past_capacity():
+    history = ImageHistory()
+    for item in range(100):
+        history.append(item)
+    assert list(history) == list(range(100))
+
+
+def test_delete_in_the_middle():
+    history = ImageHistory()
+    for item in range(8):
+        history.append(item)
+    del history[2]
+    del history[5]
+    assert list(history) == [0, 1, 3, 4, 5, 7]
+    del history[0]
+    del history[-1]
+    assert list(history) == [1, 3, 4, 5]
+
+
+def test_set_and_clear():
+    history = ImageHistory()
+    history.append('a')
+    history[0] = 'b'
+    assert history[0] == 'b'
+    history.clear()
+    assert len(history) == 0
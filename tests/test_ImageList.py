@@ -0,0 +1,201 @@
+import shutil
+from os import path
+from pathlib import Path
+from threading import Event
+
+import pytest
+from PIL import Image
+
+from Config import Config
+from app.FileWatcher import FileWatcher
+from app.ImageList import ImageList
+from app.ImagePath import ImagePath
+from app.MoveEngine import MoveEngine
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+@pytest.fixture
+def imageList(tmp_path, monkeypatch):
+    images = tmp_path / 'images'
+    images.mkdir()
+    for index in range(12):
+        Image.new('RGB', (64, 48), (index * 20, 0, 0)).save(
+            images / f"{index}.png")
+    shutil.copy(path.join(ROOT, 'config.ini'), tmp_path / 'config.ini')
+    monkeypatch.chdir(tmp_path)
+    config = Config('config.ini')
+    config.config['locations']['deletePaths'] = [str(tmp_path / 'deleted')]
+    config.config['locations']['usedDeletePath'] = '0'
+    imageList = ImageList(config, [str(images)], [12], maxlen=100)
+    yield imageList
+    imageList.close()
+
+
+def assertWindow(imageList: ImageList):
+    """
+    The loaded images are the images around the index, in order.
+    """
+    start = imageList.index - imageList.imageIndex
+    assert start >= 0
+    assert [loaded.imagePath for loaded in imageList.loadedImages] == \
+        [imageList.images[index] for index in
+         range(start, start + len(imageList.loadedImages))]
+    assert imageList.currentLoaded.imagePath is imageList.current
+    assert len(imageList.loadedImages) - imageList.imageIndex - 1 == \
+        imageList.forwardBuffer
+
+
+def test_last_image_of_a_short_list(imageList):
+    assert len(imageList.images) == imageList.forwardBuffer + 1
+    imageList.lastImage()
+    assert imageList.index == 0
+    assertWindow(imageList)
+
+
+def test_first_and_last_image(imageList):
+    for _ in range(8):
+        imageList.nextImage()
+    imageList.firstImage()
+    assert imageList.index == 0
+    assertWindow(imageList)
+    imageList.lastImage()
+    assert imageList.index == \
+        len(imageList.images) - 1 - imageList.forwardBuffer
+    assertWindow(imageList)
+
+
+def test_load_end_of_exactly_one_window(imageList):
+    length = imageList.backwardBuffer + imageList.forwardBuffer + 1
+    while len(imageList.images) < length:
+        imageList.images.append(imageList.randomImagePath)
+    imageList.loadEnd()
+    assert len(imageList.loadedImages) == length
+    assertWindow(imageList)
+
+
+def test_jumps_keep_the_window(imageList):
+    for steps in (1, 6, -2, -20, 3):
+        imageList.jump(steps)
+        assertWindow(imageList)
+    assert imageList.currentImage.size == (64, 48)
+
+
+class HeldEngine(MoveEngine):
+    """
+    Moves files once the test lets them go.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release: Event = Event()
+        self.started: Event = Event()
+
+    def move(self, src, dst, progress=None):
+        self.started.set()
+        self.release.wait(5)
+        super().move(src, dst, progress)
+
+
+def decide(imageList: ImageList, imagePath: ImagePath, decision: str):
+    """
+    Keeps or deletes the image the way the GUI does, the status is
+    set after the move is queued.
+    """
+    imageList.moveImage(imagePath, decision)
+    imagePath.status = decision != 'delete'
+
+
+def settle(imageList: ImageList):
+    imageList.moveQueue.engine.release.set()
+    imageList.moveQueue.close()
+
+
+@pytest.fixture
+def held(imageList):
+    imageList.moveQueue.engine = HeldEngine()
+    # a move of another file keeps the worker busy
+    blocker = next(imagePath for imagePath in imageList.images
+                   if imagePath.properPath != imageList.images[0].properPath)
+    decide(imageList, blocker, 'delete')
+    assert imageList.moveQueue.engine.started.wait(5)
+    return imageList
+
+
+def test_keep_before_the_delete_ran(held):
+    imagePath = held.images[0]
+    properPath = imagePath.properPath
+    decide(held, imagePath, 'delete')
+    decide(held, imagePath, 'keep')
+    assert imagePath.path == properPath
+    settle(held)
+    assert path.exists(properPath)
+    assert not path.exists(imagePath.deletePath)
+    assert not held.moveQueue.history or \
+        held.moveQueue.history[-1].imagePath is not imagePath
+
+
+def test_keep_while_the_delete_runs(imageList):
+    imageList.moveQueue.engine = HeldEngine()
+    imagePath = imageList.images[0]
+    properPath = imagePath.properPath
+    decide(imageList, imagePath, 'delete')
+    assert imageList.moveQueue.engine.started.wait(5)
+    decide(imageList, imagePath, 'keep')
+    # the file is still where it was until the delete is done
+    assert imagePath.path == properPath
+    settle(imageList)
+    assert imagePath.path == properPath
+    assert path.exists(properPath)
+    assert not path.exists(imagePath.deletePath)
+
+
+def test_delete_before_the_move_ran(held, tmp_path):
+    imagePath = held.images[0]
+    properPath = imagePath.properPath
+    held.moveImage(imagePath, str(tmp_path / 'kept'))
+    imagePath.status = True
+    decide(held, imagePath, 'delete')
+    settle(held)
+    assert path.exists(imagePath.deletePath)
+    assert not path.exists(tmp_path / 'kept' / '0.png')
+    assert not path.exists(properPath)
+    task = held.moveQueue.history[-1]
+    assert (task.src, task.dst) == (properPath, imagePath.deletePath)
+    # undo goes back to before the first decision
+    assert task.previousStatus is None
+    assert task.previousProperPath == properPath
+
+
+def test_ready_watcher_answers_without_the_file_system(imageList, tmp_path):
+    watcher = FileWatcher.create(str(tmp_path / 'images'), ('.png',))
+    watcher.start()
+    assert watcher.ready.wait(5)
+    imageList.setFileWatcher(watcher)
+    current = imageList.current.path
+    imageList.goneFiles.add(current)
+    assert not imageList.pathExistsAt(imageList.index)
+    imageList.goneFiles.clear()
+    # a file the watcher did not report gone is taken to exist
+    Path(current).unlink()
+    assert imageList.pathExistsAt(imageList.index)
+    imageList.setFileWatcher(None)
+    assert not imageList.pathExistsAt(imageList.index)
+
+
+def test_preview_is_shown_until_the_render_is_done(imageList, monkeypatch):
+    canvasSize = (200, 100)
+    loadedImage = imageList.currentLoaded
+    filters = []
+    resized = loadedImage.resized
+
+    def recordFilter(size, resample=None):
+        filters.append(resample)
+        return resized(size, resample)
+
+    monkeypatch.setattr(loadedImage, 'resized', recordFilter)
+    preview = imageList.previewCurrent(canvasSize)
+    render = imageList.renderCurrent(canvasSize).result(timeout=5)
+    assert preview.size == render.size == loadedImage.fitSize(canvasSize)
+    assert filters == [Image.NEAREST, imageList.RESAMPLE]
+    assert imageList.renderCost is not None
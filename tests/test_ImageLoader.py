@@ -0,0 +1,168 @@
+from concurrent.futures import CancelledError
+from threading import Event, Lock, current_thread
+from time import sleep
+
+import pytest
+from PIL import Image
+
+import app.ImageLoader
+from app.ImageCache import ImageCache
+from app.ImageLoader import ImageLoader
+from app.ImagePath import ImagePath
+from app.ImagePyramid import ImagePyramid
+from app.LazyImage import LazyImage
+from app.LoadScheduler import LoadScheduler
+
+
+@pytest.fixture
+def images(tmp_path):
+    imagePaths = []
+    for index in range(4):
+        filename = tmp_path / f"{index}.png"
+        Image.new('RGB', (640, 480), (index * 60, 0, 0)).save(filename)
+        imagePaths.append(ImagePath(str(filename), str(tmp_path / 'deleted')))
+    return imagePaths
+
+
+@pytest.fixture
+def loader():
+    loader = ImageLoader(ImageCache(64 * 1_048_576, 64 * 1_048_576))
+    yield loader
+    loader.shutdown()
+
+
+@pytest.fixture
+def slowDecode(monkeypatch):
+    """
+    Holds every decode until release is set, decoded gets the
+    filenames in the order they were decoded.
+    """
+    started, release, decoded = Event(), Event(), []
+    displayImage = ImagePath.displayImage
+
+    def decode(imagePath, *args):
+        started.set()
+        release.wait(5)
+        decoded.append(imagePath.filename)
+        return displayImage(imagePath, *args)
+
+    monkeypatch.setattr(ImagePath, 'displayImage', decode)
+    return started, release, decoded
+
+
+def waitUntil(condition):
+    for _ in range(500):
+        if condition():
+            return
+        sleep(0.01)
+    raise TimeoutError("the loader did not get there")
+
+
+def test_pyramid_is_built_by_the_decode_worker(images, loader, monkeypatch):
+    builders = []
+
+    class RecordedPyramid(ImagePyramid):
+        def __init__(self, image, *args):
+            builders.append(current_thread().name)
+            super().__init__(image, *args)
+
+    monkeypatch.setattr(app.ImageLoader, 'ImagePyramid', RecordedPyramid)
+    lazyImage = LazyImage(images[0], loader)
+    pyramid = lazyImage.pyramid
+    assert isinstance(pyramid, ImagePyramid)
+    assert [level.size for level in pyramid.levels] == \
+        [(640, 480), (320, 240), (160, 120)]
+    assert lazyImage.image is pyramid.image
+    assert lazyImage.memory == pyramid.memory
+    assert len(builders) == 1 and builders[0].startswith('ImageDecoder')
+
+
+def test_hot_cache_hit_reuses_the_pyramid(images, loader, monkeypatch):
+    first = LazyImage(images[0], loader)
+    pyramid = first.pyramid
+    monkeypatch.setattr(app.ImageLoader, 'ImagePyramid', None)
+    second = LazyImage(images[0], loader)
+    assert second.loaded
+    assert second.pyramid is pyramid
+    assert loader.cache.hotHits == 1
+
+
+def test_decodes_follow_the_load_priority(images, slowDecode):
+    started, release, decoded = slowDecode
+    loader = ImageLoader(ImageCache(0, 0), workers=1)
+    try:
+        futures = [loader.submit(images[0])]
+        assert started.wait(5)
+        for imagePath, priority in ((images[1], LoadScheduler.SPECULATIVE),
+                                    (images[2], LoadScheduler.FORWARD),
+                                    (images[3], LoadScheduler.CURRENT)):
+            futures.append(loader.submit(imagePath, priority=(priority, 1)))
+        waitUntil(lambda: loader.decodeQueue.qsize() == 3)
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        loader.shutdown()
+    assert decoded == ['0.png', '3.png', '2.png', '1.png']
+
+
+def test_reads_wait_while_the_decodes_fall_behind(images, slowDecode):
+    started, release, decoded = slowDecode
+    loader = ImageLoader(ImageCache(0, 0), workers=1, decodeQueueSize=1)
+    try:
+        futures = [loader.submit(images[0])]
+        assert started.wait(5)
+        futures += [loader.submit(imagePath) for imagePath in images[1:]]
+        waitUntil(loader.decodeQueue.full)
+        sleep(0.05)
+        assert loader.decodeQueue.qsize() == 1
+        # the other reads are done and wait for room in the queue
+        assert [running for *_, running in loader.pending] == [True] * 4
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        loader.shutdown()
+    assert sorted(decoded) == ['0.png', '1.png', '2.png', '3.png']
+
+
+def test_reads_on_one_device_are_limited(images, monkeypatch):
+    reading, most, lock = [0], [0], Lock()
+    read = ImagePath.read
+
+    def slowRead(imagePath):
+        with lock:
+            reading[0] += 1
+            most[0] = max(most[0], reading[0])
+        sleep(0.05)
+        with lock:
+            reading[0] -= 1
+        return read(imagePath)
+
+    monkeypatch.setattr(ImagePath, 'read', slowRead)
+    loader = ImageLoader(ImageCache(0, 0), readWorkers=4, readsPerDevice=2)
+    try:
+        for future in [loader.submit(imagePath) for imagePath in images]:
+            future.result(timeout=5)
+    finally:
+        loader.shutdown()
+    assert most[0] == 2
+
+
+def test_load_cancelled_before_its_decode_is_not_decoded(images,
+                                                         slowDecode):
+    started, release, decoded = slowDecode
+    loader = ImageLoader(ImageCache(0, 0), workers=1)
+    try:
+        first = loader.submit(images[0])
+        assert started.wait(5)
+        cancelled = loader.submit(images[1])
+        waitUntil(lambda: loader.decodeQueue.qsize() == 1)
+        loader.cancel(cancelled)
+        release.set()
+        first.result(timeout=5)
+        with pytest.raises(CancelledError):
+            cancelled.result(timeout=5)
+    finally:
+        loader.shutdown()
+    assert decoded == ['0.png']
@@ -0,0 +1,45 @@
+import pytest
+from PIL import Image
+
+from app.ImageCache import ImageCache
+from app.ImagePath import ImagePath
+
+
+@pytest.fixture
+def image(tmp_path):
+    def save(extension: str) -> ImagePath:
+        filename = tmp_path / f"image.{extension}"
+        Image.new('RGB', (1600, 1200), (200, 40, 40)).save(filename)
+        return ImagePath(str(filename), str(tmp_path / 'deleted'))
+    return save
+
+
+def test_jpeg_is_drafted_down_to_the_display_size(image):
+    imagePath = image('jpg')
+    decoded = imagePath.displayImage((400, 400))
+    assert imagePath.fullResolution == (1600, 1200)
+    # draft scales by 1/4, the fitted size is 400x300
+    assert decoded.size == (400, 300)
+
+
+def test_other_formats_are_reduced_by_a_whole_factor(image):
+    imagePath = image('png')
+    decoded = imagePath.displayImage((500, 500))
+    assert imagePath.fullResolution == (1600, 1200)
+    # a factor of 4 would make it smaller than the fitted 500x375
+    assert decoded.size == (534, 400)
+
+
+def test_full_resolution_without_display_size(image):
+    imagePath = image('jpg')
+    with open(imagePath.path, 'rb') as file:
+        data = file.read()
+    assert imagePath.displayImage().size == (1600, 1200)
+    assert imagePath.displayImage((2000, 2000), data).size == (1600, 1200)
+
+
+def test_decode_covers_only_smaller_display_sizes():
+    assert ImageCache.covers(None, (4000, 4000))
+    assert ImageCache.covers((800, 600), (800, 600))
+    assert not ImageCache.covers((800, 600), (801, 600))
+    assert not ImageCache.covers((800, 600), None)
@@ -0,0 +1,123 @@
+from concurrent.futures import CancelledError
+from threading import Event
+
+import pytest
+
+from app.LoadScheduler import LoadScheduler
+
+CURRENT, FORWARD, BACKWARD, SPECULATIVE = (
+    LoadScheduler.CURRENT, LoadScheduler.FORWARD, LoadScheduler.BACKWARD,
+    LoadScheduler.SPECULATIVE)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = LoadScheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def block(scheduler: LoadScheduler) -> Event:
+    """
+    Keeps the only worker busy until the returned event is set.
+    """
+    started, release = Event(), Event()
+
+    def wait():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit(wait, priority=(CURRENT, 0), name='blocker')
+    assert started.wait(5)
+    return release
+
+
+def test_loads_run_in_order_of_priority(scheduler):
+    release = block(scheduler)
+    order = []
+    futures = [scheduler.submit(order.append, name, priority=priority,
+                                name=name)
+               for name, priority in (('speculative', (SPECULATIVE, 0)),
+                                      ('backward', (BACKWARD, 1)),
+                                      ('forward 2', (FORWARD, 2)),
+                                      ('forward 1', (FORWARD, 1)),
+                                      ('current', (CURRENT, 0)))]
+    assert [name for _, name, _ in scheduler.pending()] == \
+        ['blocker', 'current', 'forward 1', 'forward 2', 'backward',
+         'speculative']
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ['current', 'forward 1', 'forward 2', 'backward',
+                     'speculative']
+
+
+def test_prioritized_load_runs_first(scheduler):
+    release = block(scheduler)
+    order = []
+    first = scheduler.submit(order.append, 'first', priority=(FORWARD, 1))
+    second = scheduler.submit(order.append, 'second',
+                              priority=(SPECULATIVE, 0))
+    scheduler.prioritize(second, (CURRENT, 0))
+    release.set()
+    first.result(timeout=5)
+    second.result(timeout=5)
+    assert order == ['second', 'first']
+
+
+def test_cancelled_waiting_load_does_not_run(scheduler):
+    release = block(scheduler)
+    order = []
+    cancelled = scheduler.submit(order.append, 'cancelled')
+    kept = scheduler.submit(order.append, 'kept')
+    assert scheduler.cancel(cancelled)
+    release.set()
+    kept.result(timeout=5)
+    assert cancelled.cancelled()
+    assert order == ['kept']
+    assert not scheduler.cancel(cancelled)
+
+
+def test_cancelled_running_load_stops_at_its_checkpoint(scheduler):
+    started, cancelled, steps = Event(), Event(), []
+
+    def load():
+        started.set()
+        cancelled.wait(5)
+        scheduler.checkpoint()
+        steps.append('after checkpoint')
+
+    future = scheduler.submit(load)
+    assert started.wait(5)
+    assert scheduler.cancel(future)
+    cancelled.set()
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert steps == []
+
+
+def test_deferred_load_is_done_once_completed(scheduler):
+    deferred = []
+
+    def load():
+        deferred.append(scheduler.defer())
+        return 'ignored'
+
+    future = scheduler.submit(load, name='deferred')
+    # the worker is free for the next load while it is deferred
+    scheduler.submit(lambda: None).result(timeout=5)
+    assert not future.done()
+    assert [name for _, name, _ in scheduler.pending()] == ['deferred']
+    scheduler.complete(deferred[0], 'result')
+    assert future.result(timeout=5) == 'result'
+    assert scheduler.pending() == []
+
+
+def test_shutdown_cancels_waiting_loads(scheduler):
+    release = block(scheduler)
+    waiting = scheduler.submit(lambda: None)
+    scheduler.shutdown()
+    release.set()
+    assert waiting.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(lambda: None)
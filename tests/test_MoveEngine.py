@@ -0,0 +1,84 @@
+from errno import EXDEV
+from os import stat, utime
+
+import pytest
+
+import app.MoveEngine
+from app.MoveEngine import MoveEngine
+
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / 'source.jpg'
+    source.write_bytes(bytes(range(256)) * 40)
+    utime(source, ns=(0, 1_000_000_000))
+    return source
+
+
+@pytest.fixture
+def crossDevice(monkeypatch):
+    """
+    Makes every destination look like it is on another device.
+    """
+    monkeypatch.setattr(MoveEngine, 'sameDevice', lambda *_: False)
+    monkeypatch.setattr(MoveEngine, 'CHUNK', 4096)
+
+
+def test_same_device_is_a_rename(source, tmp_path):
+    inode = stat(source).st_ino
+    target = tmp_path / 'target' / 'source.jpg'
+    MoveEngine().move(str(source), str(target))
+    assert not source.exists()
+    assert stat(target).st_ino == inode
+
+
+def test_cross_device_is_a_verified_copy(source, tmp_path, crossDevice):
+    data = source.read_bytes()
+    target = tmp_path / 'target' / 'source.jpg'
+    target.parent.mkdir()
+    target.write_bytes(b'replaced')
+    progress = []
+    MoveEngine().move(str(source), str(target),
+                      lambda copied, total: progress.append((copied, total)))
+    assert not source.exists()
+    assert target.read_bytes() == data
+    assert stat(target).st_mtime_ns == 1_000_000_000
+    assert progress == [(4096, 10240), (8192, 10240), (10240, 10240)]
+    assert list(target.parent.iterdir()) == [target]
+
+
+def test_copy_that_does_not_match_keeps_the_file(source, tmp_path,
+                                                 crossDevice, monkeypatch):
+    monkeypatch.setattr(MoveEngine, 'checksum',
+                        classmethod(lambda cls, filePath: b'damaged'))
+    target = tmp_path / 'target' / 'source.jpg'
+    with pytest.raises(OSError):
+        MoveEngine().move(str(source), str(target))
+    assert source.exists()
+    assert list(target.parent.iterdir()) == []
+
+
+def test_rename_across_devices_falls_back_to_a_copy(source, tmp_path,
+                                                    monkeypatch):
+    data = source.read_bytes()
+    replace = app.MoveEngine.replace
+
+    def renameFails(src, dst):
+        if src == str(source):
+            raise OSError(EXDEV, "Invalid cross-device link")
+        replace(src, dst)
+
+    monkeypatch.setattr(app.MoveEngine, 'replace', renameFails)
+    target = tmp_path / 'target' / 'source.jpg'
+    MoveEngine().move(str(source), str(target))
+    assert not source.exists()
+    assert target.read_bytes() == data
+
+
+def test_device_of_a_new_directory_is_not_cached(tmp_path):
+    engine = MoveEngine()
+    directory = tmp_path / 'new' / 'directory'
+    assert engine.device(str(directory)) == stat(tmp_path).st_dev
+    assert str(directory) not in engine._devices
+    assert engine.device(str(tmp_path)) == stat(tmp_path).st_dev
+    assert str(tmp_path) in engine._devices
@@ -0,0 +1,153 @@
+import json
+from os import path
+from threading import Event, current_thread
+from time import sleep
+
+import pytest
+
+from app.ImagePath import ImagePath
+from app.MoveEngine import MoveEngine
+from app.MoveQueue import MoveQueue, MoveTask
+
+
+def waitFor(moveQueue: MoveQueue):
+    for _ in range(200):
+        if moveQueue.pending == 0:
+            return
+        sleep(0.01)
+    raise TimeoutError("moves are not done")
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    for name in ('0.jpg', '1.jpg', '2.jpg'):
+        (source / name).write_bytes(name.encode())
+    return tmp_path
+
+
+def test_replay_does_the_open_moves(files):
+    source, target = files / 'source', files / 'target'
+    journal = files / 'journal.txt'
+    records = [{'move': 0, 'src': str(source / '0.jpg'),
+                'dst': str(target / '0.jpg')},
+               {'move': 1, 'src': str(source / '1.jpg'),
+                'dst': str(target / '1.jpg')},
+               {'move': 2, 'src': str(source / '2.jpg'),
+                'dst': str(target / '2.jpg')},
+               {'done': 1}, {'cancel': 2}]
+    journal.write_text(''.join(json.dumps(record) + '\n'
+                               for record in records) + '{"move": 3, "sr',
+                       encoding='utf-8')
+    moveQueue = MoveQueue(str(journal))
+    moveQueue.close()
+    assert moveQueue.replayed == 1
+    assert sorted(path.name for path in target.iterdir()) == ['0.jpg']
+    assert sorted(path.name for path in source.iterdir()) == ['1.jpg', '2.jpg']
+    assert journal.read_text(encoding='utf-8') == ''
+
+
+def test_replay_skips_moves_whose_file_is_gone(files):
+    journal = files / 'journal.txt'
+    journal.write_text(json.dumps({'move': 0, 'src': str(files / 'gone.jpg'),
+                                   'dst': str(files / 'x.jpg')}) + '\n',
+                       encoding='utf-8')
+    moveQueue = MoveQueue(str(journal))
+    moveQueue.close()
+    assert moveQueue.replayed == 0
+
+
+def test_move_points_at_the_file_until_done(files):
+    imagePath = ImagePath(str(files / 'source' / '0.jpg'),
+                          str(files / 'deleted'))
+    moveQueue = MoveQueue(str(files / 'journal.txt'))
+    moveQueue.move(imagePath.path, imagePath.deletePath, imagePath)
+    imagePath.status = False
+    waitFor(moveQueue)
+    assert imagePath.movingFrom is None
+    assert imagePath.path == imagePath.deletePath
+    assert (files / 'deleted' / '0.jpg').exists()
+    undone = moveQueue.undo()
+    waitFor(moveQueue)
+    moveQueue.close()
+    assert undone[0].previousStatus is None
+    assert (files / 'source' / '0.jpg').exists()
+
+
+def test_failed_move_is_reported_once(files):
+    (files / 'blocker').write_bytes(b'')
+    imagePath = ImagePath(str(files / 'source' / '0.jpg'),
+                          str(files / 'blocker' / 'deleted'))
+    moveQueue = MoveQueue(str(files / 'journal.txt'))
+    moveQueue.move(imagePath.path, imagePath.deletePath, imagePath)
+    waitFor(moveQueue)
+    failed = moveQueue.failedMoves()
+    assert [task.state for task in failed] == [MoveTask.FAILED]
+    assert failed[0].error is not None
+    assert moveQueue.failedMoves() == []
+    assert not moveQueue.history
+    moveQueue.close()
+    assert (files / 'source' / '0.jpg').exists()
+    # the failed move is not tried again on the next start
+    moveQueue = MoveQueue(str(files / 'journal.txt'))
+    moveQueue.close()
+    assert moveQueue.replayed == 0
+
+
+def test_failed_move_reverts_the_move_that_follows_it(files):
+    (files / 'blocker').write_bytes(b'')
+    imagePath = ImagePath(str(files / 'source' / '0.jpg'),
+                          str(files / 'blocker' / 'deleted'))
+    moveQueue = MoveQueue(str(files / 'journal.txt'))
+    release = Event()
+    move = moveQueue.engine.move
+    moveQueue.engine.move = lambda *args: (release.wait(5), move(*args))
+    first = moveQueue.move(imagePath.path, imagePath.deletePath, imagePath)
+    imagePath.status = False
+    while first.state == MoveTask.QUEUED:
+        sleep(0.01)
+    second = moveQueue.move(imagePath.decidedPath, imagePath.properPath,
+                            imagePath)
+    assert second.src == imagePath.deletePath
+    imagePath.status = True
+    release.set()
+    waitFor(moveQueue)
+    # the follower is reverted first, the image ends up undecided
+    assert moveQueue.failedMoves() == [second, first]
+    assert first.previousStatus is None
+    assert imagePath.path == str(files / 'source' / '0.jpg')
+    moveQueue.close()
+
+
+def test_replay_runs_on_the_worker_before_new_moves(files):
+    source, target = files / 'source', files / 'target'
+    journal = files / 'journal.txt'
+    journal.write_text(json.dumps({'move': 0, 'src': str(source / '0.jpg'),
+                                   'dst': str(target / '0.jpg')}) +
+                       '\n{"move": 1, "sr', encoding='utf-8')
+    release = Event()
+    moves = []
+    engine = MoveEngine()
+    move = engine.move
+
+    def heldMove(src, dst, progress=None):
+        release.wait(5)
+        moves.append((current_thread().name, path.basename(src)))
+        move(src, dst, progress)
+
+    engine.move = heldMove
+    # returns while the replayed move is held
+    moveQueue = MoveQueue(str(journal), engine=engine)
+    moveQueue.move(str(source / '1.jpg'), str(target / '1.jpg'))
+    assert moves == []
+    release.set()
+    waitFor(moveQueue)
+    # the cut off line of the earlier session is not joined with the
+    # records of this one
+    records = [line for line in journal.read_text(encoding='utf-8')
+               .splitlines() if line.startswith('{"move"')]
+    assert json.loads(records[-1])['src'] == str(source / '1.jpg')
+    moveQueue.close()
+    assert moveQueue.replayed == 1
+    assert moves == [('MoveQueue', '0.jpg'), ('MoveQueue', '1.jpg')]
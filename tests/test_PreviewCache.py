@@ -0,0 +1,98 @@
+from os import listdir, utime
+
+import pytest
+from PIL import Image
+
+from app.ImagePath import ImagePath
+from app.PreviewCache import PreviewCache
+
+
+def flush(cache: PreviewCache):
+    # the previews are written in order by a single thread
+    cache.executor.submit(lambda: None).result()
+
+
+@pytest.fixture
+def images(tmp_path):
+    def save(name: str, mode: str = 'RGB') -> ImagePath:
+        filename = tmp_path / name
+        Image.new(mode, (1600, 1200), (200, 40, 40, 255)[:len(mode)]) \
+            .save(filename)
+        imagePath = ImagePath(str(filename), str(tmp_path / 'deleted'))
+        imagePath.fullResolution = (1600, 1200)
+        return imagePath
+    return save
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PreviewCache(str(tmp_path / 'previews'), 1_048_576)
+    yield cache
+    cache.shutdown()
+
+
+def test_preview_is_used_for_smaller_display_sizes(images, cache):
+    imagePath = images('image.png')
+    cache.fill(imagePath, Image.new('RGB', (400, 300)))
+    flush(cache)
+    imagePath.fullResolution = None
+    preview = cache.get(imagePath, (400, 400))
+    assert preview.size == (400, 300)
+    assert imagePath.fullResolution == (1600, 1200)
+    assert cache.get(imagePath, (800, 800)) is None
+    assert cache.get(imagePath) is None
+
+
+def test_transparent_images_are_stored_as_png(images, cache):
+    imagePath = images('image.png', 'RGBA')
+    cache.fill(imagePath, Image.new('RGBA', (400, 300)))
+    flush(cache)
+    assert [name[-4:] for name in listdir(cache.directory)] == ['.png']
+    assert cache.get(imagePath, (400, 300)).mode == 'RGBA'
+
+
+def test_nothing_is_written_for_full_resolution(images, cache):
+    imagePath = images('image.png')
+    cache.fill(imagePath, Image.new('RGB', (1600, 1200)))
+    flush(cache)
+    assert listdir(cache.directory) == []
+
+
+def test_changed_original_does_not_use_the_old_preview(images, cache):
+    imagePath = images('image.png')
+    cache.fill(imagePath, Image.new('RGB', (400, 300)))
+    flush(cache)
+    utime(imagePath.path, ns=(0, 1_000_000_000))
+    assert cache.get(imagePath, (400, 300)) is None
+
+
+def test_larger_decode_rewrites_the_preview(images, cache):
+    imagePath = images('image.png')
+    cache.fill(imagePath, Image.new('RGB', (400, 300)))
+    cache.fill(imagePath, Image.new('RGB', (200, 150)))
+    cache.fill(imagePath, Image.new('RGB', (800, 600)))
+    flush(cache)
+    assert len(listdir(cache.directory)) == 1
+    assert cache.get(imagePath, (800, 800)).size == (800, 600)
+
+
+def test_least_recently_used_previews_are_removed(images, tmp_path):
+    first, second, third = (images(f"{index}.png") for index in range(3))
+    cache = PreviewCache(str(tmp_path / 'previews'), 1_048_576)
+    for imagePath in (first, second):
+        cache.fill(imagePath,
+                   Image.effect_noise((400, 300), 64).convert('RGB'))
+    flush(cache)
+    cache.maxBytes = cache.usedBytes
+    assert cache.get(first, (400, 300)) is not None
+    cache.fill(third, Image.effect_noise((200, 150), 64).convert('RGB'))
+    flush(cache)
+    cache.shutdown()
+    assert cache.get(second, (400, 300)) is None
+    assert cache.get(first, (400, 300)) is not None
+    assert cache.get(third, (200, 150)) is not None
+    # the previews on disk are read by the next session
+    reopened = PreviewCache(cache.directory, 1_048_576)
+    flush(reopened)
+    reopened.shutdown()
+    assert reopened.usedBytes == cache.usedBytes
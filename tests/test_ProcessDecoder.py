@@ -0,0 +1,105 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.ImageCache import ImageCache
+from app.ImageLoader import ImageLoader
+from app.ImagePath import ImagePath
+from app.ProcessDecoder import ProcessDecoder
+from app.SharedBlockPool import SharedBlockPool
+
+MB = 1_048_576
+
+
+@pytest.fixture
+def pool():
+    pool = SharedBlockPool(4 * MB)
+    yield pool
+    pool.close()
+
+
+def test_block_sizes_are_powers_of_two():
+    assert SharedBlockPool.blockSize(1) == MB
+    assert SharedBlockPool.blockSize(MB) == MB
+    assert SharedBlockPool.blockSize(MB + 1) == 2 * MB
+    assert SharedBlockPool.blockSize(3 * MB) == 4 * MB
+
+
+def test_released_blocks_are_reused(pool):
+    block = pool.acquire(MB)
+    name = block.name
+    pool.release(block)
+    again = pool.acquire(MB // 2)
+    assert again.name == name
+    assert pool.usedBytes == MB
+    pool.release(again)
+
+
+def test_budget_is_kept(pool):
+    first = pool.acquire(2 * MB)
+    second = pool.acquire(2 * MB)
+    assert pool.acquire(MB) is None
+    pool.release(second)
+    # the free block of another size makes room
+    third = pool.acquire(MB)
+    assert third is not None
+    assert pool.usedBytes == 3 * MB
+    for block in (first, third):
+        pool.release(block)
+
+
+def encoded(mode: str = 'RGB') -> bytes:
+    image = Image.new(mode, (300, 200), (10, 200, 30))
+    image.putpixel((5, 7), (255, 0, 255))
+    data = BytesIO()
+    image.save(data, 'PNG')
+    return data.getvalue()
+
+
+@pytest.fixture
+def decoder():
+    decoder = ProcessDecoder(1, 8 * MB)
+    yield decoder
+    decoder.shutdown()
+
+
+def test_decode_writes_the_pixels_into_a_shared_block(decoder):
+    imagePath = ImagePath('', '')
+    image, sharedBytes = decoder.decode(imagePath, None, encoded())
+    assert image.mode == 'RGBX' and image.size == (300, 200)
+    assert image.getpixel((5, 7))[:3] == (255, 0, 255)
+    assert image.getpixel((0, 0))[:3] == (10, 200, 30)
+    assert imagePath.fullResolution == (300, 200)
+    assert imagePath.imageFormat == 'PNG'
+    assert sharedBytes == MB
+    assert decoder.pool.usedBytes == MB
+    del image
+    # the block is free again once the image is gone
+    block = decoder.pool.acquire(MB)
+    assert block is not None and decoder.pool.usedBytes == MB
+    decoder.pool.release(block)
+
+
+def test_decode_without_room_sends_the_pixels_back():
+    decoder = ProcessDecoder(1, 0)
+    try:
+        image, sharedBytes = decoder.decode(ImagePath('', ''), None,
+                                            encoded())
+    finally:
+        decoder.shutdown()
+    assert sharedBytes == 0
+    assert image.getpixel((5, 7))[:3] == (255, 0, 255)
+
+
+def test_shared_block_is_counted_in_the_cache(tmp_path, decoder):
+    filename = tmp_path / 'image.png'
+    filename.write_bytes(encoded())
+    loader = ImageLoader(ImageCache(64 * MB, 64 * MB),
+                         processDecoder=decoder)
+    try:
+        pyramid = loader.submit(ImagePath(str(filename), '')).result(30)
+        assert pyramid.sharedBytes == MB
+        assert loader.cache.usedBytes['hot'] == pyramid.memory > MB
+    finally:
+        loader.shutdown()
@@ -0,0 +1,107 @@
+from concurrent.futures import CancelledError, Future
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.ImagePyramid import ImagePyramid
+from app.Renderer import Renderer
+
+
+class Decoding:
+    """
+    Stands in for a LazyImage, the test finishes its decode.
+    """
+
+    def __init__(self, name: str):
+        self.imagePath = SimpleNamespace(path=name)
+        self.decode: Future | None = Future()
+        self.pyramid = ImagePyramid(Image.new('RGB', (640, 480)))
+        self.resizes: list = []
+
+    def decoded(self) -> 'Decoding':
+        self.decode.set_result(self.pyramid)
+        return self
+
+    def resized(self, size: tuple[int, int], resample: int = None):
+        self.resizes.append(size)
+        return self.pyramid.resize(size, resample)
+
+
+@pytest.fixture
+def renderer():
+    renderer = Renderer(maxlen=2)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_render_waits_for_the_decode(renderer):
+    image = Decoding('image')
+    render = renderer.render(image, (320, 240))
+    assert not render.done() and image.resizes == []
+    image.decoded()
+    assert render.result(timeout=5).size == (320, 240)
+
+
+def test_render_is_cached_by_size(renderer):
+    image = Decoding('image').decoded()
+    render = renderer.render(image, (200, 150))
+    render.result(timeout=5)
+    assert renderer.render(image, (200, 150)) is render
+    renderer.render(image, (100, 75)).result(timeout=5)
+    assert image.resizes == [(200, 150), (100, 75)]
+
+
+def test_least_recently_used_render_is_dropped(renderer):
+    first, second, third = (Decoding(name) for name in 'abc')
+    firstRender = renderer.render(first, (200, 150))
+    renderer.render(second, (200, 150))
+    renderer.render(third, (200, 150))
+    assert firstRender.cancelled()
+    first.decoded()
+    assert first.resizes == []
+    assert renderer.render(first, (200, 150)) is not firstRender
+
+
+def test_renders_of_other_images_are_cancelled(renderer):
+    kept, dropped = Decoding('kept'), Decoding('dropped')
+    keptRender = renderer.render(kept, (200, 150))
+    droppedRender = renderer.render(dropped, (200, 150))
+    renderer.cancelExcept(['kept'])
+    assert droppedRender.cancelled() and not keptRender.cancelled()
+    kept.decoded()
+    assert keptRender.result(timeout=5).size == (200, 150)
+
+
+def test_failed_render_is_scheduled_again(renderer):
+    image = Decoding('image').decoded()
+    resized = image.resized
+
+    def broken(*_):
+        raise OSError("broken")
+
+    image.resized = broken
+    render = renderer.render(image, (200, 150))
+    with pytest.raises(OSError):
+        render.result(timeout=5)
+    image.resized = resized
+    again = renderer.render(image, (200, 150))
+    assert again is not render
+    assert again.result(timeout=5).size == (200, 150)
+
+
+def test_closed_image_is_not_rendered(renderer):
+    image = Decoding('image')
+    image.decode = None
+    with pytest.raises(CancelledError):
+        renderer.render(image, (200, 150)).result(timeout=5)
+
+
+def test_render_cost_is_a_moving_average(renderer, monkeypatch):
+    times = iter([0.0, 0.4, 1.0, 1.2])
+    monkeypatch.setattr('app.Renderer.perf_counter', lambda: next(times))
+    image = Decoding('image').decoded()
+    renderer.render(image, (200, 150)).result(timeout=5)
+    assert renderer.cost == pytest.approx(0.4)
+    renderer.render(image, (100, 75)).result(timeout=5)
+    assert renderer.cost == pytest.approx(0.4 + Renderer.COST_WEIGHT * -0.2)
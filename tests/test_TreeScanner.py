@@ -0,0 +1,97 @@
+from os import makedirs, path, utime
+
+import pytest
+
+from app.TreeScanner import TreeScanner
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for directory, files in (('a', ['1.jpg', '2.png', 'notes.txt']),
+                             ('a/b', ['3.jpg']),
+                             ('skip', ['4.jpg']),
+                             ('skip/deeper', ['5.jpg'])):
+        makedirs(tmp_path / directory, exist_ok=True)
+        for file in files:
+            (tmp_path / directory / file).write_bytes(b'')
+    return tmp_path
+
+
+def scanner(tree, **kwargs) -> TreeScanner:
+    blacklist = kwargs.pop('blacklist', '')
+    return TreeScanner(('.jpg', '.png'), blacklist, workers=2, **kwargs)
+
+
+def asPrevious(result):
+    return {directory: (mtime, files) for directory, mtime, files in result}
+
+
+def test_scan_lists_supported_files(tree):
+    result = scanner(tree).scan(str(tree))
+    found = {path.relpath(directory, tree): sorted(files)
+             for directory, _, files in result}
+    assert found == {'.': [], 'a': ['1.jpg', '2.png'], path.join('a', 'b'):
+                     ['3.jpg'], 'skip': ['4.jpg'],
+                     path.join('skip', 'deeper'): ['5.jpg']}
+    assert [directory for directory, *_ in result] == \
+        sorted(directory for directory, *_ in result)
+
+
+def test_blacklist_prunes_the_subtree(tree):
+    pattern = '.*' + path.sep.replace('\\', '\\\\') + 'skip$'
+    treeScanner = scanner(tree, blacklist=pattern)
+    listed = []
+    listDir = treeScanner.listDir
+    treeScanner.listDir = lambda directory: (listed.append(directory),
+                                            listDir(directory))[1]
+    result = treeScanner.scan(str(tree))
+    assert not any('skip' in directory for directory, *_ in result)
+    assert not any('skip' in directory for directory in listed)
+
+
+def test_incremental_scan_only_lists_changed_directories(tree):
+    treeScanner = scanner(tree)
+    first = treeScanner.scan(str(tree))
+    listed = []
+    listDir = treeScanner.listDir
+    treeScanner.listDir = lambda directory: (listed.append(directory),
+                                            listDir(directory))[1]
+    assert treeScanner.scan(str(tree), asPrevious(first)) == first
+    assert listed == []
+
+    (tree / 'a' / 'b' / '6.jpg').write_bytes(b'')
+    # make sure the time changes on file systems with a coarse clock
+    utime(tree / 'a' / 'b', ns=(0, 1))
+    second = treeScanner.scan(str(tree), asPrevious(first))
+    assert listed == [str(tree / 'a' / 'b')]
+    assert sorted(dict((d, f) for d, _, f in second)[str(tree / 'a' / 'b')]) \
+        == ['3.jpg', '6.jpg']
+
+
+def test_removed_directory_is_dropped(tree):
+    treeScanner = scanner(tree)
+    first = treeScanner.scan(str(tree))
+    (tree / 'a' / 'b' / '3.jpg').unlink()
+    (tree / 'a' / 'b').rmdir()
+    second = treeScanner.scan(str(tree), asPrevious(first))
+    assert str(tree / 'a' / 'b') not in [d for d, *_ in second]
+
+
+def test_unreadable_directory_is_listed_again(tree):
+    treeScanner = scanner(tree)
+    first = treeScanner.scan(str(tree))
+    unreadable = str(tree / 'a')
+    listDir = treeScanner.listDir
+
+    def failingListDir(directory):
+        if directory == unreadable:
+            raise PermissionError(directory)
+        return listDir(directory)
+
+    treeScanner.listDir = failingListDir
+    utime(unreadable, ns=(0, 1))
+    second = {d: (m, f) for d, m, f in
+              treeScanner.scan(str(tree), asPrevious(first))}
+    # the earlier listing is kept, without a time so it is listed again
+    assert second[unreadable] == (0, asPrevious(first)[unreadable][1])
+    assert str(tree / 'a' / 'b') in second
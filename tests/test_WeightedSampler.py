@@ -0,0 +1,75 @@
+from collections import Counter
+from random import seed
+
+import pytest
+
+from app.WeightedSampler import WeightedSampler
+
+
+def test_weights_and_total():
+    sampler = WeightedSampler(['a', 'b', 'c'], [1, 2, 3])
+    assert len(sampler) == 3
+    assert sampler.total == 6
+    assert [sampler.weight(key) for key in 'abc'] == [1, 2, 3]
+    assert sampler.weight('d') == 0
+
+
+def test_duplicate_keys_are_merged():
+    sampler = WeightedSampler(['a', 'a', 'b'], [1, 2, 3])
+    assert len(sampler) == 2
+    assert sampler.weight('a') == 3
+
+
+def test_negative_weights_are_zero():
+    sampler = WeightedSampler(['a', 'b'], [-5, 1])
+    assert sampler.weight('a') == 0
+    assert sampler.total == 1
+
+
+def test_mismatched_lengths():
+    with pytest.raises(ValueError):
+        WeightedSampler(['a', 'b'], [1])
+
+
+def test_sample_follows_weights():
+    seed(0)
+    sampler = WeightedSampler(['a', 'b', 'c'], [0, 1, 3])
+    counts = Counter(sampler.sample() for _ in range(4000))
+    assert counts['a'] == 0
+    assert 2.5 < counts['c'] / counts['b'] < 3.5
+
+
+def test_update_increment_and_remove():
+    sampler = WeightedSampler(['a', 'b'], [1, 1])
+    sampler.increment('a', 4)
+    sampler.increment('missing', 4)
+    assert sampler.weight('a') == 5
+    sampler.increment('b', -3)
+    assert sampler.weight('b') == 0
+    sampler.update('b', 2)
+    assert sampler.total == 7
+    sampler.remove('a')
+    assert 'a' not in sampler
+    assert sampler.total == 2
+    assert {sampler.sample() for _ in range(50)} == {'b'}
+
+
+def test_add_reuses_slots_and_grows():
+    sampler = WeightedSampler(['a'], [1])
+    sampler.remove('a')
+    for index in range(20):
+        sampler.add(index, index)
+    assert len(sampler) == 20
+    assert sampler.total == sum(range(20))
+    sampler.add(3, 10)
+    assert sampler.weight(3) == 10
+
+
+def test_empty_sampler_raises():
+    with pytest.raises(IndexError):
+        WeightedSampler().sample()
+    sampler = WeightedSampler(['a'], [1])
+    sampler.clear()
+    assert len(sampler) == 0
+    with pytest.raises(IndexError):
+        sampler.sample()